@@ -4,8 +4,10 @@ import sqlite3
 import plotly.express as px
 import numpy as np
 from player_analysis import display_player_page
-from rankings import display_rankings_page
+from rankings import display_rankings_page, get_glicko_checkpoints, get_ranking_cache
+from precompute import start_precompute
 from tournaments import display_tournaments_page
+from data_loader import DB_PATHS, DataStore, frames_memory_usage, resolve_db_path
 import tracemalloc
 import warnings
 import asyncio
@@ -38,62 +40,36 @@ def get_query_params():
         'host': host
     }
 
-@st.cache_data
+@st.cache_resource(show_spinner=False)
+def get_data_store(db_path):
+    """Store compartilhado entre sessões; usa o snapshot colunar quando o banco não mudou"""
+    store = DataStore(db_path)
+    matches, players, tournaments = store.frames
+    
+    # Debug: Imprimir colunas das tabelas
+    print("\nColunas em matches:", matches.columns.tolist())
+    print("\nColunas em tournaments:", tournaments.columns.tolist())
+    print("\nColunas em players:", players.columns.tolist())
+    print("\nMemória dos DataFrames (KB):", {
+        name: round(size / 1024, 1) for name, size in frames_memory_usage(store.frames).items()
+    })
+    
+    # Pré-calcula os rankings de todos os escopos da página em segundo plano
+    start_precompute(store.dataset, get_ranking_cache(), get_glicko_checkpoints())
+    
+    return store
+
 def load_data():
     with st.spinner('Carregando dados do banco...'):
-        # Tenta diferentes caminhos possíveis para o banco de dados
-        db_paths = [
-            'database.sqlite',
-            'challonge-scraper/database/database.sqlite',
-            '/app/database.sqlite'  # Caminho no Streamlit Cloud
-        ]
-        
-        conn = None
-        chosen_path = None
-        for path in db_paths:
-            try:
-                conn = sqlite3.connect(path)
-                chosen_path = path
-                break
-            except sqlite3.OperationalError:
-                continue
-        
-        if conn is None:
+        chosen_path = resolve_db_path()
+        if chosen_path is None:
             st.error("Não foi possível conectar ao banco de dados. Verifique se o arquivo database.sqlite está no local correto.")
-            return None, None, None
+            return None
         
         # Guardar o caminho do banco para uso na página Admin
         st.session_state['db_path'] = chosen_path
-            
-        matches = pd.read_sql_query("SELECT * FROM matches", conn)
-        players = pd.read_sql_query("SELECT * FROM players", conn)
-        tournaments = pd.read_sql_query("SELECT * FROM tournaments", conn)
-        conn.close()
         
-        # Debug: Imprimir colunas das tabelas
-        print("\nColunas em matches:", matches.columns.tolist())
-        print("\nColunas em tournaments:", tournaments.columns.tolist())
-        print("\nColunas em players:", players.columns.tolist())
-        
-        # Adiciona a data do torneio às partidas
-        if 'start_date' in tournaments.columns:
-            matches = matches.merge(
-                tournaments[['id', 'start_date']],
-                left_on='tournament_id',
-                right_on='id',
-                suffixes=('', '_tournament')
-            )
-            matches = matches.rename(columns={'start_date': 'tournament_date'})
-        elif 'created_at' in tournaments.columns:
-            matches = matches.merge(
-                tournaments[['id', 'created_at']],
-                left_on='tournament_id',
-                right_on='id',
-                suffixes=('', '_tournament')
-            )
-            matches = matches.rename(columns={'created_at': 'tournament_date'})
-        
-        return matches, players, tournaments
+        return get_data_store(chosen_path).dataset
 
 # ===== Helpers/Admin =====
 def _get_admin_password() -> str | None:
@@ -109,7 +85,7 @@ def _connect_db() -> sqlite3.Connection | None:
     db_path = st.session_state.get('db_path')
     if not db_path:
         # fallback tenta os mesmos caminhos do load_data
-        for path in ['database.sqlite', 'challonge-scraper/database/database.sqlite', '/app/database.sqlite']:
+        for path in DB_PATHS:
             try:
                 conn = sqlite3.connect(path)
                 st.session_state['db_path'] = path
@@ -122,6 +98,69 @@ def _connect_db() -> sqlite3.Connection | None:
     except sqlite3.OperationalError:
         return None
 
+def _edit_tournaments(conn):
+    """Edição de challonge_tournaments (aba Torneios do Admin)"""
+    st.subheader('Editar Torneios')
+    df_tourn = pd.read_sql_query(
+        "SELECT id, name, category, state, started_at, completed_at, description FROM challonge_tournaments ORDER BY started_at DESC, id DESC",
+        conn
+    )
+    st.dataframe(df_tourn, use_container_width=True)
+
+    if df_tourn.empty:
+        st.info('Nenhum torneio encontrado.')
+        return
+    
+    selected_tid = st.selectbox(
+        'Selecionar torneio pelo ID',
+        options=df_tourn['id'].tolist(),
+        format_func=lambda x: f"{x} - {df_tourn.loc[df_tourn['id']==x, 'name'].values[0]}" if (df_tourn['id']==x).any() else str(x)
+    )
+
+    selected_trows = df_tourn.loc[df_tourn['id'] == selected_tid]
+    if selected_trows.empty:
+        st.warning('Seleção inválida. Atualize a lista.')
+        return
+    
+    trow = selected_trows.iloc[0]
+
+    def _parse_dt(val: str | None):
+        if pd.isna(val) or val in (None, ''):
+            return None
+        try:
+            return pd.to_datetime(val)
+        except Exception:
+            return None
+
+    started_dt = _parse_dt(trow['started_at'])
+    completed_dt = _parse_dt(trow['completed_at'])
+
+    with st.form('edit_tournament_form'):
+        name = st.text_input('name', trow['name'] or '')
+        category = st.text_input('category', trow['category'] or '')
+        state = st.selectbox('state', options=['pending', 'underway', 'complete', 'awaiting_review', 'group_stages_underway'], index=(['pending','underway','complete','awaiting_review','group_stages_underway'].index(trow['state']) if trow['state'] in ['pending','underway','complete','awaiting_review','group_stages_underway'] else 0))
+        started_at = st.text_input('started_at (YYYY-MM-DD HH:MM:SS ou vazio)', started_dt.strftime('%Y-%m-%d %H:%M:%S') if started_dt is not None else '')
+        completed_at = st.text_input('completed_at (YYYY-MM-DD HH:MM:SS ou vazio)', completed_dt.strftime('%Y-%m-%d %H:%M:%S') if completed_dt is not None else '')
+        description = st.text_area('description', trow['description'] or '')
+        submitted_t = st.form_submit_button('Salvar alterações')
+
+    if submitted_t:
+        try:
+            started_val = None if started_at.strip() == '' else started_at.strip()
+            completed_val = None if completed_at.strip() == '' else completed_at.strip()
+            conn.execute(
+                """
+                UPDATE challonge_tournaments
+                SET name = ?, category = ?, state = ?, started_at = ?, completed_at = ?, description = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+                """,
+                (name, category if category != '' else None, state, started_val, completed_val, description if description != '' else None, int(selected_tid))
+            )
+            conn.commit()
+            st.success('Torneio atualizado com sucesso.')
+        except Exception as e:
+            st.error(f'Erro ao atualizar torneio: {e}')
+
 def display_admin_page():
     st.header('🔐 Admin')
 
@@ -157,7 +196,7 @@ def display_admin_page():
         return
 
     with conn:
-        tabs = st.tabs(['🧑‍💼 Jogadores', '🏟️ Torneios'])
+        tabs = st.tabs(['🧑‍💼 Jogadores', '🏟️ Torneios', '📦 Dados'])
 
         # ----- Jogadores (challonge_participants) -----
         with tabs[0]:
@@ -208,7 +247,7 @@ def display_admin_page():
                             conn.execute(
                                 """
                                 UPDATE challonge_participants
-                                SET name = ?, display_name = ?, email = ?
+                                SET name = ?, display_name = ?, email = ?, updated_at = CURRENT_TIMESTAMP
                                 WHERE id = ?
                                 """,
                                 (name, display_name, email, int(selected_id))
@@ -220,69 +259,26 @@ def display_admin_page():
 
         # ----- Torneios (challonge_tournaments) -----
         with tabs[1]:
-            st.subheader('Editar Torneios')
-            df_tourn = pd.read_sql_query(
-                "SELECT id, name, category, state, started_at, completed_at, description FROM challonge_tournaments ORDER BY started_at DESC, id DESC",
-                conn
-            )
-            st.dataframe(df_tourn, use_container_width=True)
-
-            if df_tourn.empty:
-                st.info('Nenhum torneio encontrado.')
-                return
-            
-            selected_tid = st.selectbox(
-                'Selecionar torneio pelo ID',
-                options=df_tourn['id'].tolist(),
-                format_func=lambda x: f"{x} - {df_tourn.loc[df_tourn['id']==x, 'name'].values[0]}" if (df_tourn['id']==x).any() else str(x)
-            )
-
-            selected_trows = df_tourn.loc[df_tourn['id'] == selected_tid]
-            if selected_trows.empty:
-                st.warning('Seleção inválida. Atualize a lista.')
-                return
-            
-            trow = selected_trows.iloc[0]
-
-            def _parse_dt(val: str | None):
-                if pd.isna(val) or val in (None, ''):
-                    return None
-                try:
-                    return pd.to_datetime(val)
-                except Exception:
-                    return None
-
-            started_dt = _parse_dt(trow['started_at'])
-            completed_dt = _parse_dt(trow['completed_at'])
-
-            with st.form('edit_tournament_form'):
-                name = st.text_input('name', trow['name'] or '')
-                category = st.text_input('category', trow['category'] or '')
-                state = st.selectbox('state', options=['pending', 'underway', 'complete', 'awaiting_review', 'group_stages_underway'], index=(['pending','underway','complete','awaiting_review','group_stages_underway'].index(trow['state']) if trow['state'] in ['pending','underway','complete','awaiting_review','group_stages_underway'] else 0))
-                started_at = st.text_input('started_at (YYYY-MM-DD HH:MM:SS ou vazio)', started_dt.strftime('%Y-%m-%d %H:%M:%S') if started_dt is not None else '')
-                completed_at = st.text_input('completed_at (YYYY-MM-DD HH:MM:SS ou vazio)', completed_dt.strftime('%Y-%m-%d %H:%M:%S') if completed_dt is not None else '')
-                description = st.text_area('description', trow['description'] or '')
-                submitted_t = st.form_submit_button('Salvar alterações')
-
-            if submitted_t:
-                try:
-                    started_val = None if started_at.strip() == '' else started_at.strip()
-                    completed_val = None if completed_at.strip() == '' else completed_at.strip()
-                    conn.execute(
-                        """
-                        UPDATE challonge_tournaments
-                        SET name = ?, category = ?, state = ?, started_at = ?, completed_at = ?, description = ?
-                        WHERE id = ?
-                        """,
-                        (name, category if category != '' else None, state, started_val, completed_val, description if description != '' else None, int(selected_tid))
-                    )
-                    conn.commit()
-                    st.success('Torneio atualizado com sucesso.')
-                except Exception as e:
-                    st.error(f'Erro ao atualizar torneio: {e}')
+            _edit_tournaments(conn)
+
+        # ----- Dados em memória -----
+        with tabs[2]:
+            st.subheader('Dados em memória')
+            store = get_data_store(st.session_state['db_path'])
+            usage = frames_memory_usage(store.frames)
+            df_usage = pd.DataFrame({
+                'Tabela': list(usage.keys()),
+                'Linhas': [len(df) for df in store.frames],
+                'Memória (KB)': [round(size / 1024, 1) for size in usage.values()],
+            })
+            st.dataframe(df_usage, use_container_width=True, hide_index=True)
+            st.caption(f"Versão do banco: {store.fingerprint}")
 
 # Carregar dados
-matches, players, tournaments = load_data()
+dataset = load_data()
+if dataset is None:
+    st.stop()
+matches, players, tournaments = dataset.frames
 
 # Debug temporário
 print("Colunas disponíveis em matches:", matches.columns.tolist())
@@ -296,10 +292,27 @@ params = get_query_params()
 # Botão global sutil de refresh
 _top_cols = st.columns([0.85, 0.15])
 with _top_cols[1]:
-    if st.button("⟳", help="Atualizar dados (limpa cache e recalcula)", key="global_refresh"):
-        st.cache_data.clear()
+    if st.button("⟳", help="Atualizar dados (recarrega apenas o que mudou no banco)", key="global_refresh"):
+        # Incorpora só as linhas novas/alteradas; os caches de rankings de escopos
+        # sem torneios afetados continuam válidos
+        store = get_data_store(st.session_state['db_path'])
+        refresh = store.refresh()
+        if refresh['full_reload'] or refresh['tournament_ids']:
+            start_precompute(store.dataset, get_ranking_cache(), get_glicko_checkpoints())
+        if refresh['full_reload']:
+            st.session_state['refresh_message'] = "Dados recarregados por completo."
+        elif refresh['tournament_ids']:
+            st.session_state['refresh_message'] = (
+                f"{len(refresh['tournament_ids'])} torneio(s) atualizado(s) em: "
+                + ", ".join(sorted(refresh['categories']))
+            )
+        else:
+            st.session_state['refresh_message'] = "Nenhuma alteração encontrada no banco."
         st.rerun()
 
+if 'refresh_message' in st.session_state:
+    st.toast(st.session_state.pop('refresh_message'))
+
 # Navegação no topo com ícones
 pages = ["👤 Análise de Jogadores", "🏆 Rankings", "🎾 Torneios", "🔐 Admin"]
 page_name_to_index = {"Análise de Jogadores": 0, "Rankings": 1, "Torneios": 2, "Admin": 3}
@@ -319,15 +332,15 @@ if params['player_id']:
 if "Análise de Jogadores" in page:
     # Armazenar o host na session_state
     st.session_state['host'] = params['host']
-    display_player_page(matches, players, shared_player_id=params['player_id'])
+    display_player_page(dataset, shared_player_id=params['player_id'])
 elif "Rankings" in page:
     # Armazenar o host na session_state
     st.session_state['host'] = params['host']
-    display_rankings_page(matches, players, tournaments)
+    display_rankings_page(dataset)
 elif "Torneios" in page:
     # Armazenar o host na session_state
     st.session_state['host'] = params['host']
-    display_tournaments_page(matches, players, tournaments) 
+    display_tournaments_page(dataset) 
 elif "Admin" in page:
     # Armazenar o host na session_state
     st.session_state['host'] = params['host']
@@ -0,0 +1,190 @@
+from html import escape
+
+import numpy as np
+import pandas as pd
+
+from tournament_results import tournament_result
+
+# Nomes das rodadas pela rodada mais alta do torneio
+BRACKET_ROUND_NAMES = {
+    4: {1: "1ª Rodada", 2: "Quartas", 3: "Semifinal", 4: "Final"},
+    3: {1: "Quartas", 2: "Semifinal", 3: "Final"},
+    2: {1: "Semifinal", 2: "Final"},
+    1: {1: "Final"},
+}
+
+# Largura de cada rodada na chave ASCII e tamanho máximo dos nomes
+COLUMN_WIDTH = 22
+NAME_WIDTH = 18
+
+BRACKET_STYLE = (
+    "font-family: 'Courier New', monospace; font-size: 10px; line-height: 1.2; "
+    "background-color: #f8f9fa; padding: 12px; border-radius: 6px; border: 1px solid #e9ecef; "
+    "overflow-x: auto; white-space: pre-line; color: #212529;"
+)
+# Mesmas cores de st.success / st.error
+WINNER_STYLE = "background-color: rgba(33, 195, 84, 0.1); color: rgb(23, 114, 51); padding: 10px 14px; border-radius: 6px;"
+LOSER_STYLE = "background-color: rgba(255, 43, 43, 0.09); color: rgb(125, 53, 59); padding: 10px 14px; border-radius: 6px;"
+
+
+def tournament_matches(dataset, tournament_id):
+    """
+    Partidas do torneio, na ordem (rodada, match_id): os frames estão ordenados
+    por `sort_key`, que é único por torneio, então elas formam um intervalo contíguo
+    """
+    tournaments = dataset.tournaments
+    sort_key = tournaments.loc[tournaments['id'] == tournament_id, 'sort_key']
+    if sort_key.empty:
+        return dataset.matches.iloc[0:0]
+    sort_key = int(sort_key.iloc[0])
+    start, end = np.searchsorted(dataset.matches['sort_key'].to_numpy(), [sort_key, sort_key + 1])
+    return dataset.matches.iloc[start:end]
+
+
+def _display_name(name):
+    """Nome em CAPS LOCK, truncado quando muito longo"""
+    name = str(name).upper()
+    return name[:15] + "..." if len(name) > NAME_WIDTH else name
+
+
+def render_bracket(matches, result, tournament_name):
+    """
+    HTML completo da chave de um torneio: cabeçalho (campeão, vice,
+    semifinalistas), chave em ASCII e resumo das partidas por rodada, para ser
+    exibido em um único elemento. `matches`: partidas do torneio na ordem
+    (rodada, match_id); `result`: linha do torneio na tabela de resultados.
+    """
+    rounds = matches['round'].to_numpy()
+    round_numbers = np.unique(rounds).tolist()
+    round_names = BRACKET_ROUND_NAMES.get(max(round_numbers), {})
+
+    champion_name = result['champion_name'] if result is not None else None
+    has_champion = champion_name is not None and not pd.isna(champion_name)
+
+    # Partidas de cada rodada: (vencedor, perdedor) já formatados
+    winners = [_display_name(name) for name in matches['winner_name'].to_numpy()]
+    losers = [_display_name(name) for name in matches['loser_name'].to_numpy()]
+    final_champion = (rounds == round_numbers[-1]) & (matches['winner_name'].to_numpy() == champion_name)
+    rounds_data = {}
+    for position, round_num in enumerate(rounds.tolist()):
+        winner = f"👑 {winners[position]}" if has_champion and final_champion[position] else winners[position]
+        rounds_data.setdefault(round_num, []).append((winner, losers[position]))
+
+    # Chave em ASCII: uma coluna por rodada, uma partida (duas linhas) por bloco
+    header = "".join(f"{round_names.get(r, f'Rodada {r}'):^{COLUMN_WIDTH}}" for r in round_numbers)
+    bracket_lines = [header, "=" * len(header), ""]
+    empty = " " * (NAME_WIDTH + 2)
+    for match_idx in range(max(len(rounds_data[r]) for r in round_numbers)):
+        top, bottom = "", ""
+        for round_num in round_numbers:
+            if match_idx < len(rounds_data[round_num]):
+                winner, loser = rounds_data[round_num][match_idx]
+                top += f"✅ {winner:<{NAME_WIDTH}}" + "  "
+                bottom += f"   {loser:<{NAME_WIDTH}}" + "  "
+            else:
+                top += empty + "  "
+                bottom += empty + "  "
+        bracket_lines.extend([top, bottom, ""])
+    bracket_lines.pop()
+
+    bracket_text = escape("\n".join(bracket_lines), quote=False)
+    bracket_text = bracket_text.replace(' ', '&nbsp;').replace('\n', '<br>')
+
+    parts = [f"<h2>🏆 {escape(str(tournament_name))}</h2>"]
+    if has_champion:
+        parts.append(f'<div style="{WINNER_STYLE}">🥇 <b>CAMPEÃO: {escape(str(champion_name))}</b></div>')
+        podium = [f"🥈 Vice: {escape(str(result['runner_up_name']))}"]
+        if result['semifinalist_names']:
+            podium.append(f"🥉 Semifinalistas: {escape(', '.join(map(str, result['semifinalist_names'])))}")
+        podium.append(f"🎾 {result['match_count']} partidas")
+        parts.append(f'<p style="color: #808495; font-size: 14px;">{" · ".join(podium)}</p>')
+    parts.append(f'<div style="{BRACKET_STYLE}">{bracket_text}</div>')
+
+    # Resumo das partidas com as cores de vencedor/perdedor
+    parts.append("<h3>📊 Resumo das Partidas</h3>")
+    for round_num in round_numbers:
+        parts.append(f"<p><b>{escape(round_names.get(round_num, f'Rodada {round_num}'))}:</b></p>")
+        parts.append('<div style="display: grid; grid-template-columns: 1fr 1fr; gap: 8px 16px;">')
+        for winner, loser in rounds_data[round_num]:
+            parts.append(f'<div style="{WINNER_STYLE}">🏆 {escape(winner)}</div>')
+            parts.append(f'<div style="{LOSER_STYLE}">❌ {escape(loser)}</div>')
+        parts.append("</div><hr>")
+
+    return "\n".join(parts)
+
+
+def bracket_layout(matches):
+    """
+    Posições da chave de eliminação: cada partida é ligada à partida da rodada
+    seguinte disputada pelo seu vencedor (o "pai"); a partir da final, os
+    filhos de cada partida ocupam os slots 2s e 2s + 1 da rodada anterior, de
+    modo que a coluna c tem 2^c linhas por slot e a chave fica centrada como
+    uma árvore completa (byes deixam espaços vazios). Partidas sem pai vão para
+    o fim da coluna. Retorna (x, y, parent) alinhados a `matches` (na ordem
+    rodada, match_id), com parent = -1 para quem não tem pai.
+    """
+    rounds = matches['round'].to_numpy()
+    round_numbers = np.unique(rounds)
+    column = np.searchsorted(round_numbers, rounds)
+    n = len(matches)
+    positions = np.arange(n)
+    winners = matches['winner_id'].to_numpy()
+
+    # (coluna, jogador) -> partida; o pai é a partida do vencedor na coluna seguinte
+    players = pd.Series(
+        np.tile(positions, 2),
+        index=pd.MultiIndex.from_arrays([np.tile(column, 2), np.concatenate([winners, matches['loser_id'].to_numpy()])]),
+    )
+    players = players[~players.index.duplicated()]
+    parent = players.reindex(pd.MultiIndex.from_arrays([column + 1, winners])).fillna(-1).to_numpy().astype(np.intp)
+
+    slot = np.full(n, -1, dtype=np.int64)
+    last_column = len(round_numbers) - 1
+    slot[column == last_column] = np.arange(np.count_nonzero(column == last_column))
+    for c in range(last_column - 1, -1, -1):
+        in_column = positions[column == c]
+        children = in_column[parent[in_column] >= 0]
+        # Irmãos na ordem das partidas (match_id): o primeiro fica acima
+        parent_slot = slot[parent[children]]
+        order = np.lexsort((children, parent_slot))
+        children, parent_slot = children[order], parent_slot[order]
+        first = np.r_[True, parent_slot[1:] != parent_slot[:-1]][:len(children)]
+        sibling = np.arange(len(children)) - np.maximum.accumulate(np.where(first, np.arange(len(children)), 0))
+        slot[children] = 2 * parent_slot + sibling
+        orphans = in_column[parent[in_column] < 0]
+        start = slot[children].max() + 1 if len(children) else 0
+        slot[orphans] = start + np.arange(len(orphans))
+
+    y = (slot + 0.5) * 2.0 ** column
+    return column.astype(np.float64), y, parent
+
+
+def bracket_edges(x, y, parent):
+    """
+    Conectores em cotovelo de cada partida até a partida pai, como arrays x/y
+    separados por NaN (lacunas no traçado: um único trace de linhas)
+    """
+    children = np.flatnonzero(parent >= 0)
+    parents = parent[children]
+    middle = (x[children] + x[parents]) / 2
+    gap = np.full(len(children), np.nan)
+    edges_x = np.column_stack([x[children], middle, middle, x[parents], gap]).ravel()
+    edges_y = np.column_stack([y[children], y[children], y[parents], y[parents], gap]).ravel()
+    return edges_x, edges_y
+
+
+def tournament_bracket_html(dataset, results, tournament_id, cache):
+    """
+    HTML da chave do torneio, montado uma vez por torneio e versão dos dados
+    (cache: RankingCache); None se o torneio não tem partidas
+    """
+    def build():
+        matches = tournament_matches(dataset, tournament_id)
+        if matches.empty:
+            return None
+        tournaments = dataset.tournaments
+        name = tournaments.loc[tournaments['id'] == tournament_id, 'name'].iloc[0]
+        result = tournament_result(results, tournament_id)
+        return render_bracket(matches, result, name)
+
+    return cache.get_or_compute(('bracket', tournament_id), dataset.version, build)
@@ -0,0 +1,429 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from matches_table import (
+    SCORE_FLAG_COLUMNS,
+    SET_GAME_COLUMNS,
+    SOURCE_TABLES,
+    changed_source_rows,
+    ensure_matches_table,
+    read_matches,
+    read_watermarks,
+)
+
+try:
+    import pyarrow.feather as feather
+except ImportError as e:  # sem pyarrow os dados são lidos do banco a cada carga
+    print(f"pyarrow indisponível, snapshots desativados: {e}")
+    feather = None
+
+# Caminhos possíveis para o banco de dados (local, scraper e Streamlit Cloud)
+DB_PATHS = [
+    'database.sqlite',
+    'challonge-scraper/database/database.sqlite',
+    '/app/database.sqlite'  # Caminho no Streamlit Cloud
+]
+
+# Diretório dos snapshots colunares. Incrementar SNAPSHOT_SCHEMA_VERSION sempre
+# que o formato dos DataFrames produzidos por read_frames mudar.
+SNAPSHOT_DIR = os.path.join('.cache', 'snapshots')
+SNAPSHOT_SCHEMA_VERSION = 7
+SNAPSHOT_KEEP = 3
+FRAME_NAMES = ('matches', 'players', 'tournaments')
+
+# Tipos compactos dos DataFrames em memória (replicados entre as entradas de cache)
+MATCHES_SCHEMA = {
+    'match_id': 'int32',
+    'winner_id': 'int32',
+    'loser_id': 'int32',
+    'tournament_id': 'int32',
+    'round': 'int8',
+    'set_balance': 'int16',
+    'winner_sets': 'int8',
+    'loser_sets': 'int8',
+    'winner_games': 'int16',
+    'loser_games': 'int16',
+    **{column: 'int8' for column in SET_GAME_COLUMNS},
+    'sets_played': 'int8',
+    **{column: 'bool' for column in SCORE_FLAG_COLUMNS},
+    'started_date_key': 'int32',
+    'score': 'category',
+    'winner_name': 'category',
+    'loser_name': 'category',
+    'tournament_name': 'category',
+    'tournament_category': 'category',
+    'started_month_year': 'category',
+    'started_year': 'category',
+}
+PLAYERS_SCHEMA = {
+    'id': 'int32',
+}
+TOURNAMENTS_SCHEMA = {
+    'id': 'int32',
+    'category': 'category',
+    'state': 'category',
+    'data_revision': 'category',
+}
+
+
+def resolve_db_path():
+    """Retorna o primeiro caminho de banco de dados existente"""
+    for path in DB_PATHS:
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def database_fingerprint(db_path):
+    """Identifica o conteúdo do banco por tamanho, mtime e hash do arquivo"""
+    size = 0
+    mtime_ns = 0
+    digest = hashlib.sha256()
+    # Em modo WAL as escritas recentes ficam no arquivo -wal até o checkpoint; um -wal
+    # vazio (deixado por leitores somente leitura) não muda o conteúdo
+    for path in (db_path, db_path + '-wal'):
+        if not os.path.isfile(path):
+            continue
+        stat = os.stat(path)
+        if path != db_path and stat.st_size == 0:
+            continue
+        size += stat.st_size
+        mtime_ns = max(mtime_ns, stat.st_mtime_ns)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return f"v{SNAPSHOT_SCHEMA_VERSION}-{size}-{mtime_ns}-{digest.hexdigest()[:16]}"
+
+
+def _in_clause(values):
+    return ", ".join("?" for _ in values)
+
+
+def _attach_tournament_dates(matches, tournaments):
+    """Adiciona a data do torneio às partidas"""
+    if 'start_date' in tournaments.columns:
+        matches = matches.merge(
+            tournaments[['id', 'start_date']],
+            left_on='tournament_id',
+            right_on='id',
+            suffixes=('', '_tournament')
+        )
+        matches = matches.rename(columns={'start_date': 'tournament_date'})
+    elif 'created_at' in tournaments.columns:
+        matches = matches.merge(
+            tournaments[['id', 'created_at']],
+            left_on='tournament_id',
+            right_on='id',
+            suffixes=('', '_tournament')
+        )
+        matches = matches.rename(columns={'created_at': 'tournament_date'})
+    return matches
+
+
+def _apply_schema(df, schema):
+    """Converte as colunas para os tipos compactos; inteiros com nulos viram o tipo nullable"""
+    dtypes = {}
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            continue
+        if dtype != 'category' and df[column].isna().any():
+            dtype = dtype.capitalize()
+        dtypes[column] = dtype
+    return df.astype(dtypes)
+
+
+def _month_start(timestamps):
+    """Primeiro dia do mês de cada data (datetime64; NaT continua NaT)"""
+    return pd.Series(
+        timestamps.to_numpy().astype('datetime64[M]').astype('datetime64[ns]'),
+        index=timestamps.index
+    )
+
+
+def apply_frame_schema(frames):
+    """
+    Aplica os tipos compactos e monta o índice de datas: `started_at` (datetime64
+    exato do início do torneio), `sort_key` (posição do torneio na ordem
+    cronológica, desempatada pelo id) e `started_month` (mês de início, usado nos
+    filtros por período). Torneios e partidas ficam ordenados por `sort_key`,
+    com os torneios sem data no fim, então filtros por período são recortes por
+    busca binária e a ordem cronológica dispensa reordenar.
+    """
+    matches, players, tournaments = frames
+    players = _apply_schema(players, PLAYERS_SCHEMA)
+
+    tournaments = _apply_schema(tournaments, TOURNAMENTS_SCHEMA)
+    tournaments['started_at'] = pd.to_datetime(tournaments['started_at'], format='ISO8601')
+    tournaments = tournaments.sort_values(['started_at', 'id'], na_position='last', ignore_index=True)
+    tournaments['sort_key'] = np.arange(len(tournaments), dtype=np.int32)
+    tournaments['started_month'] = _month_start(tournaments['started_at'])
+
+    matches = _apply_schema(matches, MATCHES_SCHEMA)
+    by_id = tournaments.set_index('id')
+    matches['started_at'] = matches['tournament_id'].map(by_id['started_at'])
+    matches['sort_key'] = matches['tournament_id'].map(by_id['sort_key']).fillna(len(tournaments)).astype(np.int32)
+    matches['started_month'] = _month_start(matches['started_at'])
+    matches = matches.sort_values(['sort_key', 'round', 'match_id'], ignore_index=True)
+    return matches, players, tournaments
+
+
+def frames_memory_usage(frames):
+    """Retorna o uso de memória (bytes, incluindo strings) de cada DataFrame"""
+    return {
+        name: int(df.memory_usage(deep=True).sum())
+        for name, df in zip(FRAME_NAMES, frames)
+    }
+
+
+def tournament_revisions(matches, players, tournaments):
+    """
+    Revisão de conteúdo de cada torneio: hash da sua linha em `tournaments` e das
+    suas partidas, como lidas por read_matches (antes de apply_frame_schema), com
+    os nomes dos jogadores em `players`. Só muda quando o próprio torneio muda,
+    seja qual for a carga (completa ou incremental, em qualquer processo) que o leu.
+    """
+    names = players.set_index('id')['name']
+    rows = matches.assign(
+        winner_player_name=matches['winner_id'].map(names),
+        loser_player_name=matches['loser_id'].map(names),
+    )
+    tournament_hashes = pd.util.hash_pandas_object(tournaments, index=False).to_numpy()
+    order = np.lexsort((rows['match_id'].to_numpy(), rows['tournament_id'].to_numpy()))
+    match_ids = rows['tournament_id'].to_numpy()[order]
+    match_hashes = pd.util.hash_pandas_object(rows, index=False).to_numpy()[order]
+
+    tournament_ids = tournaments['id'].to_numpy()
+    starts = np.searchsorted(match_ids, tournament_ids, side='left')
+    ends = np.searchsorted(match_ids, tournament_ids, side='right')
+
+    revisions = []
+    for tournament_hash, start, end in zip(tournament_hashes, starts, ends):
+        digest = hashlib.sha1(tournament_hash.tobytes())
+        digest.update(match_hashes[start:end].tobytes())
+        revisions.append(digest.hexdigest()[:16])
+    return revisions
+
+
+def read_frames(conn, matches_cache):
+    """
+    Lê partidas, jogadores e torneios; `matches_cache` é o banco de cache com a
+    tabela materializada de partidas em dia (None para ler direto das tabelas de
+    origem). Cada torneio recebe em `data_revision` a sua revisão de conteúdo.
+    """
+    matches = read_matches(conn, matches_cache)
+    players = pd.read_sql_query("SELECT * FROM players", conn)
+    tournaments = pd.read_sql_query("SELECT * FROM tournaments", conn)
+    tournaments['data_revision'] = tournament_revisions(matches, players, tournaments)
+
+    matches = _attach_tournament_dates(matches, tournaments)
+    return apply_frame_schema((matches, players, tournaments))
+
+
+def read_delta(conn, frames, watermarks, matches_cache):
+    """
+    Aplica aos DataFrames apenas as linhas novas ou alteradas desde `watermarks`.
+    Retorna (frames, ids dos torneios afetados, novos watermarks) ou None quando é
+    preciso recarregar tudo (linhas removidas no banco).
+    """
+    matches, players, tournaments = frames
+    new_watermarks = read_watermarks(conn)
+    changed = changed_source_rows(conn, watermarks)
+    if changed is None:
+        return None
+
+    changed_player_ids = {row_id for row_id, _ in changed['challonge_participants']}
+    affected = set()
+    for table in SOURCE_TABLES:
+        affected |= {tournament_id for _, tournament_id in changed[table]}
+    if changed_player_ids:
+        # Nomes de participantes aparecem nas partidas de todos os torneios que disputaram
+        played = matches['winner_id'].isin(changed_player_ids) | matches['loser_id'].isin(changed_player_ids)
+        affected |= set(matches.loc[played, 'tournament_id'].tolist())
+
+    if not affected:
+        return frames, affected, new_watermarks
+
+    affected_ids = sorted(int(t) for t in affected)
+    new_tournaments = pd.read_sql_query(
+        f"SELECT * FROM tournaments WHERE id IN ({_in_clause(affected_ids)})", conn, params=affected_ids
+    )
+
+    if changed_player_ids:
+        player_ids = sorted(changed_player_ids)
+        new_players = pd.read_sql_query(
+            f"SELECT * FROM players WHERE id IN ({_in_clause(player_ids)})", conn, params=player_ids
+        )
+        players = pd.concat(
+            [players[~players['id'].isin(player_ids)], new_players], ignore_index=True
+        ).sort_values('id', ignore_index=True)
+
+    new_matches = read_matches(conn, matches_cache, affected_ids)
+    new_tournaments['data_revision'] = tournament_revisions(new_matches, players, new_tournaments)
+    tournaments = pd.concat(
+        [tournaments[~tournaments['id'].isin(affected_ids)], new_tournaments], ignore_index=True
+    )
+
+    new_matches = _attach_tournament_dates(new_matches, tournaments)
+    # A ordem cronológica de torneios e partidas é refeita em apply_frame_schema
+    matches = pd.concat(
+        [matches[~matches['tournament_id'].isin(affected_ids)], new_matches], ignore_index=True
+    )
+
+    return apply_frame_schema((matches, players, tournaments)), set(affected_ids), new_watermarks
+
+
+def _snapshot_path(fingerprint):
+    return os.path.join(SNAPSHOT_DIR, fingerprint)
+
+
+def load_snapshot(fingerprint):
+    """Carrega o snapshot (Arrow IPC mapeado em memória) e seus watermarks, se existir"""
+    if feather is None:
+        return None
+    path = _snapshot_path(fingerprint)
+    if not os.path.isdir(path):
+        return None
+    try:
+        frames = tuple(
+            feather.read_table(os.path.join(path, f"{name}.arrow"), memory_map=True).to_pandas()
+            for name in FRAME_NAMES
+        )
+        with open(os.path.join(path, 'watermarks.json'), encoding='utf-8') as f:
+            watermarks = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Snapshot inválido em {path}: {e}")
+        return None
+    return frames, watermarks
+
+
+def save_snapshot(fingerprint, frames, watermarks):
+    """Grava os DataFrames finais como snapshot colunar e remove snapshots antigos"""
+    if feather is None:
+        return
+    path = _snapshot_path(fingerprint)
+    tmp_path = path + '.tmp'
+    try:
+        os.makedirs(tmp_path, exist_ok=True)
+        for name, df in zip(FRAME_NAMES, frames):
+            # Sem compressão para permitir leitura via memory map
+            feather.write_feather(
+                df.reset_index(drop=True),
+                os.path.join(tmp_path, f"{name}.arrow"),
+                compression='uncompressed'
+            )
+        with open(os.path.join(tmp_path, 'watermarks.json'), 'w', encoding='utf-8') as f:
+            json.dump(watermarks, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+    except (OSError, ValueError) as e:
+        print(f"Não foi possível gravar o snapshot: {e}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return
+
+    # Mantém apenas os snapshots mais recentes
+    snapshots = sorted(
+        (os.path.join(SNAPSHOT_DIR, d) for d in os.listdir(SNAPSHOT_DIR) if not d.endswith('.tmp')),
+        key=os.path.getmtime,
+        reverse=True
+    )
+    for old in snapshots[SNAPSHOT_KEEP:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+class Dataset(NamedTuple):
+    """
+    Versão imutável dos dados carregados. `version` muda a cada carga ou
+    atualização com mudanças no banco, então os caches usam (version, parâmetros)
+    como chave em vez de receber e hashear os DataFrames. Os frames estão sempre
+    na ordem cronológica de apply_frame_schema, então os filtros por período
+    sobre eles (e sobre subconjuntos das suas linhas) usam `chronological=True`.
+    """
+    matches: pd.DataFrame
+    players: pd.DataFrame
+    tournaments: pd.DataFrame
+    version: str
+
+    @property
+    def frames(self):
+        return self.matches, self.players, self.tournaments
+
+
+class DataStore:
+    """
+    Mantém os DataFrames carregados do banco e os atualiza de forma incremental.
+
+    Cada torneio carrega em `data_revision` a revisão do seu conteúdo (partidas e
+    dados do torneio); caches derivados e a exportação usam essas revisões para
+    invalidar apenas o que foi afetado, mesmo entre processos e cargas completas.
+    `dataset` é a versão atual (Dataset), trocada a cada carga ou atualização.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        # O fingerprint vem antes: mudanças gravadas durante a carga aparecem no próximo refresh
+        self.fingerprint = database_fingerprint(self.db_path)
+        self.matches_cache = ensure_matches_table(self.db_path)
+        snapshot = load_snapshot(self.fingerprint)
+        if snapshot is not None:
+            self.frames, self.watermarks = snapshot
+            self.dataset = Dataset(*self.frames, self.fingerprint)
+            return
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.watermarks = read_watermarks(conn)
+            self.frames = read_frames(conn, self.matches_cache)
+        finally:
+            conn.close()
+        save_snapshot(self.fingerprint, self.frames, self.watermarks)
+        self.dataset = Dataset(*self.frames, self.fingerprint)
+
+    def refresh(self):
+        """
+        Incorpora as mudanças do banco desde a última carga.
+        Retorna um dicionário com os torneios e categorias afetados.
+        """
+        with self._lock:
+            fingerprint = database_fingerprint(self.db_path)
+            if fingerprint == self.fingerprint:
+                return {'full_reload': False, 'tournament_ids': set(), 'categories': set()}
+
+            self.matches_cache = ensure_matches_table(self.db_path)
+
+            old_tournaments = self.frames[2]
+            conn = sqlite3.connect(self.db_path)
+            try:
+                delta = read_delta(conn, self.frames, self.watermarks, self.matches_cache)
+            finally:
+                conn.close()
+
+            if delta is None:
+                self._load()
+                affected = set(old_tournaments['id']) | set(self.frames[2]['id'])
+            else:
+                self.frames, affected, self.watermarks = delta
+                self.fingerprint = fingerprint
+                save_snapshot(fingerprint, self.frames, self.watermarks)
+                self.dataset = Dataset(*self.frames, self.fingerprint)
+
+            tournaments = self.frames[2]
+            categories = set(old_tournaments.loc[old_tournaments['id'].isin(affected), 'category'].dropna())
+            categories |= set(tournaments.loc[tournaments['id'].isin(affected), 'category'].dropna())
+            return {'full_reload': delta is None, 'tournament_ids': affected, 'categories': categories}
+
+
+def load_frames(db_path):
+    """Carrega matches, players e tournaments, usando o snapshot quando o banco não mudou"""
+    return DataStore(db_path).frames
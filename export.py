@@ -0,0 +1,223 @@
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from data_loader import DataStore, resolve_db_path
+from glicko import GlickoCheckpoints
+from player_summary import PlayerSummary
+from ranking_engine import (
+    RankingCache,
+    cached_tournament_results,
+    compute_glicko_ratings,
+    compute_points_facts,
+    compute_points_ranking,
+    ranking_period_options,
+    resolve_ranking_period,
+    scope_revision,
+)
+from streaks import player_streaks
+
+EXPORT_FORMATS = ('json', 'parquet')
+
+# Rankings exportados por escopo (categoria x período)
+RANKING_EXPORTS = ('glicko', 'points')
+
+# Revisão dos dados de cada arquivo exportado, para pular o que não mudou
+MANIFEST_NAME = 'manifest.json'
+
+# Limite de processos dos rankings (cada um recebe uma cópia dos frames)
+MAX_WORKERS = 4
+
+# Dados de cada processo do pool (definidos em _init_worker)
+_worker_dataset = None
+_worker_results = None
+_worker_checkpoints = None
+
+
+def slugify(text):
+    """Nome de arquivo/diretório sem acentos: 'Últimos 12 meses' -> 'ultimos-12-meses'"""
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def write_frame(df, path, export_format):
+    """Grava o DataFrame em JSON (lista de registros) ou Parquet, trocando o arquivo de uma vez"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.tmp"
+    if export_format == 'parquet':
+        df.to_parquet(temp_path, index=False)
+    else:
+        df.to_json(temp_path, orient='records', force_ascii=False, date_format='iso', indent=2)
+    os.replace(temp_path, path)
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(output_dir, manifest):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def player_table(dataset):
+    """Estatísticas, fases alcançadas e sequências de todos os jogadores, uma linha por jogador"""
+    summary = PlayerSummary(dataset.matches)
+    table = summary.table.join(summary.rounds).join(player_streaks(dataset.matches).drop(columns='last_row'))
+    names = dataset.players.set_index('id')['name'].str.upper()
+    table.insert(0, 'name', names.reindex(table.index).to_numpy())
+    return table.reset_index()
+
+
+def tournament_table(dataset, results):
+    """Torneios com campeão, vice, semifinalistas, número de partidas e rodada final"""
+    tournaments = dataset.tournaments[['id', 'name', 'category', 'started_at', 'state']]
+    table = tournaments.merge(results, left_on='id', right_index=True, how='left')
+    # Torneios sem partidas ficam sem resultado
+    for column in ('match_count', 'champion_id', 'runner_up_id'):
+        table[column] = table[column].astype('Int64')
+    for column in ('semifinalist_ids', 'semifinalist_names'):
+        table[column] = [value if isinstance(value, list) else [] for value in table[column]]
+    return table.rename(columns={'id': 'tournament_id'})
+
+
+def ranking_tables(dataset, results, category, time_period, checkpoints):
+    """Rankings Glicko-2 e por pontos do escopo, na ordem de RANKING_EXPORTS"""
+    matches, players, tournaments = dataset.frames
+    facts = compute_points_facts(matches, tournaments, category, time_period, results)
+    return (
+        compute_glicko_ratings(matches, players, tournaments, category, time_period, checkpoints),
+        compute_points_ranking(matches, players, tournaments, category, time_period, facts),
+    )
+
+
+def _init_worker(dataset, results):
+    global _worker_dataset, _worker_results, _worker_checkpoints
+    _worker_dataset = dataset
+    _worker_results = results
+    _worker_checkpoints = GlickoCheckpoints()
+
+
+def _export_category(task):
+    """Grava os rankings dos períodos pendentes de uma categoria (no processo do pool)"""
+    category, scopes, output_dir, export_format = task
+    for time_period, paths in scopes:
+        rankings = ranking_tables(_worker_dataset, _worker_results, category, time_period, _worker_checkpoints)
+        for path, table in zip(paths, rankings):
+            write_frame(table, os.path.join(output_dir, path), export_format)
+
+
+def export_all(dataset, output_dir, export_format='json', force=False, now=None, max_workers=None):
+    """
+    Exporta os rankings de todas as combinações categoria x período, as
+    estatísticas de todos os jogadores e os resultados de todos os torneios.
+    Arquivos cuja revisão no manifesto é a atual são mantidos (a não ser com
+    `force`). Os rankings pendentes são calculados por categoria em até
+    `max_workers` processos (spawn; 1 calcula no próprio processo). Retorna
+    (arquivos gravados, arquivos mantidos).
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato desconhecido: {export_format}")
+    manifest = {} if force else load_manifest(output_dir)
+
+    def up_to_date(path, revision):
+        return manifest.get(path) == revision and os.path.isfile(os.path.join(output_dir, path))
+
+    written, kept = [], 0
+    results = cached_tournament_results(dataset, RankingCache())
+
+    # Tabelas de toda a base: mudam com qualquer torneio incluído, removido ou alterado
+    tournaments = dataset.tournaments
+    base_revision = scope_revision(tournaments, None, None)
+    tables = {
+        'players': lambda: player_table(dataset),
+        'tournaments': lambda: tournament_table(dataset, results),
+    }
+    for name, build in tables.items():
+        path = f"{name}.{export_format}"
+        if up_to_date(path, base_revision):
+            kept += 1
+            continue
+        write_frame(build(), os.path.join(output_dir, path), export_format)
+        manifest[path] = base_revision
+        written.append(path)
+
+    # Rankings: revisão do escopo, que muda só com os torneios (e nomes) que ele inclui
+    categories = ["Todas"] + sorted(tournaments['category'].dropna().unique().tolist())
+    pending = {}
+    for category in categories:
+        for option in ranking_period_options(tournaments):
+            time_period = resolve_ranking_period(option, now)
+            revision = scope_revision(tournaments, category, time_period)
+            paths = [
+                f"rankings/{slugify(category)}/{slugify(option)}/{kind}.{export_format}" for kind in RANKING_EXPORTS
+            ]
+            if all(up_to_date(path, revision) for path in paths):
+                kept += len(paths)
+                continue
+            pending.setdefault(category, []).append((time_period, paths, revision))
+
+    # Uma tarefa por categoria: os períodos retomam dos mesmos checkpoints Glicko-2
+    tasks = [
+        (category, [(time_period, paths) for time_period, paths, _ in scopes], output_dir, export_format)
+        for category, scopes in pending.items()
+    ]
+    if max_workers is None:
+        max_workers = min(MAX_WORKERS, os.cpu_count() or 1, len(tasks))
+    if max_workers <= 1:
+        _init_worker(dataset, results)
+        for task in tasks:
+            _export_category(task)
+    elif tasks:
+        # spawn: os processos não herdam threads nem locks do processo pai
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(dataset, results),
+        ) as pool:
+            list(pool.map(_export_category, tasks))
+
+    for scopes in pending.values():
+        for _, paths, revision in scopes:
+            for path in paths:
+                manifest[path] = revision
+            written.extend(paths)
+
+    save_manifest(output_dir, manifest)
+    return written, kept
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Exporta rankings, estatísticas dos jogadores e resultados dos torneios sem abrir o dashboard."
+    )
+    parser.add_argument('--db', default=None, help="Banco SQLite (padrão: o primeiro de DB_PATHS que existir)")
+    parser.add_argument('--output', default='exports', help="Diretório de saída (padrão: exports)")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='json', help="Formato dos arquivos")
+    parser.add_argument('--force', action='store_true', help="Regrava tudo, mesmo o que não mudou")
+    parser.add_argument('--workers', type=int, default=None, help=f"Processos para os rankings (padrão: até {MAX_WORKERS})")
+    args = parser.parse_args(argv)
+
+    db_path = args.db or resolve_db_path()
+    if db_path is None or not os.path.isfile(db_path):
+        parser.error("Banco de dados não encontrado.")
+
+    dataset = DataStore(db_path).dataset
+    written, kept = export_all(dataset, args.output, args.format, args.force, max_workers=args.workers)
+    print(f"Exportação em {args.output}: {len(written)} arquivo(s) gravado(s), {kept} sem alteração")
+
+
+if __name__ == '__main__':
+    main()
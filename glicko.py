@@ -1,74 +1,311 @@
-import math
-
-class GlickoPlayer:
-    def __init__(self, rating=1500, rd=350, vol=0.06):
-        self.rating = rating
-        self.rd = rd
-        self.vol = vol
-        self._tau = 0.5
-        self._scale = 173.7178
-
-    def _g(self, rd):
-        return 1.0 / math.sqrt(1 + 3 * rd ** 2 / (math.pi ** 2))
-
-    def _E(self, rating, opponent_rating, opponent_rd):
-        # Adicionar proteção contra overflow
-        exponent = -self._g(opponent_rd) * (rating - opponent_rating) / self._scale
-        # Limitar o valor do expoente para evitar overflow
-        exponent = max(min(exponent, 20), -20)
-        return 1.0 / (1 + math.exp(exponent))
-
-    def update_rating(self, opponent_rating, opponent_rd, score):
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Parâmetros do Glicko-2 (escala original: rating 1500, RD 350)
+SCALE = 173.7178
+DEFAULT_RATING = 1500
+DEFAULT_RD = 350
+DEFAULT_VOL = 0.06
+# Tau baixo limita a variação da volatilidade, adequado ao baixo volume de jogos
+TAU = 0.5
+EPSILON = 1e-6
+MAX_ITERATIONS = 100
+# Checkpoints guardados a cada N torneios (além do último)
+CHECKPOINT_EVERY = 10
+# Escopos com checkpoints mantidos; os usados há mais tempo são descartados
+CHECKPOINT_SCOPES = 64
+
+
+def _g(phi):
+    return 1.0 / np.sqrt(1 + 3 * phi ** 2 / np.pi ** 2)
+
+
+def _expected(mu, opponent_mu, g_opponent):
+    # Limita o expoente para evitar overflow
+    exponent = np.clip(-g_opponent * (mu - opponent_mu), -20, 20)
+    return 1.0 / (1 + np.exp(exponent))
+
+
+def _new_volatility(sigma, phi, v, delta, tau):
+    """Passo 5 do Glicko-2 (algoritmo de Illinois), vetorizado para todos os jogadores do período"""
+    a = np.log(sigma ** 2)
+    delta2 = delta ** 2
+    phi2 = phi ** 2
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (delta2 - phi2 - v - ex) / (2 * (phi2 + v + ex) ** 2) - (x - a) / tau ** 2
+
+    A = a.copy()
+    B = np.empty_like(a)
+    big = delta2 > phi2 + v
+    B[big] = np.log(delta2[big] - phi2[big] - v[big])
+    k = np.ones_like(a)
+    small = ~big
+    while small.any():
+        candidate = a - k * tau
+        negative = small & (f(candidate) < 0)
+        B[small & ~negative] = candidate[small & ~negative]
+        k[negative] += 1
+        small = negative
+
+    fA = f(A)
+    fB = f(B)
+    active = np.abs(B - A) > EPSILON
+    for _ in range(MAX_ITERATIONS):
+        if not active.any():
+            break
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        swap = active & (fC * fB <= 0)
+        halve = active & ~swap
+        A = np.where(swap, B, A)
+        fA = np.where(swap, fB, np.where(halve, fA / 2, fA))
+        B = np.where(active, C, B)
+        fB = np.where(active, fC, fB)
+        active = np.abs(B - A) > EPSILON
+
+    return np.exp(A / 2)
+
+
+class GlickoEngine:
+    """
+    Glicko-2 vetorizado em que cada torneio é um período de rating.
+    Rating, desvio e volatilidade ficam em arrays contíguos, indexados por um
+    índice denso de jogadores (0..n_players-1), na escala interna do Glicko-2.
+    """
+
+    def __init__(self, n_players, tau=TAU):
+        self.tau = tau
+        self.mu = np.zeros(n_players)
+        self.phi = np.full(n_players, DEFAULT_RD / SCALE)
+        self.sigma = np.full(n_players, DEFAULT_VOL)
+        self.seen = np.zeros(n_players, dtype=bool)
+
+    def rate_period(self, winners, losers):
+        """Atualiza os ratings com todos os jogos de um período (arrays de índices)"""
+        # Cada jogo gera duas observações: a do vencedor (1.0) e a do perdedor (0.0)
+        player = np.concatenate([winners, losers])
+        opponent = np.concatenate([losers, winners])
+        score = np.concatenate([np.ones(len(winners)), np.zeros(len(losers))])
+
+        g_opponent = _g(self.phi[opponent])
+        expected = _expected(self.mu[player], self.mu[opponent], g_opponent)
+
+        n_players = len(self.mu)
+        v_inv = np.bincount(player, weights=g_opponent ** 2 * expected * (1 - expected), minlength=n_players)
+        delta_sum = np.bincount(player, weights=g_opponent * (score - expected), minlength=n_players)
+
+        playing = np.unique(player)
+        v = 1.0 / v_inv[playing]
+        delta = v * delta_sum[playing]
+        sigma = _new_volatility(self.sigma[playing], self.phi[playing], v, delta, self.tau)
+
+        # Quem já jogou antes e ficou fora do período ganha incerteza
+        idle = self.seen.copy()
+        idle[playing] = False
+        self.phi[idle] = np.sqrt(self.phi[idle] ** 2 + self.sigma[idle] ** 2)
+
+        phi_star = np.sqrt(self.phi[playing] ** 2 + sigma ** 2)
+        new_phi = 1.0 / np.sqrt(1.0 / phi_star ** 2 + 1.0 / v)
+        self.mu[playing] += new_phi ** 2 * delta_sum[playing]
+        self.phi[playing] = new_phi
+        self.sigma[playing] = sigma
+        self.seen[playing] = True
+
+        # RD nunca passa do valor inicial
+        np.minimum(self.phi, DEFAULT_RD / SCALE, out=self.phi)
+
+    def run(self, winners, losers, period_starts):
+        """Processa os jogos em ordem, período a período (`period_starts`: início de cada período)"""
+        bounds = np.append(period_starts, len(winners))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end > start:
+                self.rate_period(winners[start:end], losers[start:end])
+        return self
+
+    def run_with_history(self, winners, losers, period_starts):
         """
-        Atualiza o rating do jogador após uma partida.
-        score: 1.0 para vitória, 0.0 para derrota, 0.5 para empate
+        Como `run`, mas registra rating e RD de vencedor e perdedor antes e depois
+        de cada jogo. Retorna (pre_rating, pre_rd, post_rating, post_rd), arrays
+        (n_jogos, 2) com o vencedor na coluna 0 e o perdedor na coluna 1.
         """
-        g = self._g(opponent_rd)
-        E = self._E(self.rating, opponent_rating, opponent_rd)
-        
-        # Adicionar proteção contra divisão por zero
-        if E <= 0 or E >= 1:
-            E = 0.5  # Valor neutro para evitar problemas
-        
-        v = 1.0 / (g ** 2 * E * (1 - E))
-        
-        # Atualizar rating
-        delta = v * g * (score - E)
-        
-        # Atualizar desvio de rating com proteção contra valores muito pequenos
-        new_rd_squared = 1 / (1 / (self.rd ** 2) + 1 / v)
-        if new_rd_squared > 0:
-            self.rd = min(350, math.sqrt(new_rd_squared))
+        pairs = np.column_stack([winners, losers])
+        pre_rating = np.empty(pairs.shape)
+        pre_rd = np.empty(pairs.shape)
+        post_rating = np.empty(pairs.shape)
+        post_rd = np.empty(pairs.shape)
+
+        bounds = np.append(period_starts, len(winners))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end == start:
+                continue
+            period = pairs[start:end]
+            pre_rating[start:end] = self.mu[period] * SCALE + DEFAULT_RATING
+            pre_rd[start:end] = self.phi[period] * SCALE
+            self.rate_period(winners[start:end], losers[start:end])
+            post_rating[start:end] = self.mu[period] * SCALE + DEFAULT_RATING
+            post_rd[start:end] = self.phi[period] * SCALE
+
+        return pre_rating, pre_rd, post_rating, post_rd
+
+    def state(self, player_ids):
+        """Cópia do estado atual, com os ids que definem o índice denso"""
+        return {
+            'player_ids': np.asarray(player_ids).copy(),
+            'mu': self.mu.copy(),
+            'phi': self.phi.copy(),
+            'sigma': self.sigma.copy(),
+            'seen': self.seen.copy(),
+        }
+
+    @classmethod
+    def from_state(cls, state, player_ids, tau=TAU):
+        """
+        Recria o motor a partir de um checkpoint sobre um novo índice denso
+        (`player_ids` ordenado e contendo todos os jogadores do checkpoint que já
+        jogaram; os demais estão no estado inicial e são descartados).
+        """
+        engine = cls(len(player_ids), tau)
+        kept = np.isin(state['player_ids'], player_ids)
+        positions = np.searchsorted(player_ids, state['player_ids'][kept])
+        engine.mu[positions] = state['mu'][kept]
+        engine.phi[positions] = state['phi'][kept]
+        engine.sigma[positions] = state['sigma'][kept]
+        engine.seen[positions] = state['seen'][kept]
+        return engine
+
+    def ratings(self):
+        """Retorna (rating, rd, vol) na escala original"""
+        return self.mu * SCALE + DEFAULT_RATING, self.phi * SCALE, self.sigma.copy()
+
+
+class GlickoCheckpoints:
+    """
+    Checkpoints do estado do Glicko-2 ao longo da sequência cronológica de
+    torneios de cada escopo (ex.: categoria + início do período).
+
+    Para cada escopo guarda a sequência de (torneio, revisão) processada e o
+    estado após cada CHECKPOINT_EVERY torneios, mais o último. Uma nova consulta
+    retoma do checkpoint mais próximo dentro do prefixo em comum e reprocessa
+    apenas os torneios seguintes; uma consulta "após o torneio T" é um prefixo
+    da sequência e não altera os checkpoints.
+
+    Guarda no máximo `max_scopes` escopos (LRU): os períodos móveis mudam de
+    início a cada dia, e os escopos de dias anteriores deixam de ser usados.
+    """
+
+    def __init__(self, every=CHECKPOINT_EVERY, max_scopes=CHECKPOINT_SCOPES):
+        self.every = every
+        self.max_scopes = max_scopes
+        self._scopes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._scopes)
+
+    def rate(self, key, periods, player_ids, winners, losers, period_starts):
+        """
+        Processa os jogos de `periods` (lista de (torneio, revisão), alinhada a
+        `period_starts`) e retorna o GlickoEngine resultante.
+        """
+        periods = list(periods)
+        with self._lock:
+            sequence, checkpoints = self._scopes.get(key, ([], {}))
+            if key in self._scopes:
+                self._scopes.move_to_end(key)
+
+        common = 0
+        for stored, current in zip(sequence, periods):
+            if stored != current:
+                break
+            common += 1
+
+        resume = max((n for n in checkpoints if n <= common), default=0)
+        # O índice atual pode não ter quem só joga depois do checkpoint (ex.: consulta "após o torneio T")
+        if resume and (np.isin(checkpoints[resume]['player_ids'], player_ids) | ~checkpoints[resume]['seen']).all():
+            engine = GlickoEngine.from_state(checkpoints[resume], player_ids)
         else:
-            self.rd = 350  # Valor padrão em caso de erro
-        
-        # Atualizar rating
-        self.rating = self.rating + delta
-        
-        # Atualizar volatilidade (simplificado)
-        self.vol = math.sqrt((self.vol ** 2 + delta ** 2) / 2)
-
-        return self.rating, self.rd, self.vol
-
-class GlickoSystem:
-    def __init__(self):
-        self.players = {}
-
-    def get_player(self, player_id):
-        if player_id not in self.players:
-            self.players[player_id] = GlickoPlayer()
-        return self.players[player_id]
-
-    def update_match(self, winner_id, loser_id):
-        """Atualiza os ratings após uma partida"""
-        winner = self.get_player(winner_id)
-        loser = self.get_player(loser_id)
-
-        # Atualizar ratings
-        winner.update_rating(loser.rating, loser.rd, 1.0)
-        loser.update_rating(winner.rating, winner.rd, 0.0)
-
-    def get_rating(self, player_id):
-        """Retorna o rating atual do jogador"""
-        player = self.get_player(player_id)
-        return player.rating, player.rd, player.vol 
\ No newline at end of file
+            resume = 0
+            engine = GlickoEngine(len(player_ids))
+
+        bounds = np.append(period_starts, len(winners))
+        new_checkpoints = {}
+        for i in range(resume, len(periods)):
+            start, end = bounds[i], bounds[i + 1]
+            if end > start:
+                engine.rate_period(winners[start:end], losers[start:end])
+            n = i + 1
+            if n % self.every == 0 or n == len(periods):
+                new_checkpoints[n] = engine.state(player_ids)
+
+        # Consulta que é prefixo da sequência guardada não altera os checkpoints
+        if common < len(periods):
+            kept = {n: state for n, state in checkpoints.items() if n <= common and n % self.every == 0}
+            kept.update(new_checkpoints)
+            with self._lock:
+                self._scopes[key] = (periods, kept)
+                self._scopes.move_to_end(key)
+                while len(self._scopes) > self.max_scopes:
+                    self._scopes.popitem(last=False)
+
+        return engine
+
+
+class RatingHistory:
+    """
+    Histórico de rating por jogador, em formato CSR: as entradas do jogador
+    `player_ids[i]` ficam em `indptr[i]:indptr[i + 1]`, em ordem cronológica,
+    com a data (AAAAMMDD) em `date_key` para busca binária. Os jogos devem vir
+    na ordem em que foram processados, com datas não decrescentes.
+    """
+
+    def __init__(self, player_ids, winners, losers, date_keys, match_ids, pre_rating, pre_rd, post_rating, post_rd):
+        self.player_ids = np.asarray(player_ids)
+        n_matches = len(winners)
+
+        # Uma entrada por jogador por jogo, na ordem de processamento (que segue a data)
+        player = np.concatenate([winners, losers])
+        sequence = np.tile(np.arange(n_matches), 2)
+        order = np.lexsort((sequence, player))
+
+        counts = np.bincount(player, minlength=len(self.player_ids))
+        self.indptr = np.concatenate([[0], np.cumsum(counts)])
+        self.date_key = np.tile(np.asarray(date_keys, dtype=np.int32), 2)[order]
+        self.match_id = np.tile(np.asarray(match_ids, dtype=np.int32), 2)[order]
+        self.opponent_id = self.player_ids[np.concatenate([losers, winners])][order].astype(np.int32)
+        self.won = np.repeat([True, False], n_matches)[order]
+        self.pre_rating = np.asarray(pre_rating, dtype=np.float32).T.ravel()[order]
+        self.pre_rd = np.asarray(pre_rd, dtype=np.float32).T.ravel()[order]
+        self.post_rating = np.asarray(post_rating, dtype=np.float32).T.ravel()[order]
+        self.post_rd = np.asarray(post_rd, dtype=np.float32).T.ravel()[order]
+
+    def _bounds(self, player_id):
+        position = np.searchsorted(self.player_ids, player_id)
+        if position == len(self.player_ids) or self.player_ids[position] != player_id:
+            return 0, 0
+        return self.indptr[position], self.indptr[position + 1]
+
+    def timeline(self, player_id):
+        """Entradas do jogador em ordem cronológica, como dicionário de arrays"""
+        start, end = self._bounds(player_id)
+        return {
+            'date_key': self.date_key[start:end],
+            'match_id': self.match_id[start:end],
+            'opponent_id': self.opponent_id[start:end],
+            'won': self.won[start:end],
+            'pre_rating': self.pre_rating[start:end],
+            'pre_rd': self.pre_rd[start:end],
+            'post_rating': self.post_rating[start:end],
+            'post_rd': self.post_rd[start:end],
+        }
+
+    def rating_on(self, player_id, date_key):
+        """(rating, rd) do jogador após os jogos até `date_key` (inclusive); None se ainda não jogou"""
+        start, end = self._bounds(player_id)
+        position = start + np.searchsorted(self.date_key[start:end], date_key, side='right')
+        if position == start:
+            return None
+        return float(self.post_rating[position - 1]), float(self.post_rd[position - 1])
@@ -0,0 +1,370 @@
+import json
+import os
+import pathlib
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# Tabela materializada que substitui a view `matches` (que reprocessa scores_csv
+# com SUBSTR/INSTR a cada leitura). Ela fica em um banco de cache próprio, fora do
+# banco do scraper, que é apenas lido. Incrementar MATCHES_TABLE_VERSION sempre
+# que as colunas mudarem: a tabela é recriada na próxima carga.
+MATCHES_CACHE_PATH = os.path.join('.cache', 'matches.sqlite')
+MATCHES_TABLE = 'matches_materialized'
+STATE_TABLE = 'matches_materialized_state'
+MATCHES_TABLE_VERSION = 3
+
+# Nome do banco de origem anexado à conexão do cache
+SOURCE_SCHEMA = 'source'
+
+# Tabelas de origem acompanhadas pelos watermarks (maior id, maior updated_at, contagem)
+SOURCE_TABLES = ('challonge_tournaments', 'challonge_matches', 'challonge_participants')
+
+# Sets com games registrados individualmente (set1_winner_games ... setN_loser_games)
+MAX_SETS = 5
+SET_GAME_COLUMNS = tuple(
+    f"set{n}_{side}_games" for n in range(1, MAX_SETS + 1) for side in ('winner', 'loser')
+)
+
+# Marcações de W.O. e de abandono no texto do placar
+WALKOVER_PATTERN = r'\bw\.?\s*o\b|walk\s*over'
+RETIRED_PATTERN = r'\bret|abandon|desist'
+
+MATCHES_TABLE_COLUMNS = """
+    match_id INTEGER PRIMARY KEY,
+    winner_id INTEGER NOT NULL,
+    winner_name TEXT,
+    loser_id INTEGER NOT NULL,
+    loser_name TEXT,
+    score TEXT,
+    set_balance INTEGER,
+    tournament_id INTEGER NOT NULL,
+    tournament_name TEXT,
+    tournament_category TEXT,
+    started_month_year TEXT,
+    started_year TEXT,
+    round INTEGER,
+    winner_sets INTEGER,
+    loser_sets INTEGER,
+    winner_games INTEGER,
+    loser_games INTEGER,
+""" + "".join(f"    {column} INTEGER,\n" for column in SET_GAME_COLUMNS) + """\
+    sets_played INTEGER,
+    tiebreak INTEGER NOT NULL,
+    walkover INTEGER NOT NULL,
+    retired INTEGER NOT NULL,
+    started_date_key INTEGER
+"""
+
+NULLABLE_INT_COLUMNS = (
+    'set_balance', 'round', 'winner_sets', 'loser_sets', 'winner_games', 'loser_games',
+    *SET_GAME_COLUMNS, 'sets_played', 'started_date_key'
+)
+SCORE_FLAG_COLUMNS = ('tiebreak', 'walkover', 'retired')
+
+# Mesmo conteúdo da view `matches`, sem o parsing do placar (feito em Python)
+SOURCE_QUERY = """
+    SELECT
+        m.id AS match_id,
+        w.id AS winner_id,
+        w.display_name AS winner_name,
+        l.id AS loser_id,
+        l.display_name AS loser_name,
+        m.scores_csv AS score,
+        m.player1_id AS player1_id,
+        t.id AS tournament_id,
+        t."name" AS tournament_name,
+        t.category AS tournament_category,
+        strftime('%m/%Y', t.started_at) AS started_month_year,
+        strftime('%Y', t.started_at) AS started_year,
+        CAST(strftime('%Y%m%d', t.started_at) AS INTEGER) AS started_date_key,
+        m.round AS round
+    FROM {schema}.challonge_matches m
+    JOIN {schema}.challonge_tournaments t ON t.id = m.tournament_id
+    JOIN {schema}.challonge_participants w ON w.id = m.winner_id
+    JOIN {schema}.challonge_participants l ON l.id = m.loser_id
+"""
+
+
+def _in_clause(values):
+    return ", ".join("?" for _ in values)
+
+
+def _table_exists(conn, name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def read_watermarks(conn, schema='main'):
+    """Lê o maior id, o maior updated_at e a contagem de linhas de cada tabela de origem"""
+    watermarks = {}
+    for table in SOURCE_TABLES:
+        max_id, max_updated_at, count = conn.execute(
+            f"SELECT MAX(id), MAX(updated_at), COUNT(*) FROM {schema}.{table}"
+        ).fetchone()
+        watermarks[table] = {
+            'max_id': max_id or 0,
+            'max_updated_at': max_updated_at or '',
+            'count': count
+        }
+    return watermarks
+
+
+def changed_source_rows(conn, watermarks, schema='main'):
+    """
+    Linhas (id, torneio) de cada tabela de origem inseridas ou alteradas desde
+    `watermarks`; None quando alguma linha foi removida (a contagem não fecha)
+    """
+    new_watermarks = read_watermarks(conn, schema)
+    changed = {}
+    for table in SOURCE_TABLES:
+        old, new = watermarks[table], new_watermarks[table]
+        tournament_column = 'id' if table == 'challonge_tournaments' else 'tournament_id'
+        rows = conn.execute(
+            f"SELECT id, {tournament_column} FROM {schema}.{table} WHERE id > ? OR updated_at > ?",
+            (old['max_id'], old['max_updated_at'])
+        ).fetchall()
+        inserted = sum(1 for row_id, _ in rows if row_id > old['max_id'])
+        if new['count'] != old['count'] + inserted:
+            return None
+        changed[table] = rows
+    return changed
+
+
+def parse_set_scores(score, winner_is_player1):
+    """
+    Converte scores_csv no placar estruturado do vencedor/perdedor: sets, games
+    (total e por set), sets jogados e as marcações de tiebreak, W.O. e abandono.
+    Aceita placar só de sets ('"2-1"') ou games por set ('6-4,3-6,7-5').
+
+    Tiebreak: algum set 7-6 ou um match tiebreak (10 pontos ou mais). W.O.:
+    marcação no texto ou partida sem nenhum game/set registrado.
+    """
+    text = score.fillna('').astype(str).str.strip('"')
+    sets = text.str.split(',').explode()
+    parts = sets.str.extract(r'^\s*(\d+)\s*-\s*(\d+)')
+    first = pd.to_numeric(parts[0], errors='coerce')
+    second = pd.to_numeric(parts[1], errors='coerce')
+
+    grouped = pd.DataFrame({'first': first, 'second': second}).groupby(level=0)
+    n_sets = grouped['first'].count()
+    first_total = grouped['first'].sum(min_count=1)
+    second_total = grouped['second'].sum(min_count=1)
+    first_won = (first > second).groupby(level=0).sum()
+    second_won = (second > first).groupby(level=0).sum()
+
+    multi_set = n_sets > 1
+    # Placar de um único segmento já é o placar em sets
+    first_sets = first_won.where(multi_set, first_total)
+    second_sets = second_won.where(multi_set, second_total)
+
+    # Sem player1 conhecido, o vencedor é quem tem mais sets (como na view)
+    orientation = winner_is_player1.where(winner_is_player1.notna(), first_sets >= second_sets).astype(bool)
+    winner_sets = first_sets.where(orientation, second_sets)
+    loser_sets = second_sets.where(orientation, first_sets)
+    winner_games = first_total.where(orientation, second_total).where(multi_set)
+    loser_games = second_total.where(orientation, first_total).where(multi_set)
+
+    parsed = pd.DataFrame({
+        'winner_sets': winner_sets,
+        'loser_sets': loser_sets,
+        'winner_games': winner_games,
+        'loser_games': loser_games,
+    }, index=score.index)
+
+    # Games de cada set (só no placar por set), já do ponto de vista do vencedor
+    set_number = sets.groupby(level=0).cumcount().to_numpy() + 1
+    row_orientation = orientation.reindex(sets.index).to_numpy()
+    winner_set_games = first.where(row_orientation, second)
+    loser_set_games = second.where(row_orientation, first)
+    in_multi_set = multi_set.reindex(sets.index).to_numpy()
+    for n in range(1, MAX_SETS + 1):
+        selected = in_multi_set & (set_number == n)
+        for side, games in (('winner', winner_set_games), ('loser', loser_set_games)):
+            parsed[f"set{n}_{side}_games"] = games[selected].groupby(level=0).first()
+
+    parsed['sets_played'] = winner_sets + loser_sets
+
+    high = np.maximum(first, second)
+    low = np.minimum(first, second)
+    set_tiebreak = in_multi_set & (((high == 7) & (low == 6)) | (high >= 10)).to_numpy()
+    parsed['tiebreak'] = pd.Series(set_tiebreak, index=sets.index).groupby(level=0).any()
+    no_play = (first_total.fillna(0) + second_total.fillna(0)) == 0
+    parsed['walkover'] = text.str.contains(WALKOVER_PATTERN, case=False, regex=True) | no_play
+    parsed['retired'] = text.str.contains(RETIRED_PATTERN, case=False, regex=True)
+
+    integer_columns = ['winner_sets', 'loser_sets', 'winner_games', 'loser_games', *SET_GAME_COLUMNS, 'sets_played']
+    return parsed.astype({column: 'Int64' for column in integer_columns}).astype(
+        {column: bool for column in SCORE_FLAG_COLUMNS}
+    )
+
+
+def build_matches_frame(conn, tournament_ids=None, schema='main'):
+    """Monta as linhas da tabela materializada a partir das tabelas de origem"""
+    query = SOURCE_QUERY.format(schema=schema)
+    params = ()
+    if tournament_ids is not None:
+        query += f" WHERE m.tournament_id IN ({_in_clause(tournament_ids)})"
+        params = tuple(tournament_ids)
+    rows = pd.read_sql_query(query + " ORDER BY m.id", conn, params=params)
+
+    player1 = pd.to_numeric(rows['player1_id'], errors='coerce')
+    winner_is_player1 = pd.Series(
+        np.where(player1.isna(), None, player1 == rows['winner_id']), index=rows.index, dtype=object
+    )
+    scores = parse_set_scores(rows['score'], winner_is_player1)
+    rows = rows.drop(columns=['player1_id']).join(scores)
+    rows['set_balance'] = rows['winner_sets'] - rows['loser_sets']
+
+    columns = [line.split()[0] for line in MATCHES_TABLE_COLUMNS.strip().splitlines()]
+    return rows[columns].astype({column: 'Int64' for column in NULLABLE_INT_COLUMNS})
+
+
+def _create_schema(conn):
+    """(Re)cria tabela, índices e tabela de controle no banco de cache"""
+    conn.execute(f"DROP TABLE IF EXISTS {MATCHES_TABLE}")
+    conn.execute(f"CREATE TABLE {MATCHES_TABLE} ({MATCHES_TABLE_COLUMNS})")
+    conn.execute(f"CREATE INDEX {MATCHES_TABLE}_tournament_round ON {MATCHES_TABLE} (tournament_id, round)")
+    conn.execute(f"CREATE INDEX {MATCHES_TABLE}_winner ON {MATCHES_TABLE} (winner_id)")
+    conn.execute(f"CREATE INDEX {MATCHES_TABLE}_loser ON {MATCHES_TABLE} (loser_id)")
+
+    conn.execute(f"DROP TABLE IF EXISTS {STATE_TABLE}")
+    conn.execute(
+        f"CREATE TABLE {STATE_TABLE} (version INTEGER NOT NULL, source TEXT NOT NULL, watermarks TEXT NOT NULL)"
+    )
+
+
+def _write_rows(conn, rows):
+    # Int64 com <NA> precisa virar objeto com None para o sqlite3
+    rows = rows.astype(object).where(rows.notna(), None)
+    placeholders = _in_clause(rows.columns)
+    conn.executemany(
+        f"INSERT INTO {MATCHES_TABLE} ({', '.join(rows.columns)}) VALUES ({placeholders})",
+        rows.itertuples(index=False, name=None)
+    )
+
+
+def _read_state(conn):
+    """(versão, banco de origem, watermarks) da última atualização; None se não há tabela"""
+    if not _table_exists(conn, STATE_TABLE) or not _table_exists(conn, MATCHES_TABLE):
+        return None
+    row = conn.execute(f"SELECT version, source, watermarks FROM {STATE_TABLE}").fetchone()
+    if row is None:
+        return None
+    return row[0], row[1], json.loads(row[2])
+
+
+def _write_state(conn, source, watermarks):
+    conn.execute(f"DELETE FROM {STATE_TABLE}")
+    conn.execute(
+        f"INSERT INTO {STATE_TABLE} (version, source, watermarks) VALUES (?, ?, ?)",
+        (MATCHES_TABLE_VERSION, source, json.dumps(watermarks))
+    )
+
+
+def refresh_matches_table(conn, source):
+    """
+    Garante que a tabela materializada (banco de cache em `conn`, com o banco de
+    origem `source` anexado como SOURCE_SCHEMA) está em dia com as tabelas de
+    origem. Reconstrói tudo na primeira vez, se a versão ou o banco de origem
+    mudaram ou se linhas foram removidas; depois, apenas os torneios com linhas
+    novas ou alteradas desde os watermarks (id e updated_at) da última
+    atualização. Retorna os ids dos torneios reconstruídos (None quando houve
+    reconstrução completa).
+    """
+    with conn:
+        state = _read_state(conn)
+        watermarks = read_watermarks(conn, SOURCE_SCHEMA)
+        changed = None
+        if state is not None and state[:2] == (MATCHES_TABLE_VERSION, source):
+            if state[2] == watermarks:
+                return set()
+            changed = changed_source_rows(conn, state[2], SOURCE_SCHEMA)
+
+        if changed is None:
+            _create_schema(conn)
+            _write_rows(conn, build_matches_frame(conn, schema=SOURCE_SCHEMA))
+            _write_state(conn, source, watermarks)
+            return None
+
+        tournament_ids = set()
+        for table in SOURCE_TABLES:
+            tournament_ids |= {tournament_id for _, tournament_id in changed[table]}
+        participant_ids = sorted(row_id for row_id, _ in changed['challonge_participants'])
+        if participant_ids:
+            # Participantes aparecem nas partidas de todos os torneios que disputaram
+            placeholders = _in_clause(participant_ids)
+            tournament_ids |= {
+                t for (t,) in conn.execute(
+                    f"SELECT DISTINCT tournament_id FROM {SOURCE_SCHEMA}.challonge_matches "
+                    f"WHERE winner_id IN ({placeholders}) OR loser_id IN ({placeholders})",
+                    participant_ids + participant_ids
+                )
+            }
+
+        tournament_ids = sorted(tournament_ids)
+        if tournament_ids:
+            conn.execute(
+                f"DELETE FROM {MATCHES_TABLE} WHERE tournament_id IN ({_in_clause(tournament_ids)})",
+                tournament_ids
+            )
+            _write_rows(conn, build_matches_frame(conn, tournament_ids, SOURCE_SCHEMA))
+        _write_state(conn, source, watermarks)
+        return set(tournament_ids)
+
+
+def _source_uri(db_path):
+    """URI do banco de origem em modo somente leitura"""
+    return pathlib.Path(os.path.abspath(db_path)).as_uri() + '?mode=ro'
+
+
+def ensure_matches_table(db_path, cache_path=MATCHES_CACHE_PATH):
+    """
+    Atualiza a tabela materializada no banco de cache, lendo o banco de origem
+    sem alterá-lo. Retorna o caminho do cache, ou None se ele não puder ser usado.
+    """
+    source = os.path.abspath(db_path)
+    try:
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(cache_path, uri=True)
+    except (OSError, sqlite3.OperationalError) as e:
+        print(f"Tabela {MATCHES_TABLE} indisponível, usando consulta direta: {e}")
+        return None
+    try:
+        conn.execute("ATTACH DATABASE ? AS " + SOURCE_SCHEMA, (_source_uri(db_path),))
+        refresh_matches_table(conn, source)
+        return cache_path
+    except sqlite3.Error as e:
+        print(f"Tabela {MATCHES_TABLE} indisponível, usando consulta direta: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def read_matches(conn, cache_path, tournament_ids=None):
+    """
+    Lê as partidas da tabela materializada no banco de cache `cache_path` ou,
+    sem cache, direto das tabelas de origem (conexão `conn`)
+    """
+    if cache_path is None:
+        return build_matches_frame(conn, tournament_ids)
+
+    cache_conn = sqlite3.connect(cache_path)
+    try:
+        rows = _read_materialized(cache_conn, tournament_ids)
+    finally:
+        cache_conn.close()
+    # Colunas inteiras que aceitam NULL voltam do sqlite como float/objeto
+    rows = rows.astype({column: 'Int64' for column in NULLABLE_INT_COLUMNS})
+    return rows.astype({column: bool for column in SCORE_FLAG_COLUMNS})
+
+
+def _read_materialized(conn, tournament_ids):
+    query = f"SELECT * FROM {MATCHES_TABLE}"
+    params = ()
+    if tournament_ids is not None:
+        query += f" WHERE tournament_id IN ({_in_clause(tournament_ids)})"
+        params = tuple(tournament_ids)
+    return pd.read_sql_query(query + " ORDER BY match_id", conn, params=params)
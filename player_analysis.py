@@ -1,6 +1,10 @@
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import streamlit as st
+from player_index import HeadToHead, PlayerMatchIndex
+from player_summary import ROUND_NAMES, ROUND_ORDER
+from rankings import calculate_player_streaks, calculate_player_summary, calculate_rating_history, get_ranking_cache
 
 def is_finals_tournament(tournament_name):
     """Verifica se é um torneio FINALS"""
@@ -8,113 +12,105 @@ def is_finals_tournament(tournament_name):
 
 def get_round_name(round_number, tournament_name):
     """Retorna o nome da fase baseado no número e tipo do torneio"""
-    if is_finals_tournament(tournament_name):
-        round_names = {
-            1: 'Quartas de Final',
-            2: 'Semifinal',
-            3: 'Final'
-        }
-    else:
-        round_names = {
-            1: 'Primeira',
-            2: 'Quartas de Final',
-            3: 'Semifinal',
-            4: 'Final'
-        }
+    round_names = ROUND_NAMES[is_finals_tournament(tournament_name)]
     return round_names.get(round_number, f'Fase {round_number}')
 
-def is_final_round(round_number, tournament_name):
-    """Verifica se é a rodada final do torneio"""
-    return (is_finals_tournament(tournament_name) and round_number == 3) or \
-           (not is_finals_tournament(tournament_name) and round_number == 4)
+def _by_value(series, func):
+    """
+    Aplica `func` uma vez por valor distinto da Series (ex.: categorias de um
+    categórico) e espalha o resultado pelas linhas; valores nulos recebem func(None).
+    """
+    codes, uniques = pd.factorize(series)
+    values = [func(value) for value in uniques] + [func(None)]
+    return np.asarray(values, dtype=object)[codes]
 
-def get_player_stats(matches, player_id):
-    """Calcula estatísticas do jogador"""
-    # Garantir que matches é um DataFrame válido
-    if matches is None or matches.empty:
-        return {
-            'total_matches': 0,
-            'wins': 0,
-            'losses': 0,
-            'win_rate': 0,
-            'titles': 0
-        }
+def get_round_names(rounds, tournament_names):
+    """get_round_name vetorizado para Series alinhadas; rodadas nulas viram 'N/A'"""
+    finals = _by_value(tournament_names, is_finals_tournament).astype(bool)
+    rounds = rounds.astype('float64').to_numpy()
+    names = np.full(len(rounds), 'N/A', dtype=object)
+    valid = ~np.isnan(rounds)
+    for is_finals, round_names in ROUND_NAMES.items():
+        for round_number, name in round_names.items():
+            names[valid & (finals == is_finals) & (rounds == round_number)] = name
+    other = valid & (names == 'N/A')
+    names[other] = [f'Fase {int(round_number)}' for round_number in rounds[other]]
+    return names
 
-    # Filtrar partidas do jogador com verificação de valores nulos
-    player_matches = matches[
-        (matches['winner_id'].notna() & matches['loser_id'].notna()) &
-        ((matches['winner_id'] == player_id) | (matches['loser_id'] == player_id))
-    ]
-    
-    if player_matches.empty:
-        return {
-            'total_matches': 0,
-            'wins': 0,
-            'losses': 0,
-            'win_rate': 0,
-            'titles': 0
-        }
-    
-    total_matches = len(player_matches)
-    wins = len(player_matches[player_matches['winner_id'] == player_id])
-    losses = total_matches - wins
-    win_rate = (wins / total_matches * 100) if total_matches > 0 else 0
-    
-    # Títulos (vitórias na rodada final)
-    titles = len(player_matches[
-        (player_matches['winner_id'] == player_id) & 
-        player_matches.apply(lambda x: is_final_round(x['round'], x['tournament_name']), axis=1)
-    ])
-    
-    return {
-        'total_matches': total_matches,
-        'wins': wins,
-        'losses': losses,
-        'win_rate': win_rate,
-        'titles': titles
-    }
+def format_scores(matches):
+    """
+    Placar em sets com o número maior primeiro ('2x1'), a partir das colunas do
+    placar estruturado; 'W.O.' para W.O., '(abandono)' quando houve desistência.
+    """
+    winner_sets = matches['winner_sets'].astype('float64').to_numpy()
+    loser_sets = matches['loser_sets'].astype('float64').to_numpy()
+    scored = ~np.isnan(winner_sets) & ~np.isnan(loser_sets)
+    high = np.fmax(winner_sets, loser_sets)
+    low = np.fmin(winner_sets, loser_sets)
+    labels = np.full(len(matches), 'N/A', dtype=object)
+    labels[scored] = np.char.add(
+        np.char.add(high[scored].astype(int).astype(str), 'x'), low[scored].astype(int).astype(str)
+    )
+    labels[matches['walkover'].to_numpy()] = 'W.O.'
+    retired = matches['retired'].to_numpy()
+    labels[retired] = labels[retired] + ' (abandono)'
+    return labels
 
-def get_round_distribution(matches, player_id):
-    """Calcula distribuição de rodadas alcançadas"""
-    player_matches = matches[
-        (matches['winner_id'] == player_id) | 
-        (matches['loser_id'] == player_id)
-    ]
-    
-    # Agrupa por torneio e rodada para evitar duplicatas
-    tournament_rounds = player_matches.groupby(['tournament_name', 'round']).first().reset_index()
-    
-    # Mapeia as rodadas para nomes descritivos considerando o tipo de torneio
-    round_counts = {}
-    for _, row in tournament_rounds.iterrows():
-        round_name = get_round_name(row['round'], row['tournament_name'])
-        round_counts[round_name] = round_counts.get(round_name, 0) + 1
-    
-    # Converte para Series e ordena pela ordem natural das rodadas
-    round_order = ['Primeira', 'Quartas de Final', 'Semifinal', 'Final']
-    round_counts = pd.Series(round_counts)
-    round_counts = round_counts.reindex(round_order).fillna(0)
-    
-    return round_counts
+def get_player_index(dataset):
+    """Índice jogador -> partidas da versão atual dos dados (montado uma vez por versão)"""
+    return get_ranking_cache().get_or_compute(
+        ('player_index',), dataset.version, lambda: PlayerMatchIndex(dataset.matches)
+    )
 
-def get_head_to_head(matches, player1_id, player2_id):
-    """Calcula estatísticas head-to-head entre dois jogadores"""
-    h2h_matches = matches[
-        ((matches['winner_id'] == player1_id) & (matches['loser_id'] == player2_id)) |
-        ((matches['winner_id'] == player2_id) & (matches['loser_id'] == player1_id))
-    ]
-    
-    player1_wins = len(h2h_matches[h2h_matches['winner_id'] == player1_id])
-    player2_wins = len(h2h_matches[h2h_matches['winner_id'] == player2_id])
+def get_head_to_head_index(dataset):
+    """Confrontos diretos de todos os pares da versão atual dos dados (montado uma vez por versão)"""
+    return get_ranking_cache().get_or_compute(
+        ('head_to_head',), dataset.version, lambda: HeadToHead(dataset.matches)
+    )
+
+def get_player_stats(summary, player_id):
+    """Estatísticas do jogador: uma linha da tabela de todos os jogadores (PlayerSummary)"""
+    return summary.stats(player_id)
+
+def get_round_distribution(summary, player_id):
+    """Distribuição de rodadas alcançadas pelo jogador, na ordem natural das rodadas"""
+    return summary.round_distribution(player_id)
+
+def get_head_to_head(head_to_head, player1_id, player2_id):
+    """Calcula estatísticas head-to-head entre dois jogadores (`head_to_head`: HeadToHead)"""
+    total_matches, player1_wins, player2_wins = head_to_head.record(player1_id, player2_id)
     
     return {
-        'total_matches': len(h2h_matches),
+        'total_matches': total_matches,
         'player1_wins': player1_wins,
         'player2_wins': player2_wins
     }
 
+def get_opponent_records(head_to_head, players, player_id):
+    """Retrospecto do jogador contra cada adversário, dos mais enfrentados aos menos"""
+    rivals = head_to_head.rivals(player_id)
+    if rivals.empty:
+        return pd.DataFrame()
+    
+    player_names = players.set_index('id')['name'].str.upper()
+    last_meetings = head_to_head.matches.iloc[rivals['last_row'].to_numpy()]
+    win_rate = rivals['wins'] / rivals['meetings'] * 100
+    return pd.DataFrame({
+        'Adversário': rivals['opponent_id'].map(player_names).fillna('N/A'),
+        'Jogos': rivals['meetings'],
+        'Vitórias': rivals['wins'],
+        'Derrotas': rivals['losses'],
+        'Aproveitamento': win_rate.map(lambda rate: f"{rate:.1f}%"),
+        'Último Confronto': last_meetings['started_at'].dt.strftime('%d/%m/%Y').fillna('N/A').to_numpy(),
+    })
+
 def get_match_history(matches, players, player_id):
-    """Obtém o histórico de jogos de um jogador com informações detalhadas"""
+    """
+    Obtém o histórico de jogos de um jogador com informações detalhadas
+    (`matches`: partidas do jogador ou um recorte delas, ex.: o head-to-head).
+    As colunas são montadas de forma vetorizada; placar e torneio são
+    formatados uma vez por valor distinto.
+    """
     # Verificar se temos dados válidos
     if matches is None or matches.empty or players is None or players.empty:
         return pd.DataFrame()
@@ -129,74 +125,33 @@ def get_match_history(matches, players, player_id):
     if player_matches.empty:
         return pd.DataFrame()
     
-    # Adiciona nome do oponente com verificação de valores nulos
-    player_matches['opponent_id'] = player_matches.apply(
-        lambda x: x['loser_id'] if x['winner_id'] == player_id else x['winner_id'],
-        axis=1
-    )
+    won = (player_matches['winner_id'] == player_id).to_numpy()
     
-    # Criar um dicionário de nomes de jogadores para evitar problemas de índice
-    player_names = players.set_index('id')['name'].str.upper().to_dict()
+    # Adversário e resultado
+    player_matches['opponent_id'] = np.where(won, player_matches['loser_id'], player_matches['winner_id'])
+    player_names = players.set_index('id')['name'].str.upper()
     player_matches['opponent_name'] = player_matches['opponent_id'].map(player_names)
+    player_matches['result'] = np.where(won, 'Vitória', 'Derrota')
     
-    # Adiciona resultado e placar formatado
-    player_matches['result'] = player_matches.apply(
-        lambda x: 'Vitória' if x['winner_id'] == player_id else 'Derrota',
-        axis=1
-    )
+    # Placar e sets jogados vêm do placar estruturado do carregamento
+    player_matches['score_formatted'] = format_scores(player_matches)
+    player_matches['sets_played'] = player_matches['sets_played'].fillna(0).astype(int)
     
-    # Formata o placar sempre com o número maior primeiro
-    def format_score(row):
-        try:
-            if pd.isna(row['score']):
-                return "N/A"
-            score_str = str(row['score']).strip('"')
-            if not score_str or score_str == 'nan':
-                return "N/A"
-            sets = [int(s) for s in score_str.split('-')]
-            return f"{max(sets)}x{min(sets)}"
-        except (ValueError, AttributeError):
-            return "N/A"
-    
-    # Aplica a formatação do placar
-    player_matches['score_formatted'] = player_matches.apply(format_score, axis=1)
-    
-    # Calcula o número real de sets jogados baseado no placar
-    def calculate_sets_played(score):
-        try:
-            if pd.isna(score):
-                return 0
-            score_str = str(score).strip('"')
-            if not score_str or score_str == 'nan':
-                return 0
-            sets = [int(s) for s in score_str.split('-')]
-            return sum(sets)
-        except (ValueError, AttributeError):
-            return 0
-    
-    player_matches['sets_played'] = player_matches['score'].apply(calculate_sets_played)
-    
-    # Mapeia as rodadas para nomes mais descritivos com verificação de valores nulos
-    player_matches['round_name'] = player_matches.apply(
-        lambda x: get_round_name(x['round'], x['tournament_name']) if pd.notna(x['round']) else 'N/A',
-        axis=1
-    )
+    # Nome da fase pela tabela de rodadas
+    player_matches['round_name'] = get_round_names(player_matches['round'], player_matches['tournament_name'])
     
-    # Adiciona informações do torneio
-    player_matches['tournament_info'] = player_matches.apply(
-        lambda x: f"{x['tournament_name'] or 'N/A'} ({x['tournament_category'] or 'N/A'})",
-        axis=1
+    # Adiciona informações do torneio, uma vez por torneio
+    tournament_info = player_matches.drop_duplicates('tournament_id').set_index('tournament_id')
+    tournament_info = (
+        tournament_info['tournament_name'].astype(object).fillna('N/A').astype(str) + " (" +
+        tournament_info['tournament_category'].astype(object).fillna('N/A').astype(str) + ")"
     )
+    player_matches['tournament_info'] = player_matches['tournament_id'].map(tournament_info)
     
-    # Ordena por data do torneio se disponível
-    if 'started_month_year' in player_matches.columns:
-        player_matches['tournament_date'] = pd.to_datetime(
-            player_matches['started_month_year'],
-            format='%m/%Y',
-            errors='coerce'
-        )
-        player_matches = player_matches.sort_values('tournament_date', ascending=False)
-        player_matches['tournament_date'] = player_matches['tournament_date'].dt.strftime('%d/%m/%Y')
+    # Ordena por data do torneio (mais recentes primeiro) se disponível
+    if 'started_at' in player_matches.columns:
+        player_matches = player_matches.sort_values(['sort_key', 'round'], ascending=False)
+        player_matches['tournament_date'] = player_matches['started_at'].dt.strftime('%d/%m/%Y')
     
     # Seleciona e renomeia as colunas para exibição
     display_columns = {
@@ -218,56 +173,27 @@ def get_match_history(matches, players, player_id):
     
     return result_df
 
-def get_player_insights(matches, player_id, stats):
-    """Gera insights sobre o desempenho do jogador"""
+def get_player_insights(summary, player_id, head_to_head, streaks):
+    """
+    Gera insights sobre o desempenho do jogador a partir das tabelas de todos os
+    jogadores (estatísticas e sequências) e dos confrontos diretos
+    """
     insights = []
     
-    # Filtrar partidas do jogador
-    player_matches = matches[
-        (matches['winner_id'] == player_id) | 
-        (matches['loser_id'] == player_id)
-    ].copy()  # Adicionado .copy() para evitar SettingWithCopyWarning
-    
-    if player_matches.empty:
+    stats = summary.stats(player_id)
+    if stats['total_matches'] == 0:
         return insights
     
-    # Adiciona nome da rodada
-    player_matches['round_name'] = player_matches.apply(
-        lambda x: get_round_name(x['round'], x['tournament_name']),
-        axis=1
-    )
-    
-    # Calcula o número de sets jogados para cada partida
-    def calculate_sets_played(score):
-        try:
-            if pd.isna(score):
-                return 0
-            score_str = str(score).strip('"')
-            if not score_str or score_str == 'nan':
-                return 0
-            sets = [int(s) for s in score_str.split('-')]
-            return sum(sets)
-        except (ValueError, AttributeError):
-            return 0
-    
-    player_matches['sets_played'] = player_matches['score'].apply(calculate_sets_played)
-    
     # Insight sobre maior rivalidade
     # Encontra o adversário contra quem mais jogou
-    rivals = pd.concat([
-        player_matches[player_matches['winner_id'] == player_id]['loser_id'],
-        player_matches[player_matches['loser_id'] == player_id]['winner_id']
-    ]).value_counts()
-    
-    if not rivals.empty and rivals.iloc[0] >= 2:  # Só mostra se tiver pelo menos 2 jogos
-        rival_id = rivals.index[0]
-        rival_matches = player_matches[
-            ((player_matches['winner_id'] == player_id) & (player_matches['loser_id'] == rival_id)) |
-            ((player_matches['winner_id'] == rival_id) & (player_matches['loser_id'] == player_id))
-        ]
-        wins = len(rival_matches[rival_matches['winner_id'] == player_id])
-        total = len(rival_matches)
-        rival_name = matches[matches['winner_id'] == rival_id]['winner_name'].iloc[0]
+    rivals = head_to_head.rivals(player_id, limit=1)
+    
+    if not rivals.empty and rivals['meetings'].iloc[0] >= 2:  # Só mostra se tiver pelo menos 2 jogos
+        rival_id = rivals['opponent_id'].iloc[0]
+        total = int(rivals['meetings'].iloc[0])
+        wins = int(rivals['wins'].iloc[0])
+        last_match = head_to_head.last_meeting(player_id, rival_id)
+        rival_name = last_match['winner_name'] if last_match['winner_id'] == rival_id else last_match['loser_name']
         
         insights.append({
             'icon': '⚔️',
@@ -276,9 +202,7 @@ def get_player_insights(matches, player_id, stats):
         })
     
     # Insight sobre títulos e finais
-    finals_played = len(player_matches[
-        player_matches.apply(lambda x: is_final_round(x['round'], x['tournament_name']), axis=1)
-    ])
+    finals_played = stats['finals_played']
     if finals_played > 0:
         win_rate_finals = (stats['titles'] / finals_played) * 100
         insights.append({
@@ -288,79 +212,57 @@ def get_player_insights(matches, player_id, stats):
                    f"vencendo {stats['titles']} ({win_rate_finals:.1f}% de aproveitamento em finais)"
         })
     
-    # Insight sobre sequência atual
-    current_streak = 0
-    max_streak = 0
-    current_type = None
-    
-    for _, match in player_matches.sort_values('started_month_year', ascending=True).iterrows():
-        is_victory = match['winner_id'] == player_id
+    # Insights sobre sequências (pré-calculadas para todos os jogadores)
+    if player_id in streaks.index:
+        streak = streaks.loc[player_id]
+        current_streak = int(streak['current_streak'])
+        current_type = 'vitórias' if streak['current_won'] else 'derrotas'
         
-        if current_type is None:
-            current_type = 'vitórias' if is_victory else 'derrotas'
-            current_streak = 1
-        elif (is_victory and current_type == 'vitórias') or (not is_victory and current_type == 'derrotas'):
-            current_streak += 1
-        else:
-            if current_type == 'vitórias' and current_streak > max_streak:
-                max_streak = current_streak
-            current_type = 'vitórias' if is_victory else 'derrotas'
-            current_streak = 1
-    
-    if current_streak > 2:
-        insights.append({
-            'icon': '🔥' if current_type == 'vitórias' else '📉',
-            'title': 'Sequência Atual',
-            'text': f"Está em sequência de {current_streak} {current_type} consecutivas"
-        })
+        if current_streak > 2:
+            insights.append({
+                'icon': '🔥' if current_type == 'vitórias' else '📉',
+                'title': 'Sequência Atual',
+                'text': f"Está em sequência de {current_streak} {current_type} consecutivas"
+            })
+        
+        longest_win_streak = int(streak['longest_win_streak'])
+        if longest_win_streak > 2:
+            insights.append({
+                'icon': '🚀',
+                'title': 'Maior Sequência',
+                'text': f"Maior sequência de vitórias: {longest_win_streak} seguidas " +
+                       f"(maior de derrotas: {int(streak['longest_loss_streak'])})"
+            })
     
-    # Insight sobre aproveitamento por categoria
-    category_stats = {}
-    for category in player_matches['tournament_category'].unique():
-        category_matches = player_matches[player_matches['tournament_category'] == category]
-        wins = len(category_matches[category_matches['winner_id'] == player_id])
-        total = len(category_matches)
-        win_rate = (wins / total * 100) if total > 0 else 0
-        category_stats[category] = {'wins': wins, 'total': total, 'win_rate': win_rate}
-    
-    best_category = max(category_stats.items(), key=lambda x: x[1]['win_rate'])
-    if best_category[1]['total'] >= 3:  # Só mostra se tiver pelo menos 3 jogos
+    # Insight sobre aproveitamento por categoria (a melhor vem primeiro)
+    categories = summary.player_categories(player_id)
+    best_category = categories.iloc[0] if not categories.empty else None
+    if best_category is not None and best_category['matches'] >= 3:  # Só mostra se tiver pelo menos 3 jogos
         insights.append({
             'icon': '📈',
             'title': 'Melhor Categoria',
-            'text': f"Maior aproveitamento na categoria {best_category[0]}: " +
-                   f"{best_category[1]['win_rate']:.1f}% ({best_category[1]['wins']}/{best_category[1]['total']})"
+            'text': f"Maior aproveitamento na categoria {best_category['category']}: " +
+                   f"{best_category['win_rate']:.1f}% ({best_category['wins']}/{best_category['matches']})"
         })
     
-    # Insight sobre fases mais alcançadas
-    if not player_matches['round_name'].empty:
-        # Ordem das fases do melhor para o pior resultado
-        round_order = ['Final', 'Semifinal', 'Quartas de Final', 'Primeira']
-        
-        # Conta quantas vezes alcançou cada fase
-        round_counts = player_matches['round_name'].value_counts()
-        
-        # Encontra a melhor fase alcançada que tenha pelo menos uma ocorrência
-        best_rounds = []
-        for round_name in round_order:
-            if round_name in round_counts.index and round_counts[round_name] > 0:
-                count = round_counts[round_name]
-                best_rounds.append(f"{count}x {round_name}")
-                if len(best_rounds) >= 2:  # Pega no máximo as 2 melhores fases
-                    break
-        
-        if best_rounds:
-            insights.append({
-                'icon': '🎯',
-                'title': 'Melhores Resultados',
-                'text': f"Alcançou {' e '.join(best_rounds)}"
-            })
+    # Insight sobre fases mais alcançadas, da melhor para a pior
+    round_counts = summary.round_distribution(player_id)
+    best_rounds = [
+        f"{round_counts[round_name]}x {round_name}"
+        for round_name in reversed(ROUND_ORDER) if round_counts[round_name] > 0
+    ][:2]  # Pega no máximo as 2 melhores fases
+    
+    if best_rounds:
+        insights.append({
+            'icon': '🎯',
+            'title': 'Melhores Resultados',
+            'text': f"Alcançou {' e '.join(best_rounds)}"
+        })
 
     # Insight sobre jogos duros (terceiro set)
-    third_set_matches = player_matches[player_matches['sets_played'] == 3]
-    if not third_set_matches.empty:
-        total_third_sets = len(third_set_matches)
-        wins_third_sets = len(third_set_matches[third_set_matches['winner_id'] == player_id])
+    total_third_sets = stats['three_set_matches']
+    if total_third_sets > 0:
+        wins_third_sets = stats['three_set_wins']
         win_rate_third_sets = (wins_third_sets / total_third_sets) * 100
         
         insights.append({
@@ -372,18 +274,13 @@ def get_player_insights(matches, player_id, stats):
     
     return insights
 
-def get_player_opponents(matches, player_id):
+def get_player_opponents(head_to_head, player_id):
     """Retorna lista de IDs dos jogadores que já enfrentaram o jogador selecionado"""
-    # Encontra todos os oponentes nas partidas onde o jogador foi vencedor ou perdedor
-    opponents = pd.concat([
-        matches[matches['winner_id'] == player_id]['loser_id'],
-        matches[matches['loser_id'] == player_id]['winner_id']
-    ]).unique()
-    
-    return opponents
+    return head_to_head.opponents(player_id)
 
-def display_player_page(matches, players, shared_player_id=None):
+def display_player_page(dataset, shared_player_id=None):
     """Exibe a página de análise de jogadores"""
+    matches, players, tournaments = dataset.frames
     st.header("👤 Análise de Jogadores")
     
     # Seleção do jogador com opção vazia inicial
@@ -418,9 +315,17 @@ def display_player_page(matches, players, shared_player_id=None):
     
     player_id = player_df['id'].iloc[0]
     
+    # Partidas do jogador: um recorte do índice, sem percorrer todas as partidas
+    index = get_player_index(dataset)
+    head_to_head = get_head_to_head_index(dataset)
+    player_matches = index.player_matches(player_id)
+    
+    # Estatísticas, fases e categorias de todos os jogadores, calculadas uma vez por versão dos dados
+    summary = calculate_player_summary(dataset)
+    
     with st.spinner('Carregando estatísticas do jogador...'):
         # Estatísticas do jogador
-        stats = get_player_stats(matches, player_id)
+        stats = get_player_stats(summary, player_id)
         
         # Métricas principais
         col1, col2, col3, col4, col5 = st.columns(5)
@@ -437,7 +342,9 @@ def display_player_page(matches, players, shared_player_id=None):
         
         # Seção de Insights
         st.subheader("💡 Insights")
-        insights = get_player_insights(matches, player_id, stats)
+        insights = get_player_insights(
+            summary, player_id, head_to_head, calculate_player_streaks(dataset)
+        )
         
         if insights:
             cols = st.columns(2)  # Organiza os insights em duas colunas
@@ -455,10 +362,7 @@ def display_player_page(matches, players, shared_player_id=None):
     with st.spinner('Carregando distribuição de rodadas...'):
         # Gráfico de distribuição de rodadas
         st.subheader("Distribuição de Rodadas Alcançadas")
-        round_dist = get_round_distribution(matches, player_id)
-        
-        # Converte os números das rodadas para nomes descritivos no gráfico
-        round_dist.index = [get_round_name(r, None) for r in round_dist.index]
+        round_dist = get_round_distribution(summary, player_id)
         
         # Cria o gráfico com mais customizações
         fig = px.bar(
@@ -509,6 +413,36 @@ def display_player_page(matches, players, shared_player_id=None):
         
         st.plotly_chart(fig, use_container_width=True)
     
+    with st.spinner('Carregando evolução do rating...'):
+        st.subheader("📈 Evolução do Rating Glicko-2")
+        timeline = pd.DataFrame(calculate_rating_history(dataset).timeline(player_id))
+        
+        if timeline.empty:
+            st.info("📝 Ainda não há jogos para calcular o rating.")
+        else:
+            # Cada torneio é um período de rating: um ponto por torneio
+            timeline = timeline.drop_duplicates('date_key', keep='last')
+            timeline['date'] = pd.to_datetime(timeline['date_key'].astype(str), format='%Y%m%d', errors='coerce')
+            
+            fig = px.line(
+                timeline, x='date', y='post_rating', markers=True,
+                labels={'date': 'Data', 'post_rating': 'Rating'},
+                custom_data=['post_rd']
+            )
+            fig.update_traces(
+                line_color='#1f77b4',
+                hovertemplate="<b>%{x|%d/%m/%Y}</b><br>" +
+                             "Rating: %{y:.0f} ± %{customdata[0]:.0f}<br>" +
+                             "<extra></extra>"
+            )
+            fig.update_layout(
+                plot_bgcolor='white',
+                showlegend=False,
+                yaxis=dict(showgrid=True, gridcolor='rgba(128, 128, 128, 0.2)'),
+                xaxis=dict(showgrid=False)
+            )
+            st.plotly_chart(fig, use_container_width=True)
+    
     # Adiciona botão de compartilhar
     share_url = f"{st.session_state.get('host', 'https://blk-tennis-insights.streamlit.app')}?player_id={player_id}&page=Análise de Jogadores"
     
@@ -529,7 +463,7 @@ def display_player_page(matches, players, shared_player_id=None):
         )
     
     with col2:
-        tournament_categories = matches['tournament_category'].unique()
+        tournament_categories = matches['tournament_category'].unique().tolist()
         category_filter = st.multiselect(
             "🏆 Filtrar por categoria:",
             options=tournament_categories,
@@ -551,9 +485,9 @@ def display_player_page(matches, players, shared_player_id=None):
     
     with st.spinner('Carregando histórico de jogos...'):
         # Filtra as partidas antes de passar para get_match_history
-        filtered_matches = matches[
-            matches['tournament_category'].isin(category_filter)
-        ].copy()
+        filtered_matches = player_matches[
+            player_matches['tournament_category'].isin(category_filter)
+        ]
         
         # Obtém o histórico de jogos com os dados filtrados
         match_history = get_match_history(filtered_matches, players, player_id)
@@ -587,8 +521,14 @@ def display_player_page(matches, players, shared_player_id=None):
     # Head-to-Head
     st.subheader("🤼 Head-to-Head")
     
+    # Retrospecto contra todos os adversários, lido da estrutura de confrontos diretos
+    opponent_records = get_opponent_records(head_to_head, players, player_id)
+    if not opponent_records.empty:
+        with st.expander(f"📊 Retrospecto contra cada adversário ({len(opponent_records)})"):
+            st.dataframe(opponent_records, hide_index=True, use_container_width=True)
+    
     # Obtém lista de oponentes que já jogaram contra o jogador selecionado
-    opponent_ids = get_player_opponents(matches, player_id)
+    opponent_ids = get_player_opponents(head_to_head, player_id)
     opponent_names = players[players['id'].isin(opponent_ids)]['name'].str.upper().tolist()
     
     if not opponent_names:
@@ -605,7 +545,7 @@ def display_player_page(matches, players, shared_player_id=None):
         if not opponent_df.empty:
             opponent_id = opponent_df['id'].iloc[0]
             
-            h2h = get_head_to_head(matches, player_id, opponent_id)
+            h2h = get_head_to_head(head_to_head, player_id, opponent_id)
             
             if h2h['total_matches'] > 0:
                 col1, col2, col3 = st.columns(3)
@@ -624,10 +564,7 @@ def display_player_page(matches, players, shared_player_id=None):
                 
                 # Histórico de confrontos diretos
                 st.subheader(f"Histórico de Jogos: {selected_player} vs {opponent}")
-                h2h_matches = matches[
-                    ((matches['winner_id'] == player_id) & (matches['loser_id'] == opponent_id)) |
-                    ((matches['winner_id'] == opponent_id) & (matches['loser_id'] == player_id))
-                ]
+                h2h_matches = index.head_to_head(player_id, opponent_id)
                 h2h_history = get_match_history(h2h_matches, players, player_id)
                 st.dataframe(h2h_history, hide_index=True, use_container_width=True)
             else:
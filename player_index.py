@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+
+class PlayerMatchIndex:
+    """
+    Índice jogador -> partidas em formato CSR: as linhas (posições em `matches`)
+    das partidas do jogador `player_ids[i]` ficam em `rows[indptr[i]:indptr[i + 1]]`,
+    na ordem do DataFrame (cronológica nos frames do carregamento), com o
+    adversário e o resultado de cada uma alinhados em `opponent_ids` e `won`.
+    """
+
+    def __init__(self, matches):
+        self.matches = matches
+        valid = (matches['winner_id'].notna() & matches['loser_id'].notna()).to_numpy()
+        positions = np.flatnonzero(valid)
+        winners = matches['winner_id'].to_numpy()[valid].astype(np.int64)
+        losers = matches['loser_id'].to_numpy()[valid].astype(np.int64)
+
+        # Uma entrada por jogador por partida, agrupadas por jogador e na ordem das linhas
+        player = np.concatenate([winners, losers])
+        rows = np.tile(positions, 2)
+        order = np.lexsort((rows, player))
+
+        self.player_ids, counts = np.unique(player, return_counts=True)
+        self.indptr = np.concatenate([[0], np.cumsum(counts)])
+        self.rows = rows[order]
+        self.opponent_ids = np.concatenate([losers, winners])[order]
+        self.won = np.repeat([True, False], len(positions))[order]
+
+    def _bounds(self, player_id):
+        position = np.searchsorted(self.player_ids, player_id)
+        if position == len(self.player_ids) or self.player_ids[position] != player_id:
+            return 0, 0
+        return self.indptr[position], self.indptr[position + 1]
+
+    def player_rows(self, player_id):
+        """Posições das partidas do jogador em `matches`"""
+        start, end = self._bounds(player_id)
+        return self.rows[start:end]
+
+    def player_matches(self, player_id):
+        """Partidas do jogador, em ordem cronológica"""
+        return self.matches.iloc[self.player_rows(player_id)]
+
+    def head_to_head(self, player_id, opponent_id):
+        """Partidas entre os dois jogadores, em ordem cronológica"""
+        start, end = self._bounds(player_id)
+        rows = self.rows[start:end][self.opponent_ids[start:end] == opponent_id]
+        return self.matches.iloc[rows]
+
+
+class HeadToHead:
+    """
+    Confrontos diretos de todos os pares de jogadores, em formato CSR: os
+    adversários de `player_ids[i]` ficam em `opponent_ids[indptr[i]:indptr[i + 1]]`
+    (ordenados por id), com o número de jogos, as vitórias do jogador e a linha
+    (em `matches`) do último confronto alinhados. Um par é consultado em O(1).
+    """
+
+    def __init__(self, matches):
+        self.matches = matches
+        valid = (matches['winner_id'].notna() & matches['loser_id'].notna()).to_numpy()
+        positions = np.flatnonzero(valid)
+        winners = matches['winner_id'].to_numpy()[valid].astype(np.int64)
+        losers = matches['loser_id'].to_numpy()[valid].astype(np.int64)
+
+        # Cada partida conta para os dois lados do par
+        player = np.concatenate([winners, losers])
+        opponent = np.concatenate([losers, winners])
+        won = np.repeat([1, 0], len(positions))
+        rows = np.tile(positions, 2)
+
+        order = np.lexsort((opponent, player))
+        player, opponent, won, rows = player[order], opponent[order], won[order], rows[order]
+        new_pair = np.r_[True, (player[1:] != player[:-1]) | (opponent[1:] != opponent[:-1])]
+        starts = np.flatnonzero(new_pair[:len(player)])
+
+        pair_player = player[starts]
+        self.opponent_ids = opponent[starts]
+        self.meetings = np.diff(np.append(starts, len(player)))
+        self.wins = np.add.reduceat(won, starts) if len(starts) else np.zeros(0, dtype=np.int64)
+        self.last_row = np.maximum.reduceat(rows, starts) if len(starts) else np.zeros(0, dtype=np.int64)
+
+        self.player_ids, counts = np.unique(pair_player, return_counts=True)
+        self.indptr = np.concatenate([[0], np.cumsum(counts)])
+        self._pairs = {
+            pair: k for k, pair in enumerate(zip(pair_player.tolist(), self.opponent_ids.tolist()))
+        }
+
+    def _bounds(self, player_id):
+        position = np.searchsorted(self.player_ids, player_id)
+        if position == len(self.player_ids) or self.player_ids[position] != player_id:
+            return 0, 0
+        return self.indptr[position], self.indptr[position + 1]
+
+    def record(self, player_id, opponent_id):
+        """(jogos, vitórias do jogador, vitórias do adversário) entre os dois"""
+        k = self._pairs.get((int(player_id), int(opponent_id)))
+        if k is None:
+            return 0, 0, 0
+        meetings, wins = int(self.meetings[k]), int(self.wins[k])
+        return meetings, wins, meetings - wins
+
+    def last_meeting(self, player_id, opponent_id):
+        """Partida (linha de `matches`) do último confronto entre os dois; None se nunca jogaram"""
+        k = self._pairs.get((int(player_id), int(opponent_id)))
+        if k is None:
+            return None
+        return self.matches.iloc[self.last_row[k]]
+
+    def opponents(self, player_id):
+        """Ids (ordenados) de todos os adversários que o jogador já enfrentou"""
+        start, end = self._bounds(player_id)
+        return self.opponent_ids[start:end]
+
+    def rivals(self, player_id, limit=None):
+        """
+        Retrospecto contra cada adversário, do mais enfrentado ao menos (empates:
+        confronto mais recente primeiro): DataFrame com opponent_id, meetings,
+        wins, losses e last_row.
+        """
+        start, end = self._bounds(player_id)
+        opponent_ids = self.opponent_ids[start:end]
+        meetings = self.meetings[start:end]
+        last_row = self.last_row[start:end]
+        order = np.lexsort((-last_row, -meetings))[:limit]
+        wins = self.wins[start:end][order]
+        return pd.DataFrame({
+            'opponent_id': opponent_ids[order],
+            'meetings': meetings[order],
+            'wins': wins,
+            'losses': meetings[order] - wins,
+            'last_row': last_row[order],
+        })
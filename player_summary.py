@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+from points_engine import is_finals
+
+# Nome da fase por rodada: torneios FINALS (True) e demais (False)
+ROUND_NAMES = {
+    True: {
+        1: 'Quartas de Final',
+        2: 'Semifinal',
+        3: 'Final'
+    },
+    False: {
+        1: 'Primeira',
+        2: 'Quartas de Final',
+        3: 'Semifinal',
+        4: 'Final'
+    },
+}
+
+# Fases da distribuição de rodadas, da primeira à final
+ROUND_ORDER = ['Primeira', 'Quartas de Final', 'Semifinal', 'Final']
+
+STAT_COLUMNS = (
+    'total_matches', 'wins', 'losses', 'win_rate', 'titles', 'finals_played',
+    'three_set_matches', 'three_set_wins', 'best_round',
+)
+
+
+def round_stages(matches):
+    """Posição em ROUND_ORDER da fase de cada partida; -1 para rodadas fora da tabela"""
+    finals = is_finals(matches['tournament_name']).to_numpy()
+    rounds = matches['round'].astype('float64').to_numpy()
+    stages = np.full(len(matches), -1, dtype=np.int8)
+    for is_finals_tournament, round_names in ROUND_NAMES.items():
+        for round_number, name in round_names.items():
+            stages[(finals == is_finals_tournament) & (rounds == round_number)] = ROUND_ORDER.index(name)
+    return stages
+
+
+class PlayerSummary:
+    """
+    Estatísticas de todos os jogadores em uma passada de groupbys sobre as
+    colunas de vencedor/perdedor: `table` (uma linha por jogador, índice
+    player_id), `rounds` (partidas por fase alcançada, colunas ROUND_ORDER) e
+    `categories` (jogos e vitórias por categoria, da melhor para a pior de cada
+    jogador). Consultar um jogador é uma busca de linha.
+    """
+
+    def __init__(self, matches):
+        valid = (matches['winner_id'].notna() & matches['loser_id'].notna()).to_numpy()
+        positions = np.flatnonzero(valid)
+        winners = matches['winner_id'].to_numpy()[valid].astype(np.int64)
+        losers = matches['loser_id'].to_numpy()[valid].astype(np.int64)
+        stages = round_stages(matches)[valid]
+        three_sets = (matches['sets_played'].astype('float64').to_numpy() == 3)[valid]
+
+        # Uma entrada por jogador por partida
+        entries = pd.DataFrame({
+            'player_id': np.concatenate([winners, losers]),
+            'won': np.repeat([True, False], len(positions)),
+            'stage': np.tile(stages, 2),
+            'final': np.tile(stages == ROUND_ORDER.index('Final'), 2),
+            'three_sets': np.tile(three_sets, 2),
+            'tournament_id': np.tile(matches['tournament_id'].to_numpy()[valid], 2),
+            'round': np.tile(matches['round'].astype('float64').to_numpy()[valid], 2),
+            'category': np.tile(matches['tournament_category'].astype(object).to_numpy()[valid], 2),
+            'row': np.tile(positions, 2),
+        })
+        entries['title'] = entries['won'] & entries['final']
+        entries['three_set_win'] = entries['won'] & entries['three_sets']
+
+        table = entries.groupby('player_id').agg(
+            total_matches=('won', 'size'),
+            wins=('won', 'sum'),
+            titles=('title', 'sum'),
+            finals_played=('final', 'sum'),
+            three_set_matches=('three_sets', 'sum'),
+            three_set_wins=('three_set_win', 'sum'),
+            best_stage=('stage', 'max'),
+        )
+        table['losses'] = table['total_matches'] - table['wins']
+        table['win_rate'] = table['wins'] / table['total_matches'] * 100
+        stage_names = np.array([None] + ROUND_ORDER, dtype=object)
+        table['best_round'] = stage_names[table['best_stage'].to_numpy() + 1]
+        self.table = table[list(STAT_COLUMNS)]
+
+        # Fases alcançadas: cada (torneio, rodada) conta uma vez por jogador
+        staged = entries[entries['stage'] >= 0].drop_duplicates(['player_id', 'tournament_id', 'round'])
+        rounds = staged.groupby(['player_id', 'stage']).size().unstack(fill_value=0)
+        rounds = rounds.reindex(index=table.index, columns=range(len(ROUND_ORDER)), fill_value=0)
+        rounds.columns = ROUND_ORDER
+        self.rounds = rounds
+
+        # Empates de aproveitamento: a categoria disputada primeiro vem antes
+        categories = entries.dropna(subset=['category']).groupby(['player_id', 'category']).agg(
+            matches=('won', 'size'),
+            wins=('won', 'sum'),
+            first_row=('row', 'min'),
+        ).reset_index()
+        categories['win_rate'] = categories['wins'] / categories['matches'] * 100
+        categories = categories.sort_values(
+            ['player_id', 'win_rate', 'first_row'], ascending=[True, False, True]
+        )
+        self.categories = categories.set_index('player_id')[['category', 'matches', 'wins', 'win_rate']]
+
+    def stats(self, player_id):
+        """Linha do jogador em `table` como dicionário; zeros se ele não jogou"""
+        if player_id not in self.table.index:
+            stats = dict.fromkeys(STAT_COLUMNS, 0)
+            stats['best_round'] = None
+            return stats
+        return self.table.loc[player_id].to_dict()
+
+    def round_distribution(self, player_id):
+        """Partidas por fase alcançada (Series indexada por ROUND_ORDER)"""
+        if player_id not in self.rounds.index:
+            return pd.Series(0, index=ROUND_ORDER)
+        return self.rounds.loc[player_id]
+
+    def player_categories(self, player_id):
+        """Jogos, vitórias e aproveitamento por categoria, da melhor para a pior"""
+        if player_id not in self.categories.index:
+            return self.categories.iloc[0:0]
+        return self.categories.loc[[player_id]]
@@ -0,0 +1,277 @@
+import numpy as np
+import pandas as pd
+
+from tournament_results import max_rounds
+
+# Pontos do vencedor da partida por (torneio FINALS, rodada, rodada final do torneio).
+# Vencer a rodada final é ser campeão; nos FINALS a final é a rodada 3.
+WINNER_POINTS = {
+    (True, 3, True): 2000,
+    (True, 3, False): 1200,
+    (True, 2, True): 720,
+    (True, 2, False): 720,
+    (True, 1, True): 360,
+    (True, 1, False): 360,
+    (False, 4, True): 2000,
+    (False, 4, False): 1200,
+    (False, 3, True): 720,
+    (False, 3, False): 720,
+    (False, 2, True): 360,
+    (False, 2, False): 360,
+    (False, 1, True): 180,
+    (False, 1, False): 180,
+}
+MAX_POINTS_ROUND = 4
+
+# Janela do ranking móvel, em semanas
+ROLLING_WEEKS = 52
+
+# Mesma tabela em array: [FINALS, rodada (0 = sem pontos), rodada final]
+_WINNER_POINTS_TABLE = np.zeros((2, MAX_POINTS_ROUND + 1, 2), dtype=np.int64)
+for (_finals, _round, _is_max), _points in WINNER_POINTS.items():
+    _WINNER_POINTS_TABLE[int(_finals), _round, int(_is_max)] = _points
+
+
+def is_finals(tournament_names):
+    """Série booleana: torneio FINALS (pelo nome)"""
+    return tournament_names.astype(str).str.upper().str.contains('FINALS', regex=False)
+
+
+# Nome da etapa por rodada, para descrever o resultado no torneio
+STAGE_LABELS = {
+    True: {1: 'Quartas', 2: 'Semifinal', 3: 'Final'},
+    False: {1: 'Oitavas', 2: 'Quartas', 3: 'Semifinal', 4: 'Final'},
+}
+
+
+def stage_phrase(finals, round_num, lost):
+    """Frase do resultado ('Perdeu nas Quartas', 'Venceu na Semifinal') com a preposição correta"""
+    label = STAGE_LABELS[bool(finals)].get(int(round_num), f"Rodada {int(round_num)}")
+    prep = 'nas' if label in ('Quartas', 'Oitavas') else 'na'
+    return f"{'Perdeu' if lost else 'Venceu'} {prep} {label}"
+
+
+def tournament_max_round(matches, results=None):
+    """
+    Rodada final do torneio de cada partida: lida da tabela de resultados dos
+    torneios (tournament_results) quando disponível, senão agrupando `matches`
+    """
+    if results is not None:
+        return max_rounds(results, matches['tournament_id'].to_numpy())
+    rounds = matches['round'].astype('float64')
+    return rounds.groupby(matches['tournament_id']).transform('max').to_numpy()
+
+
+def match_points(matches, max_round=None):
+    """
+    Pontos de vencedor e perdedor de cada partida (arrays alinhados a `matches`).
+    O perdedor ganha 1200 na final, 180 na primeira rodada, 720 na semifinal e
+    360 nas quartas, contadas a partir da rodada final do torneio (`max_round`,
+    alinhado a `matches`; ver tournament_max_round).
+    """
+    if max_round is None:
+        max_round = tournament_max_round(matches)
+    rounds = matches['round'].astype('float64').to_numpy()
+    is_max = rounds == max_round
+
+    has_points = ~np.isnan(rounds) & matches['tournament_name'].notna().to_numpy()
+    table_round = np.where(has_points & (rounds >= 1) & (rounds <= MAX_POINTS_ROUND), rounds, 0).astype(np.intp)
+    finals = is_finals(matches['tournament_name']).to_numpy().astype(np.intp)
+    winner_points = _WINNER_POINTS_TABLE[finals, table_round, is_max.astype(np.intp)]
+
+    loser_points = np.select(
+        [is_max, rounds == 1, rounds == max_round - 1, rounds == max_round - 2],
+        [1200, 180, 720, 360],
+        0
+    )
+    return winner_points, loser_points
+
+
+def points_facts(matches, results=None):
+    """
+    Tabela de fatos com uma linha por jogador por torneio: melhor pontuação,
+    saldo de sets, etapa alcançada e data do torneio (`started_date_key`
+    ordenável). Fica
+    ordenada por (player_id, tournament_id), então as linhas de um jogador são
+    um intervalo contíguo (ver player_points_breakdown). `results`: tabela de
+    resultados dos torneios, de onde vem a rodada final de cada um.
+    """
+    max_round = tournament_max_round(matches, results)
+    winner_points, loser_points = match_points(matches, max_round)
+    rounds = matches['round'].astype('float64').to_numpy()
+    no_round = np.full(len(matches), np.nan)
+    balance = matches['set_balance'].astype('float64').fillna(0).to_numpy()
+
+    results = pd.DataFrame({
+        'player_id': np.concatenate([matches['winner_id'].to_numpy(), matches['loser_id'].to_numpy()]),
+        'tournament_id': np.tile(matches['tournament_id'].to_numpy(), 2),
+        'points': np.concatenate([winner_points, loser_points]),
+        'set_balance': np.concatenate([balance, -balance]),
+        'won_round': np.concatenate([rounds, no_round]),
+        'lost_round': np.concatenate([no_round, rounds]),
+        'champion': np.concatenate([rounds == max_round, np.zeros(len(matches), dtype=bool)]),
+    })
+    facts = results.groupby(['player_id', 'tournament_id'], sort=True).agg(
+        points=('points', 'max'),
+        set_balance=('set_balance', 'sum'),
+        won_round=('won_round', 'max'),
+        lost_round=('lost_round', 'max'),
+        champion=('champion', 'any'),
+    ).reset_index()
+
+    info = matches.drop_duplicates('tournament_id').set_index('tournament_id')[
+        ['tournament_name', 'started_month_year', 'started_date_key']
+    ].reindex(facts['tournament_id'])
+    for column in info.columns:
+        facts[column] = info[column].to_numpy()
+
+    # Etapa: campeão, rodada da derrota ou (sem derrota registrada) a última vitória
+    lost = facts['lost_round'].notna()
+    stages = pd.DataFrame({
+        'finals': is_finals(facts['tournament_name']).to_numpy(),
+        'round': facts['lost_round'].fillna(facts['won_round']).fillna(0).astype(int).to_numpy(),
+        'lost': lost.to_numpy(),
+    })
+    phrases = stages.drop_duplicates()
+    phrases = phrases.assign(stage=[stage_phrase(*key) for key in phrases.itertuples(index=False, name=None)])
+    stage = stages.merge(phrases, on=['finals', 'round', 'lost'], how='left')['stage'].to_numpy()
+    facts['stage'] = np.where(facts['champion'], 'Campeão', stage)
+    facts['set_balance'] = facts['set_balance'].astype(np.int32)
+
+    return facts[[
+        'player_id', 'tournament_id', 'tournament_name', 'started_month_year',
+        'started_date_key', 'stage', 'points', 'set_balance'
+    ]]
+
+
+def player_points_breakdown(facts, player_id):
+    """Torneios em que o jogador pontuou (maior pontuação primeiro), lidos da tabela de fatos"""
+    ids = facts['player_id'].to_numpy()
+    start, end = np.searchsorted(ids, player_id, side='left'), np.searchsorted(ids, player_id, side='right')
+    rows = facts.iloc[start:end]
+    rows = rows[rows['points'] > 0].sort_values(['points', 'started_date_key'], ascending=[False, False])
+    return pd.DataFrame({
+        'tournament': rows['tournament_name'].astype(str).to_numpy(),
+        'date': rows['started_month_year'].astype(str).to_numpy(),
+        'performance': rows['stage'].to_numpy(),
+        'points': rows['points'].to_numpy(),
+    })
+
+
+def set_balance_by_player(matches):
+    """Saldo de sets de cada jogador (player_id, set_balance)"""
+    totals = pd.DataFrame({
+        'player_id': pd.concat([matches['winner_id'], matches['loser_id']], ignore_index=True),
+        'set_balance': pd.concat([matches['set_balance'], -matches['set_balance']], ignore_index=True),
+    })
+    return totals.groupby('player_id')['set_balance'].sum().reset_index()
+
+
+def points_ranking(matches, players, facts=None):
+    """
+    Ranking por pontos: soma da melhor pontuação em cada torneio (da tabela de
+    fatos), com o saldo de sets como desempate. Jogadores sem pontos ficam de fora.
+    """
+    if facts is None:
+        facts = points_facts(matches)
+    all_points = facts.groupby('player_id')['points'].sum().reset_index()
+
+    ranking_df = all_points.merge(set_balance_by_player(matches), on='player_id', how='left')
+    ranking_df['set_balance'] = ranking_df['set_balance'].fillna(0)
+    return rank_players(ranking_df, players)
+
+
+def rank_players(ranking_df, players):
+    """
+    Ordena (player_id, points, set_balance) por pontos e saldo de sets, com os
+    nomes, sem quem zerou. Empates ficam na ordem do id, como em RankHistory.
+    """
+    ranking_df = ranking_df.merge(players[['id', 'name']], left_on='player_id', right_on='id')
+    ranking_df['name'] = ranking_df['name'].str.upper()
+    return ranking_df[ranking_df['points'] > 0].sort_values(
+        ['points', 'set_balance', 'player_id'], ascending=[False, False, True], kind='stable'
+    )
+
+
+def date_key_to_datetime(date_keys):
+    """Converte chaves AAAAMMDD em datetime64[D]"""
+    return pd.to_datetime(np.asarray(date_keys).astype(str), format='%Y%m%d').to_numpy('datetime64[D]')
+
+
+class RollingRanking:
+    """
+    Ranking por pontos em janela móvel (estilo ATP): na data D contam os
+    resultados de torneios em (D - N semanas, D]. Guarda pontos e saldo de sets
+    de todos os jogadores na data de cada torneio, em matrizes (datas x jogadores);
+    entre duas datas de torneio, descontam-se os resultados que expiraram depois
+    da última.
+    """
+
+    def __init__(self, facts, weeks=ROLLING_WEEKS):
+        self.weeks = weeks
+        dates = date_key_to_datetime(facts['started_date_key'])
+        order = np.argsort(dates, kind='stable')
+        dates = dates[order]
+        self.player_ids, codes = np.unique(facts['player_id'].to_numpy()[order], return_inverse=True)
+        points = facts['points'].to_numpy()[order]
+        balance = facts['set_balance'].to_numpy()[order]
+        # Resultados em ordem de data, para descontar os que expiram entre datas de torneio
+        self._entries = (dates, codes, points, balance)
+
+        self.dates = np.unique(dates)
+        self.points = np.zeros((len(self.dates), len(self.player_ids)), dtype=np.int32)
+        self.set_balance = np.zeros_like(self.points)
+
+        # Uma passada: cada resultado entra na data do torneio e sai N semanas depois
+        current_points = np.zeros(len(self.player_ids), dtype=np.int64)
+        current_balance = np.zeros(len(self.player_ids), dtype=np.int64)
+        expire = np.timedelta64(weeks * 7, 'D')
+        entered = expired = 0
+        for k, date in enumerate(self.dates):
+            entering = np.searchsorted(dates, date, side='right')
+            np.add.at(current_points, codes[entered:entering], points[entered:entering])
+            np.add.at(current_balance, codes[entered:entering], balance[entered:entering])
+            entered = entering
+
+            expiring = np.searchsorted(dates, date - expire, side='right')
+            np.subtract.at(current_points, codes[expired:expiring], points[expired:expiring])
+            np.subtract.at(current_balance, codes[expired:expiring], balance[expired:expiring])
+            expired = expiring
+
+            self.points[k] = current_points
+            self.set_balance[k] = current_balance
+
+    def position(self, date):
+        """Índice da última data de torneio até `date` (-1 se nenhuma)"""
+        return int(np.searchsorted(self.dates, np.datetime64(date, 'D'), side='right')) - 1
+
+    def window(self, date):
+        """(início exclusivo, fim inclusivo) da janela na data `date`"""
+        end = np.datetime64(date, 'D')
+        return end - np.timedelta64(self.weeks * 7, 'D'), end
+
+    def totals(self, date):
+        """(pontos, saldo de sets) de cada jogador de `player_ids` na data `date`"""
+        k = self.position(date)
+        if k < 0:
+            return np.zeros(len(self.player_ids), dtype=np.int64), np.zeros(len(self.player_ids), dtype=np.int64)
+        points = self.points[k].astype(np.int64)
+        balance = self.set_balance[k].astype(np.int64)
+
+        # Resultados que saíram da janela entre a última data de torneio e `date`
+        dates, codes, entry_points, entry_balance = self._entries
+        expire = np.timedelta64(self.weeks * 7, 'D')
+        start = np.searchsorted(dates, self.dates[k] - expire, side='right')
+        end = np.searchsorted(dates, np.datetime64(date, 'D') - expire, side='right')
+        np.subtract.at(points, codes[start:end], entry_points[start:end])
+        np.subtract.at(balance, codes[start:end], entry_balance[start:end])
+        return points, balance
+
+    def ranking(self, date, players):
+        """Ranking na data `date`, no mesmo formato de points_ranking"""
+        points, balance = self.totals(date)
+        return rank_players(pd.DataFrame({
+            'player_id': self.player_ids,
+            'points': points,
+            'set_balance': balance,
+        }), players)
@@ -0,0 +1,99 @@
+import threading
+
+import pandas as pd
+
+from bracket_render import tournament_bracket_html
+from glicko import GlickoCheckpoints
+from ranking_engine import (
+    cached_tournament_results,
+    compute_glicko_ratings,
+    compute_points_facts,
+    compute_points_ranking,
+    compute_rank_history,
+    ranking_period_options,
+    resolve_ranking_period,
+)
+
+# Resultados publicados por escopo, na ordem devolvida por _compute_scope
+RANKING_KINDS = ('glicko', 'facts', 'points', 'history')
+
+
+def ranking_scopes(tournaments, now=None):
+    """Todas as combinações categoria x período oferecidas na página de rankings"""
+    if now is None:
+        now = pd.Timestamp.now().normalize()
+    categories = sorted(tournaments['category'].dropna().unique().tolist())
+    periods = [resolve_ranking_period(option, now) for option in ranking_period_options(tournaments)]
+    return [(category, time_period) for category in categories for time_period in periods]
+
+
+def _compute_scope(dataset, results, checkpoints, category, time_period):
+    matches, players, tournaments = dataset.frames
+    facts = compute_points_facts(matches, tournaments, category, time_period, results)
+    return (
+        compute_glicko_ratings(matches, players, tournaments, category, time_period, checkpoints),
+        facts,
+        compute_points_ranking(matches, players, tournaments, category, time_period, facts),
+        compute_rank_history(matches, tournaments, category, time_period, facts),
+    )
+
+
+def precompute_rankings(dataset, cache, checkpoints=None):
+    """
+    Calcula os rankings Glicko-2 e por pontos (com a tabela de fatos dos pontos e
+    o histórico de posições) de todos os escopos da página e publica no
+    RankingCache. Escopos cuja revisão já está no cache são ignorados. Retorna o
+    número de escopos calculados.
+
+    Roda na thread de start_precompute, sem pool de processos: fork dentro do
+    servidor do Streamlit (multithread) pode travar o filho, e os ~dezenas de
+    escopos levam cerca de um segundo em série.
+    """
+    if checkpoints is None:
+        checkpoints = GlickoCheckpoints()
+    results = None
+    count = 0
+    for category, time_period in ranking_scopes(dataset.tournaments):
+        revision = cache.revision(dataset, category, time_period)
+        if all(cache.contains((kind, category, time_period), revision) for kind in RANKING_KINDS):
+            continue
+        if results is None:
+            results = cached_tournament_results(dataset, cache)
+        values = _compute_scope(dataset, results, checkpoints, category, time_period)
+        for kind, value in zip(RANKING_KINDS, values):
+            cache.put((kind, category, time_period), revision, value)
+        count += 1
+    return count
+
+
+def precompute_brackets(dataset, cache):
+    """
+    Monta o HTML da chave de todos os torneios finalizados, para que abrir um
+    deles na página de torneios seja só uma leitura do cache. Retorna o número de chaves montadas.
+    """
+    results = cached_tournament_results(dataset, cache)
+    tournaments = dataset.tournaments
+    completed = tournaments.loc[tournaments['state'] == 'complete', 'id'].tolist()
+    pending = [tournament_id for tournament_id in completed if not cache.contains(('bracket', tournament_id), dataset.version)]
+    for tournament_id in pending:
+        tournament_bracket_html(dataset, results, tournament_id, cache)
+    return len(pending)
+
+
+def start_precompute(dataset, cache, checkpoints=None):
+    """Roda precompute_rankings e precompute_brackets em segundo plano, sem bloquear a página"""
+    def run():
+        try:
+            count = precompute_rankings(dataset, cache, checkpoints)
+            print(f"Rankings pré-calculados: {count} escopo(s)")
+        except Exception as e:
+            print(f"Falha no pré-cálculo dos rankings: {e}")
+        try:
+            count = precompute_brackets(dataset, cache)
+            print(f"Chaves pré-montadas: {count} torneio(s)")
+        except Exception as e:
+            print(f"Falha na montagem das chaves: {e}")
+
+    thread = threading.Thread(target=run, name='ranking-precompute', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from glicko import GlickoEngine
+
+RANK_KINDS = ('points', 'glicko')
+
+
+class RankHistory:
+    """
+    Posição de cada jogador no ranking por pontos e no Glicko-2 após cada
+    torneio do escopo, em matrizes int32 (torneios x jogadores); 0 = fora do
+    ranking. Posição atual, anterior e melhor posição de cada jogador ficam
+    pré-calculadas para consulta em O(1).
+    """
+
+    def __init__(self, player_ids, tournament_ids, facts, winners, losers, period_starts):
+        """
+        `player_ids`/`winners`/`losers`/`period_starts`: índice denso e jogos em
+        ordem cronológica (como em rankings._glicko_inputs); `tournament_ids`: o
+        torneio de cada período; `facts`: tabela de fatos dos pontos do escopo.
+        """
+        self.player_ids = np.asarray(player_ids)
+        self.tournament_ids = np.asarray(tournament_ids)
+        n_tournaments, n_players = len(self.tournament_ids), len(self.player_ids)
+        self.ranks = {
+            kind: np.zeros((n_tournaments, n_players), dtype=np.int32) for kind in RANK_KINDS
+        }
+
+        # Pontos e saldo de sets acumulados torneio a torneio
+        rows = pd.Index(self.tournament_ids).get_indexer(facts['tournament_id'])
+        columns = np.searchsorted(self.player_ids, facts['player_id'].to_numpy())
+        points = np.zeros((n_tournaments, n_players), dtype=np.int64)
+        balance = np.zeros((n_tournaments, n_players), dtype=np.int64)
+        np.add.at(points, (rows, columns), facts['points'].to_numpy())
+        np.add.at(balance, (rows, columns), facts['set_balance'].to_numpy())
+        points = points.cumsum(axis=0)
+        balance = balance.cumsum(axis=0)
+
+        engine = GlickoEngine(n_players)
+        bounds = np.append(period_starts, len(winners))
+        for t in range(n_tournaments):
+            # Mesmo desempate do ranking por pontos: saldo de sets e depois o id
+            ranked = np.flatnonzero(points[t] > 0)
+            order = ranked[np.lexsort((ranked, -balance[t, ranked], -points[t, ranked]))]
+            self.ranks['points'][t, order] = np.arange(1, len(order) + 1)
+
+            start, end = bounds[t], bounds[t + 1]
+            engine.rate_period(winners[start:end], losers[start:end])
+            # Empates de rating ficam na ordem do id, como em calculate_glicko_ratings
+            seen = np.flatnonzero(engine.seen)
+            rating = engine.ratings()[0][seen]
+            order = seen[np.lexsort((seen, -rating))]
+            self.ranks['glicko'][t, order] = np.arange(1, len(order) + 1)
+
+        self._summary = {kind: self._summarize(ranks) for kind, ranks in self.ranks.items()}
+        self._positions = {player_id: i for i, player_id in enumerate(self.player_ids.tolist())}
+
+    @staticmethod
+    def _summarize(ranks):
+        """(atual, anterior, melhor) por jogador; 0 quando não havia posição"""
+        n_tournaments, n_players = ranks.shape
+        empty = np.zeros(n_players, dtype=np.int32)
+        current = ranks[-1] if n_tournaments else empty
+        previous = ranks[-2] if n_tournaments > 1 else empty
+        unranked = np.iinfo(np.int32).max
+        best = np.where(ranks > 0, ranks, unranked).min(axis=0) if n_tournaments else empty
+        best = np.where(best == unranked, 0, best).astype(np.int32)
+        return current, previous, best
+
+    def lookup(self, kind, player_id):
+        """(posição atual, posição após o torneio anterior, melhor posição) do jogador"""
+        position = self._positions.get(player_id)
+        if position is None:
+            return 0, 0, 0
+        current, previous, best = self._summary[kind]
+        return int(current[position]), int(previous[position]), int(best[position])
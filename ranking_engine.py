@@ -0,0 +1,360 @@
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from glicko import GlickoCheckpoints, GlickoEngine, RatingHistory
+from player_summary import PlayerSummary
+from points_engine import points_facts, points_ranking
+from rank_history import RankHistory
+from streaks import player_streaks
+from tournament_results import tournament_results
+
+
+def filter_dataframe_by_period(df, column_name, time_period, chronological=False):
+    """
+    Filtra um DataFrame pelo período selecionado. `chronological`: o frame vem
+    do carregamento (apply_frame_schema) ou é um subconjunto das suas linhas, ou
+    seja, está em ordem de `column_name` com as linhas sem data no fim.
+    """
+    if not time_period:
+        return df
+
+    if isinstance(time_period, tuple):
+        start_date, end_date = time_period
+        if start_date is None and end_date is None:
+            return df
+    else:
+        start_date, end_date = time_period, None
+
+    if isinstance(start_date, str):
+        start_date = pd.to_datetime(start_date)
+    if isinstance(end_date, str):
+        end_date = pd.to_datetime(end_date)
+
+    # Colunas pré-calculadas no carregamento (ex.: 'started_month') já são datetime64
+    dates = df[column_name]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, format='%m/%Y')
+
+    # Em ordem cronológica o período é um recorte por busca binária (NaT fica no fim)
+    if chronological:
+        values = dates.to_numpy()
+        dated = np.searchsorted(values, np.datetime64('NaT'))
+        values = values[:dated]
+        start = 0
+        end = dated
+        if start_date is not None:
+            start = np.searchsorted(values, pd.Timestamp(start_date).to_datetime64(), side='left')
+        if end_date is not None:
+            end = np.searchsorted(values, pd.Timestamp(end_date).to_datetime64(), side='right')
+        return df.iloc[start:end]
+
+    mask = pd.Series(True, index=df.index)
+
+    if start_date is not None:
+        mask &= dates >= start_date
+    if end_date is not None:
+        mask &= dates <= end_date
+
+    return df.loc[mask]
+
+
+def scope_revision(tournaments, category, time_period):
+    """
+    Identifica a versão dos dados de um escopo (categoria + período) a partir das
+    revisões dos torneios que ele contém. Só muda quando um torneio do escopo é
+    incluído, removido ou alterado, então os caches dos demais escopos continuam válidos.
+    """
+    scoped = tournaments
+    if category is not None and category != "Todas":
+        scoped = scoped[scoped['category'] == category]
+    scoped = filter_dataframe_by_period(scoped, 'started_month', time_period, chronological=True)
+
+    digest = hashlib.sha1()
+    for tournament_id, revision in zip(scoped['id'], scoped['data_revision']):
+        digest.update(f"{tournament_id}:{revision};".encode())
+    return digest.hexdigest()
+
+
+BASE_PERIOD_OPTIONS = [
+    "Todo o histórico",
+    "Somente este ano",
+    "Últimos 12 meses",
+    "Últimos 24 meses",
+]
+
+
+def ranking_period_options(tournaments):
+    """Opções de período oferecidas na página de rankings"""
+    unique_years = (
+        tournaments['started_month_year']
+        .dropna()
+        .astype(str)
+        .str[-4:]
+    )
+    year_options = sorted(
+        {int(year) for year in unique_years if year.isdigit()},
+        reverse=True
+    )
+    return BASE_PERIOD_OPTIONS + [f"Ranking {year}" for year in year_options]
+
+
+def resolve_ranking_period(selected_period, now=None):
+    """Converte a opção de período em (início, fim); None para todo o histórico"""
+    if now is None:
+        now = pd.Timestamp.now().normalize()
+    filter_start = None
+    filter_end = None
+
+    if selected_period == "Últimos 12 meses":
+        filter_start = now - pd.DateOffset(months=12)
+        filter_end = now
+    elif selected_period == "Últimos 24 meses":
+        filter_start = now - pd.DateOffset(months=24)
+        filter_end = now
+    elif selected_period == "Somente este ano":
+        filter_start = pd.Timestamp(f"{now.year}-01-01")
+        filter_end = pd.Timestamp(f"{now.year}-12-31")
+    elif selected_period.startswith("Ranking "):
+        try:
+            year = int(selected_period.split(" ")[1])
+            filter_start = pd.Timestamp(f"{year}-01-01")
+            filter_end = pd.Timestamp(f"{year}-12-31")
+        except (ValueError, IndexError):
+            filter_start = None
+            filter_end = None
+
+    if filter_start is not None or filter_end is not None:
+        return (filter_start, filter_end)
+    return None
+
+
+# Marca de ausência em RankingCache: None também é um valor que pode ser guardado
+_MISSING = object()
+
+
+class RankingCache:
+    """
+    Rankings prontos por escopo ((tipo, categoria, período) -> DataFrame), com a
+    revisão dos dados usada no cálculo. Guarda só a revisão mais recente de cada
+    escopo; é preenchido sob demanda ou pelo pré-cálculo (precompute.py).
+    A revisão de cada escopo é calculada uma vez por versão dos dados, então
+    consultar o cache com (Dataset, parâmetros) não percorre os DataFrames.
+
+    Cada entrada guarda a última versão dos dados em que foi lida ou gravada; ao
+    mudar a versão, saem as entradas que não foram usadas na versão anterior
+    (ex.: "Últimos 12 meses" de dias passados, que nunca mais são consultados).
+
+    Os valores são guardados e devolvidos sem cópia, compartilhados entre
+    sessões e threads: quem recebe um DataFrame do cache não o altera (quem
+    precisar alterá-lo faz a própria cópia).
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._revisions = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def revision(self, dataset, category, time_period):
+        """Revisão do escopo na versão `dataset.version` (ver scope_revision)"""
+        key = (dataset.version, category, time_period)
+        with self._lock:
+            revision = self._revisions.get(key)
+        if revision is None:
+            revision = scope_revision(dataset.tournaments, category, time_period)
+            with self._lock:
+                # Revisões de versões anteriores não são mais consultadas
+                if any(stored[0] != dataset.version for stored in self._revisions):
+                    self._revisions = {k: v for k, v in self._revisions.items() if k[0] == dataset.version}
+                self._revisions[key] = revision
+                if dataset.version != self._version:
+                    self._entries = {k: v for k, v in self._entries.items() if v[2] == self._version}
+                    self._version = dataset.version
+        return revision
+
+    def get(self, key, revision, default=None):
+        """Valor guardado em `key` na revisão `revision`; `default` se não houver"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != revision:
+                return default
+            self._entries[key] = (entry[0], entry[1], self._version)
+        return entry[1]
+
+    def contains(self, key, revision):
+        """Se há valor em `key` na revisão `revision` (conta como uso da entrada, como `get`)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != revision:
+                return False
+            self._entries[key] = (entry[0], entry[1], self._version)
+        return True
+
+    def put(self, key, revision, value):
+        with self._lock:
+            self._entries[key] = (revision, value, self._version)
+
+    def get_or_compute(self, key, revision, compute):
+        """Valor guardado em `key` se estiver na revisão `revision`; senão calcula e guarda"""
+        value = self.get(key, revision, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, revision, value)
+        return value
+
+
+def _period_start(time_period):
+    """Data inicial do período (None para todo o histórico)"""
+    if isinstance(time_period, tuple):
+        return time_period[0]
+    return time_period or None
+
+
+def _glicko_inputs(filtered_matches):
+    """
+    Ordena as partidas cronologicamente pelo `sort_key` do carregamento (cada
+    torneio é um período de rating) e monta o índice denso de jogadores. Retorna
+    (partidas ordenadas, ids dos jogadores, índices dos vencedores, índices dos
+    perdedores, início de cada período).
+    """
+    filtered_matches = filtered_matches.sort_values('sort_key', kind='stable')
+    player_ids, codes = np.unique(
+        np.concatenate([filtered_matches['winner_id'].to_numpy(), filtered_matches['loser_id'].to_numpy()]),
+        return_inverse=True
+    )
+    winners, losers = np.split(codes, 2)
+    tournament_ids = filtered_matches['tournament_id'].to_numpy()
+    period_starts = np.flatnonzero(np.r_[True, tournament_ids[1:] != tournament_ids[:-1]][:len(tournament_ids)])
+    return filtered_matches, player_ids, winners, losers, period_starts
+
+
+def compute_glicko_ratings(matches, players, tournaments, category=None, time_period=None, checkpoints=None, as_of=None):
+    """
+    Calcula ratings Glicko-2 para os jogadores (`checkpoints`: GlickoCheckpoints a
+    usar; padrão, checkpoints novos). `as_of`: id de um torneio; ratings do escopo
+    logo após esse torneio, retomando do checkpoint mais próximo antes dele.
+    """
+    # Filtrar partidas por categoria e período se especificado
+    filtered_matches = matches.copy()
+    
+    if category != "Todas":
+        tournament_ids = tournaments[tournaments['category'] == category]['id'].tolist()
+        filtered_matches = filtered_matches[filtered_matches['tournament_id'].isin(tournament_ids)]
+    
+    filtered_matches = filter_dataframe_by_period(
+        filtered_matches, 'started_month', time_period, chronological=True
+    )
+    
+    if as_of is not None:
+        # Partidas em ordem de sort_key: os torneios até `as_of` são um prefixo
+        as_of_key = tournaments.loc[tournaments['id'] == as_of, 'sort_key']
+        end = 0
+        if not as_of_key.empty:
+            end = np.searchsorted(filtered_matches['sort_key'].to_numpy(), as_of_key.iloc[0], side='right')
+        filtered_matches = filtered_matches.iloc[:end]
+    
+    if filtered_matches.empty:
+        return pd.DataFrame(columns=['player_id', 'rating', 'rd', 'vol', 'id', 'name'])
+    
+    filtered_matches, player_ids, winners, losers, period_starts = _glicko_inputs(filtered_matches)
+    tournament_ids = filtered_matches['tournament_id'].to_numpy()
+    
+    # Sequência (torneio, revisão) dos períodos: permite retomar do checkpoint do escopo
+    revisions = tournaments.set_index('id')['data_revision'].astype(str)
+    period_ids = tournament_ids[period_starts]
+    periods = list(zip(period_ids.tolist(), revisions.reindex(period_ids).tolist()))
+    
+    if checkpoints is None:
+        checkpoints = GlickoCheckpoints()
+    engine = checkpoints.rate(
+        (category, _period_start(time_period)), periods, player_ids, winners, losers, period_starts
+    )
+    rating, rd, vol = engine.ratings()
+    ratings_df = pd.DataFrame({
+        'player_id': player_ids,
+        'rating': rating,
+        'rd': rd,
+        'vol': vol
+    })
+    
+    # Adicionar nomes dos jogadores
+    ratings_df = ratings_df.merge(players[['id', 'name']], left_on='player_id', right_on='id')
+    ratings_df['name'] = ratings_df['name'].str.upper()
+    ratings_df = ratings_df.sort_values(['rating', 'player_id'], ascending=[False, True])
+    
+    return ratings_df
+
+
+def compute_rating_history(matches, category="Todas"):
+    """
+    Recalcula o Glicko-2 desde o primeiro jogo registrando o rating antes e depois
+    de cada partida. Partidas de torneios sem data ficam de fora: não têm chave
+    para a busca por data, e na ordem do carregamento vêm depois de todas as outras.
+    """
+    filtered_matches = matches[matches['started_date_key'].notna()]
+    if category != "Todas":
+        filtered_matches = filtered_matches[filtered_matches['tournament_category'] == category]
+    
+    filtered_matches, player_ids, winners, losers, period_starts = _glicko_inputs(filtered_matches)
+    engine = GlickoEngine(len(player_ids))
+    pre_rating, pre_rd, post_rating, post_rd = engine.run_with_history(winners, losers, period_starts)
+    
+    return RatingHistory(
+        player_ids, winners, losers,
+        filtered_matches['started_date_key'].to_numpy('int32'),
+        filtered_matches['match_id'].to_numpy('int32'),
+        pre_rating, pre_rd, post_rating, post_rd
+    )
+
+
+def _filter_points_matches(matches, tournaments, category=None, time_period=None):
+    """Partidas do escopo (categoria + período) usadas no ranking por pontos"""
+    filtered_matches = matches
+    
+    if category is not None and category != "Todas":
+        # Usar o mesmo método que o Glicko: filtrar por tournament_id baseado na categoria
+        tournament_ids = tournaments[tournaments['category'] == category]['id'].tolist()
+        filtered_matches = filtered_matches[filtered_matches['tournament_id'].isin(tournament_ids)]
+    
+    return filter_dataframe_by_period(
+        filtered_matches, 'started_month', time_period, chronological=True
+    )
+
+
+def compute_points_facts(matches, tournaments, category=None, time_period=None, results=None):
+    return points_facts(_filter_points_matches(matches, tournaments, category, time_period), results)
+
+
+def compute_points_ranking(matches, players, tournaments, category=None, time_period=None, facts=None):
+    """Calcula ranking baseado em pontos por vitória e saldo de sets"""
+    filtered_matches = _filter_points_matches(matches, tournaments, category, time_period)
+    return points_ranking(filtered_matches, players, facts)
+
+
+def compute_rank_history(matches, tournaments, category=None, time_period=None, facts=None):
+    filtered_matches = _filter_points_matches(matches, tournaments, category, time_period)
+    if facts is None:
+        facts = points_facts(filtered_matches)
+    filtered_matches, player_ids, winners, losers, period_starts = _glicko_inputs(filtered_matches)
+    tournament_ids = filtered_matches['tournament_id'].to_numpy()[period_starts]
+    return RankHistory(player_ids, tournament_ids, facts, winners, losers, period_starts)
+
+
+def compute_player_streaks(matches, tournaments, category=None):
+    """Sequências de todos os jogadores da categoria (ver streaks.player_streaks)"""
+    return player_streaks(_filter_points_matches(matches, tournaments, category))
+
+
+def compute_player_summary(matches, tournaments, category=None):
+    """Estatísticas de todos os jogadores da categoria (ver player_summary.PlayerSummary)"""
+    return PlayerSummary(_filter_points_matches(matches, tournaments, category))
+
+
+def cached_tournament_results(dataset, cache):
+    """Campeão, vice, semifinalistas, partidas e rodada final de cada torneio (montado uma vez por versão em `cache`)"""
+    return cache.get_or_compute(
+        ('tournament_results',), dataset.version, lambda: tournament_results(dataset.matches)
+    )
@@ -1,363 +1,172 @@
+import html
+import json
+
 import pandas as pd
 import numpy as np
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-from glicko import GlickoSystem
+import streamlit.components.v1 as components
+from glicko import GlickoCheckpoints
+from points_engine import ROLLING_WEEKS, RollingRanking, date_key_to_datetime, player_points_breakdown
+from ranking_engine import (
+    RankingCache,
+    cached_tournament_results,
+    compute_glicko_ratings,
+    compute_player_streaks,
+    compute_player_summary,
+    compute_points_facts,
+    compute_points_ranking,
+    compute_rank_history,
+    compute_rating_history,
+    filter_dataframe_by_period,
+    ranking_period_options,
+    resolve_ranking_period,
+)
+from streaks import active_win_streaks
 
 
-def filter_dataframe_by_period(df, column_name, time_period):
-    """Filtra um DataFrame pelo período selecionado."""
-    if not time_period:
-        return df
+@st.cache_resource(show_spinner=False)
+def get_ranking_cache():
+    """Cache de rankings compartilhado entre sessões"""
+    return RankingCache()
 
-    if isinstance(time_period, tuple):
-        start_date, end_date = time_period
-        if start_date is None and end_date is None:
-            return df
-    else:
-        start_date, end_date = time_period, None
 
-    if isinstance(start_date, str):
-        start_date = pd.to_datetime(start_date)
-    if isinstance(end_date, str):
-        end_date = pd.to_datetime(end_date)
+@st.cache_resource(show_spinner=False)
+def get_glicko_checkpoints():
+    """Checkpoints do Glicko-2 compartilhados entre sessões"""
+    return GlickoCheckpoints()
 
-    dates = pd.to_datetime(df[column_name], format='%m/%Y')
-    mask = pd.Series(True, index=df.index)
 
-    if start_date is not None:
-        mask &= dates >= start_date
-    if end_date is not None:
-        mask &= dates <= end_date
+def _cached_scope(dataset, kind, category, time_period, compute):
+    """Resultado `kind` do escopo no RankingCache, chaveado pela versão dos dados e pelos parâmetros"""
+    cache = get_ranking_cache()
+    revision = cache.revision(dataset, category, time_period)
+    return cache.get_or_compute((kind, category, time_period), revision, compute)
 
-    return df.loc[mask]
 
+def calculate_glicko_ratings(dataset, category=None, time_period=None):
+    """Calcula ratings Glicko-2 para os jogadores (com cache por escopo)"""
+    return _cached_scope(
+        dataset, 'glicko', category, time_period,
+        lambda: compute_glicko_ratings(*dataset.frames, category, time_period, get_glicko_checkpoints())
+    )
 
-@st.cache_data
-def calculate_glicko_ratings(matches, players, tournaments, category=None, time_period=None):
-    """Calcula ratings Glicko-2 para os jogadores"""
-    # Filtrar partidas por categoria e período se especificado
-    filtered_matches = matches.copy()
-    
-    if category != "Todas":
-        tournament_ids = tournaments[tournaments['category'] == category]['id'].tolist()
-        filtered_matches = filtered_matches[filtered_matches['tournament_id'].isin(tournament_ids)]
-    
-    filtered_matches = filter_dataframe_by_period(
-        filtered_matches, 'started_month_year', time_period
+
+def calculate_rating_history(dataset, category="Todas"):
+    """Histórico de ratings Glicko-2 de todos os jogadores em todo o período (com cache por escopo)"""
+    return _cached_scope(
+        dataset, 'rating_history', category, None,
+        lambda: compute_rating_history(dataset.matches, category)
     )
-    
-    # Obter lista de jogadores ativos no período
-    active_players = pd.concat([
-        filtered_matches['winner_id'],
-        filtered_matches['loser_id']
-    ]).unique()
-    
-    # Inicializar sistema Glicko-2
-    glicko_system = GlickoSystem()
-    
-    # Processar partidas em ordem cronológica
-    filtered_matches = filtered_matches.sort_values('started_month_year')
-    
-    for _, match in filtered_matches.iterrows():
-        if pd.notna(match['winner_id']) and pd.notna(match['loser_id']):
-            glicko_system.update_match(match['winner_id'], match['loser_id'])
-    
-    # Converter ratings para DataFrame apenas para jogadores ativos
-    ratings_df = pd.DataFrame([
-        {
-            'player_id': player_id,
-            'rating': rating,
-            'rd': rd,
-            'vol': vol
-        }
-        for player_id in active_players
-        for rating, rd, vol in [glicko_system.get_rating(player_id)]
-    ])
-    
-    # Adicionar nomes dos jogadores
-    ratings_df = ratings_df.merge(players[['id', 'name']], left_on='player_id', right_on='id')
-    ratings_df['name'] = ratings_df['name'].str.upper()
-    ratings_df = ratings_df.sort_values('rating', ascending=False)
-    
-    return ratings_df
 
-@st.cache_data
-def calculate_points_ranking(matches, players, tournaments, category=None, time_period=None):
-    """Calcula ranking baseado em pontos por vitória e saldo de sets"""
-    # Filtrar partidas por categoria e período se especificado
-    filtered_matches = matches.copy()
-    
-    if category is not None and category != "Todas":
-        # Usar o mesmo método que o Glicko: filtrar por tournament_id baseado na categoria
-        tournament_ids = tournaments[tournaments['category'] == category]['id'].tolist()
-        filtered_matches = filtered_matches[filtered_matches['tournament_id'].isin(tournament_ids)]
-    
-    filtered_matches = filter_dataframe_by_period(
-        filtered_matches, 'started_month_year', time_period
+
+def calculate_tournament_results(dataset, cache=None):
+    """Campeão, vice, semifinalistas, partidas e rodada final de cada torneio (montado uma vez por versão)"""
+    if cache is None:
+        cache = get_ranking_cache()
+    return cached_tournament_results(dataset, cache)
+
+
+def calculate_points_facts(dataset, category=None, time_period=None):
+    """Tabela de fatos (jogador x torneio) com pontos e etapa alcançada (com cache por escopo)"""
+    results = calculate_tournament_results(dataset)
+    return _cached_scope(
+        dataset, 'facts', category, time_period,
+        lambda: compute_points_facts(dataset.matches, dataset.tournaments, category, time_period, results)
     )
-    
-    def get_points_for_round(row, is_champion=False):
-        if pd.isna(row['round']) or pd.isna(row['tournament_name']):
-            return 0
-            
-        is_finals = 'FINALS' in str(row['tournament_name']).upper()
-        
-        # Nova estrutura de pontos baseada nos Grand Slams
-        if is_finals:
-            # Torneios FINALS - estrutura adaptada
-            if row['round'] == 3:  # Final
-                return 2000 if is_champion else 1200  # Campeão vs Vice-campeão
-            elif row['round'] == 2:  # Semifinal
-                return 720
-            elif row['round'] == 1:  # Quartas
-                return 360
-        else:
-            # Torneios regulares - estrutura adaptada
-            if row['round'] == 4:  # Final
-                return 2000 if is_champion else 1200  # Campeão vs Vice-campeão
-            elif row['round'] == 3:  # Semifinal
-                return 720
-            elif row['round'] == 2:  # Quartas
-                return 360
-            elif row['round'] == 1:  # Oitavas/Primeira rodada
-                return 180
-        
-        return 0
-    
-    # Calcular pontos dos vencedores considerando se são campeões
-    points_list = []
-    for _, row in filtered_matches.iterrows():
-        # Verificar se é campeão do torneio
-        tournament_matches = filtered_matches[filtered_matches['tournament_id'] == row['tournament_id']]
-        max_round = tournament_matches['round'].max()
-        is_champion = (row['round'] == max_round)
-        
-        points = get_points_for_round(row, is_champion)
-        points_list.append(points)
-    
-    filtered_matches['points'] = points_list
-    
-    # Pontos dos vencedores por torneio (pegar a maior rodada vencida no torneio)
-    winners_tournament_points = filtered_matches.groupby(['winner_id', 'tournament_id'])['points'].max().reset_index()
-    winners_tournament_points = winners_tournament_points.rename(columns={'winner_id': 'player_id'})
-    
-    # Calcular pontos dos perdedores (vice-campeões nas finais e participação)
-    losers_points_list = []
-    
-    for _, row in filtered_matches.iterrows():
-        loser_id = row['loser_id']
-        tournament_id = row['tournament_id']
-        round_num = row['round']
-        
-        # Verificar se é vice-campeão (perdedor da rodada mais alta)
-        tournament_matches = filtered_matches[filtered_matches['tournament_id'] == tournament_id]
-        max_round = tournament_matches['round'].max()
-        
-        if round_num == max_round:
-            # Vice-campeão (perdedor da final)
-            is_finals = 'FINALS' in str(row['tournament_name']).upper()
-            points = 1200  # Vice-campeão recebe 1200 pontos
-        elif round_num == 1:
-            # Perdedor na primeira rodada recebe pontos de participação
-            points = 180
-        else:
-            # Outros perdedores recebem pontos baseados na rodada que perderam
-            if round_num == max_round - 1:  # Perdedor na semifinal
-                points = 720
-            elif round_num == max_round - 2:  # Perdedor nas quartas
-                points = 360
-            else:
-                points = 0
-        
-        if points > 0:
-            losers_points_list.append({
-                'player_id': loser_id,
-                'tournament_id': tournament_id,
-                'points': points
-            })
-    
-    if losers_points_list:
-        losers_df = pd.DataFrame(losers_points_list)
-        # Pontos dos perdedores por torneio (ex.: vice-campeão, participação)
-        losers_tournament_points = losers_df.groupby(['player_id', 'tournament_id'])['points'].max().reset_index()
-    else:
-        losers_tournament_points = pd.DataFrame(columns=['player_id', 'tournament_id', 'points'])
 
-    # Combinar por torneio e pegar o melhor resultado do jogador em cada torneio (evita somar 720 + 1200)
-    combined_tournament_points = pd.concat([winners_tournament_points, losers_tournament_points], ignore_index=True)
-    if not combined_tournament_points.empty:
-        best_tournament_points = combined_tournament_points.groupby(['player_id', 'tournament_id'])['points'].max().reset_index()
-        all_points = best_tournament_points.groupby('player_id')['points'].sum().reset_index()
-    else:
-        all_points = pd.DataFrame(columns=['player_id', 'points'])
-    
-    # Calcular saldo de sets para cada jogador
-    set_balance = filtered_matches.groupby('winner_id')['set_balance'].sum().reset_index()
-    set_balance.columns = ['player_id', 'set_balance']
-    
-    # Adicionar saldo de sets negativo para os perdedores
-    loser_set_balance = filtered_matches.groupby('loser_id')['set_balance'].sum().reset_index()
-    loser_set_balance.columns = ['player_id', 'set_balance']
-    loser_set_balance['set_balance'] = -loser_set_balance['set_balance']
-    
-    # Combinar saldo de sets
-    all_set_balance = pd.concat([set_balance, loser_set_balance])
-    all_set_balance = all_set_balance.groupby('player_id')['set_balance'].sum().reset_index()
-    
-    # Juntar pontos com saldo de sets
-    ranking_df = all_points.merge(all_set_balance, on='player_id', how='left')
-    ranking_df['set_balance'] = ranking_df['set_balance'].fillna(0)
-    
-    # Adicionar nomes dos jogadores e ordenar por pontos (primeiro critério) e saldo de sets (segundo critério)
-    ranking_df = ranking_df.merge(players[['id', 'name']], left_on='player_id', right_on='id')
-    ranking_df['name'] = ranking_df['name'].str.upper()
-    ranking_df = ranking_df[ranking_df['points'] > 0].sort_values(['points', 'set_balance'], ascending=[False, False])
-    
-    return ranking_df
 
-@st.cache_data
-def get_player_points_breakdown(player_id, matches, players, tournaments, category=None, time_period=None):
-    """Retorna detalhamento dos pontos de um jogador específico"""
-    # Filtrar partidas por categoria e período se especificado
-    filtered_matches = matches.copy()
-    
-    if category is not None and category != "Todas":
-        tournament_ids = tournaments[tournaments['category'] == category]['id'].tolist()
-        filtered_matches = filtered_matches[filtered_matches['tournament_id'].isin(tournament_ids)]
-    
-    filtered_matches = filter_dataframe_by_period(
-        filtered_matches, 'started_month_year', time_period
+def calculate_points_ranking(dataset, category=None, time_period=None):
+    """Calcula ranking baseado em pontos por vitória e saldo de sets (com cache por escopo)"""
+    facts = calculate_points_facts(dataset, category, time_period)
+    return _cached_scope(
+        dataset, 'points', category, time_period,
+        lambda: compute_points_ranking(*dataset.frames, category, time_period, facts)
+    )
+
+
+def calculate_rolling_ranking(dataset, category=None, weeks=ROLLING_WEEKS):
+    """Ranking móvel de N semanas em todas as datas de torneio da categoria (com cache por escopo)"""
+    cache = get_ranking_cache()
+    return cache.get_or_compute(
+        ('rolling', category, weeks), cache.revision(dataset, category, None),
+        lambda: RollingRanking(calculate_points_facts(dataset, category, None), weeks)
     )
-    
-    # Filtrar partidas onde o jogador participou
-    player_matches = filtered_matches[
-        (filtered_matches['winner_id'] == player_id) | 
-        (filtered_matches['loser_id'] == player_id)
-    ].copy()
-    
-    if player_matches.empty:
-        return pd.DataFrame()
-    
-    def get_points_for_round(row, is_champion=False):
-        if pd.isna(row['round']) or pd.isna(row['tournament_name']):
-            return 0
-            
-        is_finals = 'FINALS' in str(row['tournament_name']).upper()
-        
-        if is_finals:
-            if row['round'] == 3:  # Final
-                return 2000 if is_champion else 1200
-            elif row['round'] == 2:  # Semifinal
-                return 720
-            elif row['round'] == 1:  # Quartas
-                return 360
-        else:
-            if row['round'] == 4:  # Final
-                return 2000 if is_champion else 1200
-            elif row['round'] == 3:  # Semifinal
-                return 720
-            elif row['round'] == 2:  # Quartas
-                return 360
-            elif row['round'] == 1:  # Oitavas/Primeira rodada
-                return 180
-        
-        return 0
-    
-    def get_stage_label(round_num, tournament_name):
-        """Retorna o nome da etapa (sem preposição) para compor frases de derrota."""
-        is_finals = 'FINALS' in str(tournament_name).upper()
-        if is_finals:
-            mapping = {1: 'Quartas', 2: 'Semifinal', 3: 'Final'}
-        else:
-            mapping = {1: 'Oitavas', 2: 'Quartas', 3: 'Semifinal', 4: 'Final'}
-        return mapping.get(int(round_num), f"Rodada {int(round_num)}")
-    
-    def loss_phrase(round_num, tournament_name):
-        """Monta a frase 'Perdeu na(s) X' com a preposição correta."""
-        if int(round_num) == 1 and 'FINALS' not in str(tournament_name).upper():
-            # Caso especial para torneios regulares onde 1 é 'Oitavas' (plural)
-            label = get_stage_label(round_num, tournament_name)
-            prep = 'nas' if label in ('Quartas', 'Oitavas') else 'na'
-            return f"Perdeu {prep} {label}"
-        label = get_stage_label(round_num, tournament_name)
-        prep = 'nas' if label in ('Quartas', 'Oitavas') else 'na'
-        return f"Perdeu {prep} {label}"
-    
-    # Calcular pontos por torneio
-    breakdown = []
-    
-    for tournament_id in player_matches['tournament_id'].unique():
-        tournament_matches = player_matches[player_matches['tournament_id'] == tournament_id]
-        tournament_info = tournaments[tournaments['id'] == tournament_id].iloc[0]
-        
-        # Encontrar a melhor performance no torneio com rótulo de etapa alcançada
-        best_performance = None
-        max_points = 0
-
-        wins = tournament_matches[tournament_matches['winner_id'] == player_id]
-        losses = tournament_matches[tournament_matches['loser_id'] == player_id]
-
-        all_tournament_matches = filtered_matches[filtered_matches['tournament_id'] == tournament_id]
-        tournament_max_round = all_tournament_matches['round'].max()
-
-        # Caso 1: Campeão
-        if not wins.empty and wins['round'].max() == tournament_max_round:
-            best_win = wins[wins['round'] == wins['round'].max()].iloc[0]
-            points = get_points_for_round(best_win, is_champion=True)
-            max_points = points
-            best_performance = {
-                'tournament': tournament_info['name'],
-                'date': tournament_info['started_month_year'],
-                'performance': "Campeão",
-                'points': points
-            }
-        else:
-            # Derrota existente define a etapa alcançada
-            if not losses.empty:
-                max_round_lost = int(losses['round'].max())
-                # Caso 2: Perdeu na Final (vice)
-                if max_round_lost == int(tournament_max_round):
-                    points = 1200
-                    max_points = points
-                    best_performance = {
-                        'tournament': tournament_info['name'],
-                        'date': tournament_info['started_month_year'],
-                        'performance': loss_phrase(max_round_lost, tournament_info['name']),
-                        'points': points
-                    }
-                else:
-                    # Determinar pontos baseados na rodada em que perdeu
-                    if max_round_lost == tournament_max_round - 1:  # Perdeu na semifinal
-                        points = 720
-                    elif max_round_lost == tournament_max_round - 2:  # Perdeu nas quartas
-                        points = 360
-                    elif max_round_lost == 1:  # Perdeu na primeira rodada
-                        points = 180
-                    else:
-                        points = 0
-                    
-                    if points > 0:
-                        max_points = points
-                        best_performance = {
-                            'tournament': tournament_info['name'],
-                            'date': tournament_info['started_month_year'],
-                            'performance': loss_phrase(max_round_lost, tournament_info['name']),
-                            'points': points
-                        }
-        
-        if best_performance:
-            breakdown.append(best_performance)
-    
-    # Converter para DataFrame e ordenar por pontos
-    if breakdown:
-        breakdown_df = pd.DataFrame(breakdown)
-        breakdown_df = breakdown_df.sort_values('points', ascending=False)
-        return breakdown_df
-    else:
-        return pd.DataFrame()
+
+
+def calculate_rank_history(dataset, category=None, time_period=None):
+    """Posições nos rankings por pontos e Glicko-2 após cada torneio do escopo (com cache por escopo)"""
+    facts = calculate_points_facts(dataset, category, time_period)
+    return _cached_scope(
+        dataset, 'history', category, time_period,
+        lambda: compute_rank_history(dataset.matches, dataset.tournaments, category, time_period, facts)
+    )
+
+
+def calculate_player_streaks(dataset, category="Todas"):
+    """Sequências (atual, maior de vitórias e de derrotas) de todos os jogadores da categoria (com cache por escopo)"""
+    return _cached_scope(
+        dataset, 'streaks', category, None,
+        lambda: compute_player_streaks(dataset.matches, dataset.tournaments, category)
+    )
+
+
+def active_streaks_table(streaks, matches, players, limit=20):
+    """Maiores sequências de vitórias em andamento, prontas para exibição"""
+    active = active_win_streaks(streaks).head(limit)
+    names = players.set_index('id')['name'].str.upper()
+    last_dates = matches.loc[active['last_row'].to_numpy(), 'started_at'].to_numpy()
+    return pd.DataFrame({
+        'Posição': np.arange(1, len(active) + 1),
+        'Jogador': names.reindex(active.index).fillna('Desconhecido').to_numpy(),
+        'Vitórias Seguidas': active['current_streak'].to_numpy(),
+        'Maior Sequência': active['longest_win_streak'].to_numpy(),
+        'Último Jogo': pd.to_datetime(last_dates).strftime('%d/%m/%Y'),
+    })
+
+
+def calculate_player_summary(dataset, category="Todas"):
+    """Estatísticas de todos os jogadores da categoria, em uma passada (com cache por escopo)"""
+    return _cached_scope(
+        dataset, 'summary', category, None,
+        lambda: compute_player_summary(dataset.matches, dataset.tournaments, category)
+    )
+
+
+# Destaques da página de rankings: coluna da tabela de estatísticas e mínimo de jogos
+SUMMARY_LEADERBOARDS = {
+    'Títulos': ('titles', 1),
+    'Finais Disputadas': ('finals_played', 1),
+    'Vitórias': ('wins', 1),
+    'Jogos': ('total_matches', 1),
+    'Aproveitamento (mín. 10 jogos)': ('win_rate', 10),
+    'Vitórias no Terceiro Set': ('three_set_wins', 1),
+}
+
+
+def summary_leaderboard(summary, players, stat, limit=20):
+    """
+    Líderes de uma estatística de SUMMARY_LEADERBOARDS (empates: mais vitórias e
+    depois o id); quando a estatística já é uma das colunas fixas, ela aparece uma vez só
+    """
+    column, min_matches = SUMMARY_LEADERBOARDS[stat]
+    table = summary.table[summary.table['total_matches'] >= min_matches].reset_index()
+    table = table[table[column] > 0]
+    table = table.sort_values([column, 'wins', 'player_id'], ascending=[False, False, True]).head(limit)
+    names = players.set_index('id')['name'].str.upper()
+    return pd.DataFrame({
+        'Posição': np.arange(1, len(table) + 1),
+        'Jogador': table['player_id'].map(names).fillna('Desconhecido').to_numpy(),
+        stat: table[column].map(lambda value: f"{value:.1f}%").to_numpy() if column == 'win_rate' else table[column].to_numpy(),
+        'Jogos': table['total_matches'].to_numpy(),
+        'Vitórias': table['wins'].to_numpy(),
+        'Títulos': table['titles'].to_numpy(),
+    })
+
+
+def get_player_points_breakdown(player_id, dataset, category=None, time_period=None):
+    """Retorna detalhamento dos pontos de um jogador específico"""
+    facts = calculate_points_facts(dataset, category, time_period)
+    return player_points_breakdown(facts, player_id)
 
 def get_round_name(round_num, tournament_name):
     """Converte número da rodada para nome legível"""
@@ -382,108 +191,218 @@ def get_round_name(round_num, tournament_name):
     
     return f"Rodada {round_num}"
 
-def display_ranking_with_icons(ranking_df, ranking_type="Glicko", matches=None, players=None, tournaments=None, category=None, time_period=None):
-    """Exibe ranking com linhas compactas, nome clicável e tooltip on-hover."""
+def movement_badge(current, previous):
+    """Indicador ▲/▼ da variação de posição desde o torneio anterior"""
+    if not current:
+        return ""
+    if not previous:
+        return "<span style='color:#0d6efd;'>novo</span>"
+    change = previous - current
+    if change > 0:
+        return f"<span style='color:#198754;'>▲{change}</span>"
+    if change < 0:
+        return f"<span style='color:#dc3545;'>▼{-change}</span>"
+    return "<span style='color:#6c757d;'>=</span>"
+
+
+# Componente do ranking: todas as linhas vão como dados (JSON) em um único
+# elemento, e o navegador filtra pelo nome a cada tecla e desenha só as linhas
+# visíveis na rolagem (altura fixa por linha), sem voltar ao servidor.
+RANKING_ROW_HEIGHT = 50
+RANKING_VISIBLE_ROWS = 12
+
+RANKING_TEMPLATE = """<style>
+body { margin:0; font-family:"Source Sans Pro", sans-serif; color:#31333f; }
+.ranking-search { width:100%; box-sizing:border-box; padding:8px 10px; margin-bottom:8px; border:1px solid #d0d4da; border-radius:8px; font-size:14px; }
+.ranking-viewport { overflow-y:auto; position:relative; }
+.ranking-window { position:absolute; left:0; right:0; top:0; }
+.ranking-row { display:flex; align-items:center; gap:8px; height:44px; box-sizing:border-box; padding:0 10px; margin-bottom:6px; border:1px solid #dee2e6; border-radius:8px; background:#f8f9fa; }
+.ranking-row.top3 { border-color:#ffc107; background:#fff3cd; }
+.ranking-row.top10 { border-color:#007bff; background:#e6f3ff; }
+.ranking-pos { width:56px; font-weight:700; text-align:right; white-space:nowrap; }
+.ranking-move { width:44px; font-size:12px; font-weight:700; text-align:center; }
+.ranking-name { flex:1; font-weight:700; white-space:nowrap; overflow:hidden; text-overflow:ellipsis; }
+.ranking-name a { color:inherit; text-decoration:none; }
+.ranking-name a:hover { text-decoration:underline; }
+.ranking-stats { font-size:12px; color:#6c757d; min-width:220px; text-align:right; }
+.ranking-hover { display:none; position:fixed; right:10px; background:#ffffff; color:#111; border:1px solid #dee2e6; border-radius:8px; box-shadow:0 6px 24px rgba(0,0,0,0.12); padding:10px; z-index:10; min-width:260px; max-width:420px; max-height:calc(100vh - 8px); overflow:auto; box-sizing:border-box; }
+.ranking-hover h4 { margin:0 0 6px 0; font-size:13px; }
+.ranking-hover table { width:100%; border-collapse:collapse; font-size:12px; }
+.ranking-hover td, .ranking-hover th { padding:4px 6px; border-bottom:1px solid #f1f3f5; text-align:left; }
+.ranking-caption { font-size:13px; color:#6c757d; margin-top:4px; }
+</style>
+<input class="ranking-search" type="search" placeholder="🔍 Buscar jogador" autocomplete="off">
+<div class="ranking-viewport"><div class="ranking-spacer"><div class="ranking-window"></div></div></div>
+<div class="ranking-caption"></div>
+<div class="ranking-hover"></div>
+<script>
+const ROWS = __ROWS__;
+const HOST = __HOST__;
+const ROW_HEIGHT = __ROW_HEIGHT__;
+const VISIBLE_ROWS = __VISIBLE_ROWS__;
+const MEDALS = {1: "🥇", 2: "🥈", 3: "🥉"};
+
+const search = document.querySelector(".ranking-search");
+const viewport = document.querySelector(".ranking-viewport");
+const spacer = document.querySelector(".ranking-spacer");
+const rowsWindow = document.querySelector(".ranking-window");
+const caption = document.querySelector(".ranking-caption");
+const hover = document.querySelector(".ranking-hover");
+let visible = ROWS;
+let rendered = [];
+
+viewport.style.height = Math.min(ROWS.length, VISIBLE_ROWS) * ROW_HEIGHT + "px";
+
+function escapeHtml(text) {
+    return String(text).replace(/[&<>"']/g, c => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"})[c]);
+}
+
+function rowHtml(row, index) {
+    const tier = row.pos <= 3 ? " top3" : row.pos <= 10 ? " top10" : "";
+    const link = `${HOST}?page=Análise de Jogadores&player_id=${row.id}`;
+    return `<div class="ranking-row${tier}" data-index="${index}">`
+        + `<div class="ranking-pos">${row.pos}º ${MEDALS[row.pos] || ""}</div>`
+        + `<div class="ranking-move">${row.move}</div>`
+        + `<div class="ranking-name"><a href="${escapeHtml(link)}" target="_parent">${escapeHtml(row.name)}</a></div>`
+        + `<div class="ranking-stats">${escapeHtml(row.stats)}</div>`
+        + `</div>`;
+}
+
+function render() {
+    // Só as linhas na área visível (mais uma margem) ficam no DOM
+    const first = Math.max(0, Math.floor(viewport.scrollTop / ROW_HEIGHT) - 2);
+    rendered = visible.slice(first, first + VISIBLE_ROWS + 4);
+    rowsWindow.style.transform = `translateY(${first * ROW_HEIGHT}px)`;
+    rowsWindow.innerHTML = rendered.map(rowHtml).join("");
+}
+
+function filter() {
+    // A posição é a do ranking completo, mesmo com busca
+    const term = search.value.trim().toUpperCase();
+    visible = term ? ROWS.filter(row => row.name.includes(term)) : ROWS;
+    spacer.style.height = visible.length * ROW_HEIGHT + "px";
+    caption.textContent = visible.length
+        ? `${visible.length} de ${ROWS.length} jogadores`
+        : "Nenhum jogador encontrado.";
+    viewport.scrollTop = 0;
+    hover.style.display = "none";
+    render();
+}
+
+let frame = null;
+viewport.addEventListener("scroll", () => {
+    hover.style.display = "none";
+    if (frame === null) {
+        frame = requestAnimationFrame(() => { frame = null; render(); });
+    }
+});
+search.addEventListener("input", filter);
+
+rowsWindow.addEventListener("mouseover", event => {
+    const element = event.target.closest(".ranking-row");
+    if (!element) return;
+    const row = rendered[Number(element.dataset.index)];
+    hover.innerHTML = `<h4>${escapeHtml(row.title)}</h4>${row.hover}`;
+    hover.style.display = "block";
+    // Abaixo da linha, ou acima quando não cabe no componente
+    const box = element.getBoundingClientRect();
+    let top = box.bottom + 4;
+    if (top + hover.offsetHeight > window.innerHeight) {
+        top = Math.max(0, box.top - hover.offsetHeight - 4);
+    }
+    hover.style.top = top + "px";
+});
+viewport.addEventListener("mouseleave", () => { hover.style.display = "none"; });
+
+filter();
+</script>"""
+
+
+def _ranking_row(position, row, ranking_type, facts=None, history=None):
+    """Dados de uma linha do ranking (posição, variação, nome, resumo e tooltip) para o componente"""
+    player_id = int(row['player_id'])
+    player_name = row['name']
+
+    # Info compacta por tipo
+    if ranking_type == "Glicko":
+        rating = int(row['rating'])
+        rd = int(row['rd'])
+        extra_info = f"Rating: {rating} | RD: {rd}"
+        hover_title = f"{player_name} — Glicko-2"
+        hover_body = f"<div>Rating: <b>{rating}</b><br/>Desvio (RD): <b>{rd}</b></div>"
+    else:
+        points = int(row['points'])
+        set_balance = int(row['set_balance'])
+        extra_info = f"Pontos: {points:,} | Saldo: {set_balance:+d}"
+        hover_title = f"{player_name} — Detalhes dos pontos"
+        # Breakdown para tooltip: recorte da tabela de fatos do escopo
+        breakdown_html = "<div>Sem pontos no período.</div>"
+        if facts is not None:
+            breakdown_df = player_points_breakdown(facts, player_id)
+            if not breakdown_df.empty:
+                total_pts = int(breakdown_df['points'].sum())
+                rows_html = "".join(
+                    f"<tr><td>{html.escape(r['tournament'])}</td><td>{r['date']}</td><td>{r['performance']}</td><td style='text-align:right;'>{int(r['points'])}</td></tr>"
+                    for _, r in breakdown_df.head(5).iterrows()
+                )
+                breakdown_html = (
+                    f"<div style='margin-bottom:6px;'>Total: <b>{total_pts:,} pts</b></div>"
+                    f"<table><thead><tr><th>Torneio</th><th>Data</th><th>Resultado</th><th style='text-align:right;'>Pts</th></tr></thead><tbody>{rows_html}</tbody></table>"
+                )
+        hover_body = breakdown_html
+
+    # Variação desde o torneio anterior e melhor posição (histórico de posições)
+    move_html = ""
+    if history is not None:
+        current, previous, best = history.lookup('glicko' if ranking_type == "Glicko" else 'points', player_id)
+        move_html = movement_badge(current, previous)
+        if best:
+            hover_body += f"<div style='margin-top:6px;'>Melhor posição: <b>{best}º</b></div>"
+
+    return {
+        'pos': position,
+        'id': player_id,
+        'name': player_name,
+        'move': move_html,
+        'stats': extra_info,
+        'title': hover_title,
+        'hover': hover_body,
+    }
+
+
+def display_ranking_with_icons(ranking_df, ranking_type="Glicko", dataset=None, category=None, time_period=None, facts=None, history=None):
+    """
+    Exibe ranking com linhas compactas, nome clicável e tooltip on-hover, em um
+    único componente HTML: a busca por nome filtra no navegador a cada tecla e
+    só as linhas visíveis na rolagem ficam no DOM (RANKING_VISIBLE_ROWS por vez).
+    """
     if ranking_df.empty:
         return
 
     host = st.session_state.get('host', 'http://localhost:8502')
 
-    # CSS para linhas mais compactas e tooltip por hover
-    st.markdown(
-        """
-        <style>
-        .ranking-row { display:flex; align-items:center; gap:8px; padding:6px 10px; border:1px solid var(--row-border); border-radius:8px; margin:6px 0; position:relative; min-height:32px; }
-        .ranking-pos { width:40px; font-weight:700; text-align:right; }
-        .ranking-name { flex:1; font-weight:700; white-space:nowrap; overflow:hidden; text-overflow:ellipsis; }
-        .ranking-name a { color:inherit; text-decoration:none; }
-        .ranking-name a:hover { text-decoration:underline; }
-        .ranking-stats { font-size:12px; color:#6c757d; min-width:220px; text-align:right; }
-        .ranking-hover { display:none; position:absolute; right:10px; top:36px; background:#ffffff; color:#111; border:1px solid #dee2e6; border-radius:8px; box-shadow:0 6px 24px rgba(0,0,0,0.12); padding:10px; z-index:10; min-width:260px; max-width:420px; }
-        .ranking-row:hover .ranking-hover { display:block; }
-        .ranking-hover h4 { margin:0 0 6px 0; font-size:13px; }
-        .ranking-hover table { width:100%; border-collapse:collapse; font-size:12px; }
-        .ranking-hover td, .ranking-hover th { padding:4px 6px; border-bottom:1px solid #f1f3f5; text-align:left; }
-        .ranking-medal { margin-left:6px; }
-        </style>
-        """,
-        unsafe_allow_html=True,
+    # Tabela de fatos do escopo: cada tooltip é só um recorte dela
+    if facts is None and ranking_type != "Glicko" and dataset is not None:
+        facts = calculate_points_facts(dataset, category, time_period)
+
+    rows = [
+        _ranking_row(position, row, ranking_type, facts, history)
+        for position, row in enumerate(ranking_df.to_dict('records'), start=1)
+    ]
+    # "</" dentro do <script> encerraria o bloco
+    component = (
+        RANKING_TEMPLATE
+        .replace('__ROWS__', json.dumps(rows, ensure_ascii=False).replace('</', '<\\/'))
+        .replace('__HOST__', json.dumps(host))
+        .replace('__ROW_HEIGHT__', str(RANKING_ROW_HEIGHT))
+        .replace('__VISIBLE_ROWS__', str(RANKING_VISIBLE_ROWS))
     )
+    height = min(len(rows), RANKING_VISIBLE_ROWS) * RANKING_ROW_HEIGHT + 90
+    components.html(component, height=height)
 
-    # Renderização de cada linha
-    for i, (_, row) in enumerate(ranking_df.iterrows()):
-        player_id = row['player_id']
-        player_name = row['name']
-        position = i + 1
-
-        player_link = f"{host}?page=Análise de Jogadores&player_id={player_id}"
-
-        # Destaques por posição
-        if position <= 3:
-            bg_color = "#fff3cd"  # top 3
-            border_color = "#ffc107"
-        elif position <= 10:
-            bg_color = "#e6f3ff"  # top 10
-            border_color = "#007bff"
-        else:
-            bg_color = "#f8f9fa"
-            border_color = "#dee2e6"
-
-        medal = ""
-        if position == 1:
-            medal = "🥇"
-        elif position == 2:
-            medal = "🥈"
-        elif position == 3:
-            medal = "🥉"
-
-        # Info compacta por tipo
-        if ranking_type == "Glicko":
-            rating = int(row['rating'])
-            rd = int(row['rd'])
-            extra_info = f"Rating: {rating} | RD: {rd}"
-            hover_title = f"{player_name} — Glicko-2"
-            hover_body = f"<div>Rating: <b>{rating}</b><br/>Desvio (RD): <b>{rd}</b></div>"
-        else:
-            points = int(row['points'])
-            set_balance = int(row['set_balance'])
-            extra_info = f"Pontos: {points:,} | Saldo: {set_balance:+d}"
-            hover_title = f"{player_name} — Detalhes dos pontos"
-            # Calcular breakdown para tooltip
-            breakdown_html = "<div>Sem pontos no período.</div>"
-            if matches is not None and players is not None and tournaments is not None:
-                breakdown_df = get_player_points_breakdown(
-                    player_id, matches, players, tournaments, category, time_period
-                )
-                if breakdown_df is not None and not breakdown_df.empty:
-                    total_pts = int(breakdown_df['points'].sum())
-                    top_rows = breakdown_df.head(5).copy()
-                    rows_html = "".join(
-                        f"<tr><td>{r['tournament']}</td><td>{r['date']}</td><td>{r['performance']}</td><td style='text-align:right;'>{int(r['points'])}</td></tr>"
-                        for _, r in top_rows.iterrows()
-                    )
-                    breakdown_html = (
-                        f"<div style='margin-bottom:6px;'>Total: <b>{total_pts:,} pts</b></div>"
-                        f"<table><thead><tr><th>Torneio</th><th>Data</th><th>Resultado</th><th style='text-align:right;'>Pts</th></tr></thead><tbody>{rows_html}</tbody></table>"
-                    )
-            hover_body = breakdown_html
-
-        row_html = f"""
-        <div class='ranking-row' style='--row-border:{border_color}; background:{bg_color};'>
-            <div class='ranking-pos'>{position}º <span class='ranking-medal'>{medal}</span></div>
-            <div class='ranking-name'><a href='{player_link}' target='_self'>{player_name}</a></div>
-            <div class='ranking-stats'>{extra_info}</div>
-            <div class='ranking-hover'>
-                <h4>{hover_title}</h4>
-                {hover_body}
-            </div>
-        </div>
-        """
-
-        st.markdown(row_html, unsafe_allow_html=True)
-
-def display_rankings_page(matches, players, tournaments):
+def display_rankings_page(dataset):
     """Exibe a página de rankings"""
+    matches, players, tournaments = dataset.frames
     st.header("Rankings")
     
     # Garantir que o host esteja disponível na session_state
@@ -505,23 +424,7 @@ def display_rankings_page(matches, players, tournaments):
             index=default_index
         )
     with col2:
-        base_period_options = [
-            "Todo o histórico",
-            "Somente este ano",
-            "Últimos 12 meses",
-            "Últimos 24 meses",
-        ]
-        unique_years = (
-            tournaments['started_month_year']
-            .dropna()
-            .astype(str)
-            .str[-4:]
-        )
-        year_options = sorted(
-            {int(year) for year in unique_years if year.isdigit()},
-            reverse=True
-        )
-        period_options = base_period_options + [f"Ranking {year}" for year in year_options]
+        period_options = ranking_period_options(tournaments)
         default_period_index = (
             period_options.index("Somente este ano")
             if "Somente este ano" in period_options
@@ -538,32 +441,7 @@ def display_rankings_page(matches, players, tournaments):
         st.warning("⚠️ Por favor, selecione uma categoria para visualizar os rankings")
         return
     
-    now = pd.Timestamp.now().normalize()
-    filter_start = None
-    filter_end = None
-
-    if selected_period == "Últimos 12 meses":
-        filter_start = now - pd.DateOffset(months=12)
-        filter_end = now
-    elif selected_period == "Últimos 24 meses":
-        filter_start = now - pd.DateOffset(months=24)
-        filter_end = now
-    elif selected_period == "Somente este ano":
-        filter_start = pd.Timestamp(f"{now.year}-01-01")
-        filter_end = pd.Timestamp(f"{now.year}-12-31")
-    elif selected_period.startswith("Ranking "):
-        try:
-            year = int(selected_period.split(" ")[1])
-            filter_start = pd.Timestamp(f"{year}-01-01")
-            filter_end = pd.Timestamp(f"{year}-12-31")
-        except (ValueError, IndexError):
-            filter_start = None
-            filter_end = None
-
-    if filter_start is not None or filter_end is not None:
-        time_period = (filter_start, filter_end)
-    else:
-        time_period = None
+    time_period = resolve_ranking_period(selected_period)
     
     # Mostrar informações sobre os torneios sendo computados
     with st.expander("📊 Torneios Computados neste Ranking", expanded=False):
@@ -574,7 +452,7 @@ def display_rankings_page(matches, players, tournaments):
             filtered_tournaments = filtered_tournaments[filtered_tournaments['category'] == category]
         
         filtered_tournaments = filter_dataframe_by_period(
-            filtered_tournaments, 'started_month_year', time_period
+            filtered_tournaments, 'started_month', time_period, chronological=True
         )
         
         # Filtrar partidas para mostrar estatísticas
@@ -584,7 +462,7 @@ def display_rankings_page(matches, players, tournaments):
             filtered_matches = filtered_matches[filtered_matches['tournament_id'].isin(tournament_ids)]
         
         filtered_matches = filter_dataframe_by_period(
-            filtered_matches, 'started_month_year', time_period
+            filtered_matches, 'started_month', time_period, chronological=True
         )
         
         # Mostrar estatísticas
@@ -603,8 +481,8 @@ def display_rankings_page(matches, players, tournaments):
         # Lista dos torneios
         if not filtered_tournaments.empty:
             st.subheader("Lista de Torneios:")
-            tournaments_display = filtered_tournaments[['name', 'started_month_year']].copy()
-            tournaments_display = tournaments_display.sort_values('started_month_year', ascending=False)
+            tournaments_display = filtered_tournaments.sort_values('started_at', ascending=False)
+            tournaments_display = tournaments_display[['name', 'started_month_year']].copy()
             tournaments_display.columns = ['Nome do Torneio', 'Data (Mês/Ano)']
             
             st.dataframe(
@@ -633,19 +511,23 @@ def display_rankings_page(matches, players, tournaments):
     # Calcular rankings
     with st.spinner('Calculando rankings...'):
         glicko_ratings = calculate_glicko_ratings(
-            matches, players, tournaments,
+            dataset,
             category=category,
             time_period=time_period
         )
         
         points_ranking = calculate_points_ranking(
-            matches, players, tournaments,
+            dataset,
             category=category,
             time_period=time_period
         )
+        
+        rank_history = calculate_rank_history(dataset, category, time_period)
     
     # Exibir rankings
-    tab_pontos, tab_glicko = st.tabs(["Ranking por Pontos", "Ranking Glicko-2"])
+    tab_pontos, tab_glicko, tab_movel, tab_sequencias, tab_destaques = st.tabs([
+        "Ranking por Pontos", "Ranking Glicko-2", f"Ranking {ROLLING_WEEKS} Semanas", "Sequências", "Destaques"
+    ])
     
     with tab_pontos:
         st.subheader("Ranking por Pontos")
@@ -675,7 +557,8 @@ def display_rankings_page(matches, players, tournaments):
             with st.spinner('Preparando ranking por pontos...'):
                 display_ranking_with_icons(
                     points_ranking, "Pontos", 
-                    matches, players, tournaments, category, time_period
+                    dataset, category, time_period,
+                    history=rank_history
                 )
         else:
             st.info("Não há dados suficientes para gerar o ranking por pontos neste período.") 
@@ -692,6 +575,9 @@ def display_rankings_page(matches, players, tournaments):
             - Frequência de jogos (quanto mais jogos, mais preciso o rating)
             - Desvio padrão (quanto menor, mais confiável é o rating)
             
+            Cada torneio é um período de rating: os jogos do torneio são avaliados em conjunto
+            e quem fica sem jogar tem o desvio padrão aumentado.
+            
             O rating base é 1500, com desvio padrão inicial de 350.
             Quanto maior o rating, melhor a performance do jogador.
             """)
@@ -700,7 +586,69 @@ def display_rankings_page(matches, players, tournaments):
             with st.spinner('Preparando ranking Glicko-2...'):
                 display_ranking_with_icons(
                     glicko_ratings, "Glicko", 
-                    matches, players, tournaments, category, time_period
+                    dataset, category, time_period,
+                    history=rank_history
                 )
         else:
-            st.info("Não há dados suficientes para gerar o ranking Glicko-2 neste período.")
\ No newline at end of file
+            st.info("Não há dados suficientes para gerar o ranking Glicko-2 neste período.")
+
+    # Antes da aba móvel, que encerra a página quando a categoria não tem dados
+    with tab_destaques:
+        st.subheader("Destaques da Categoria")
+        st.caption("Líderes de cada estatística em todos os jogos da categoria. Não usa o filtro de período acima.")
+        
+        stat = st.selectbox("Estatística:", list(SUMMARY_LEADERBOARDS), key="destaques_estatistica")
+        leaderboard = summary_leaderboard(calculate_player_summary(dataset, category), players, stat)
+        if not leaderboard.empty:
+            st.dataframe(leaderboard, use_container_width=True, hide_index=True)
+        else:
+            st.info("Nenhum jogador com esta estatística nesta categoria.")
+    
+    with tab_sequencias:
+        st.subheader("Maiores Sequências Ativas")
+        st.caption(
+            "Jogadores com as maiores sequências de vitórias ainda em andamento na categoria. "
+            "Não usa o filtro de período acima."
+        )
+        
+        streaks_table = active_streaks_table(calculate_player_streaks(dataset, category), matches, players)
+        if not streaks_table.empty:
+            st.dataframe(streaks_table, use_container_width=True, hide_index=True)
+        else:
+            st.info("Nenhum jogador em sequência de vitórias nesta categoria.")
+    
+    with tab_movel:
+        st.subheader(f"Ranking Móvel ({ROLLING_WEEKS} semanas)")
+        st.caption(
+            f"Soma dos pontos dos torneios das últimas {ROLLING_WEEKS} semanas até a data escolhida; "
+            "resultados mais antigos deixam de contar. Não usa o filtro de período acima."
+        )
+        
+        rolling = calculate_rolling_ranking(dataset, category)
+        if len(rolling.dates) == 0:
+            st.info("Não há dados suficientes para gerar o ranking móvel nesta categoria.")
+            return
+        
+        dates = rolling.dates.tolist()  # datetime.date
+        as_of = st.select_slider(
+            "Ranking em:",
+            options=dates,
+            value=dates[-1],
+            format_func=lambda date: pd.Timestamp(date).strftime('%d/%m/%Y')
+        )
+        rolling_ranking = rolling.ranking(as_of, players)
+        
+        # Detalhes dos pontos só com os torneios dentro da janela
+        window_start, window_end = rolling.window(as_of)
+        facts = calculate_points_facts(dataset, category, None)
+        fact_dates = date_key_to_datetime(facts['started_date_key'])
+        window_facts = facts[(fact_dates > window_start) & (fact_dates <= window_end)]
+        
+        if not rolling_ranking.empty:
+            display_ranking_with_icons(
+                rolling_ranking, "Pontos",
+                dataset, category, None,
+                facts=window_facts
+            )
+        else:
+            st.info("Nenhum jogador com pontos nesta janela.")
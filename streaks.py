@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+STREAK_COLUMNS = ('current_streak', 'current_won', 'longest_win_streak', 'longest_loss_streak', 'last_row')
+
+
+def player_streaks(matches):
+    """
+    Sequências de todos os jogadores em uma passada vetorizada (run-length
+    encoding) sobre as partidas na ordem do DataFrame, que nos frames do
+    carregamento é a cronológica. Uma linha por jogador (índice: player_id) com
+    a sequência atual (tamanho e se é de vitórias), a maior sequência de
+    vitórias, a maior de derrotas e o rótulo (índice de `matches`) da última
+    partida, que em um filtro dos frames do carregamento é a linha no frame completo.
+    """
+    valid = (matches['winner_id'].notna() & matches['loser_id'].notna()).to_numpy()
+    positions = np.flatnonzero(valid)
+    winners = matches['winner_id'].to_numpy()[valid].astype(np.int64)
+    losers = matches['loser_id'].to_numpy()[valid].astype(np.int64)
+
+    # Uma entrada por jogador por partida, agrupadas por jogador em ordem cronológica
+    player = np.concatenate([winners, losers])
+    won = np.repeat([True, False], len(positions))
+    rows = np.tile(positions, 2)
+    order = np.lexsort((rows, player))
+    player, won, rows = player[order], won[order], rows[order]
+
+    if len(player) == 0:
+        return pd.DataFrame({column: [] for column in STREAK_COLUMNS}, index=pd.Index([], name='player_id'))
+
+    # Cada sequência começa quando muda o jogador ou o resultado
+    run_starts = np.flatnonzero(np.r_[True, (player[1:] != player[:-1]) | (won[1:] != won[:-1])])
+    run_lengths = np.diff(np.append(run_starts, len(player)))
+    run_won = won[run_starts]
+
+    player_ids, first_run = np.unique(player[run_starts], return_index=True)
+    last_run = np.append(first_run[1:], len(run_starts)) - 1
+    last_entry = np.append(np.flatnonzero(player[1:] != player[:-1]), len(player) - 1)
+
+    return pd.DataFrame({
+        'current_streak': run_lengths[last_run],
+        'current_won': run_won[last_run],
+        'longest_win_streak': np.maximum.reduceat(np.where(run_won, run_lengths, 0), first_run),
+        'longest_loss_streak': np.maximum.reduceat(np.where(run_won, 0, run_lengths), first_run),
+        'last_row': matches.index.to_numpy()[rows[last_entry]],
+    }, index=pd.Index(player_ids, name='player_id'))
+
+
+def active_win_streaks(streaks, min_length=2):
+    """Jogadores em sequência de vitórias (de pelo menos `min_length`), das maiores às menores"""
+    active = streaks[streaks['current_won'] & (streaks['current_streak'] >= min_length)]
+    # Empates: quem jogou mais recentemente primeiro
+    return active.sort_values(['current_streak', 'last_row'], ascending=False)
@@ -0,0 +1,298 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from glicko import DEFAULT_RD, DEFAULT_VOL, EPSILON, SCALE, TAU, GlickoCheckpoints, GlickoEngine, RatingHistory
+from ranking_engine import compute_rating_history
+
+# Torneios (períodos de rating) com os jogos (vencedor, perdedor) em índices densos
+PERIODS = [
+    [(0, 1), (2, 3), (0, 2)],
+    [(1, 3), (3, 4), (1, 4)],
+    [(4, 0), (2, 1)],
+    [(0, 3), (2, 4), (0, 2), (1, 3)],
+    [(3, 0)],
+    [(4, 1), (2, 0), (4, 2)],
+    [(1, 0), (3, 2)],
+    [(0, 4), (1, 2), (0, 1)],
+]
+N_PLAYERS = 5
+
+
+def _fixture(periods=PERIODS):
+    """(winners, losers, period_starts) dos jogos em ordem"""
+    games = [game for period in periods for game in period]
+    winners = np.array([w for w, _ in games], dtype=np.intp)
+    losers = np.array([l for _, l in games], dtype=np.intp)
+    period_starts = np.cumsum([0] + [len(period) for period in periods[:-1]])
+    return winners, losers, period_starts
+
+
+def _scalar_volatility(sigma, phi, v, delta, tau=TAU):
+    """Passo 5 do Glicko-2 para um jogador, como no artigo de Glickman"""
+    a = math.log(sigma ** 2)
+
+    def f(x):
+        ex = math.exp(x)
+        return ex * (delta ** 2 - phi ** 2 - v - ex) / (2 * (phi ** 2 + v + ex) ** 2) - (x - a) / tau ** 2
+
+    A = a
+    if delta ** 2 > phi ** 2 + v:
+        B = math.log(delta ** 2 - phi ** 2 - v)
+    else:
+        k = 1
+        while f(a - k * tau) < 0:
+            k += 1
+        B = a - k * tau
+    fA, fB = f(A), f(B)
+    while abs(B - A) > EPSILON:
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        if fC * fB <= 0:
+            A, fA = B, fB
+        else:
+            fA = fA / 2
+        B, fB = C, fC
+    return math.exp(A / 2)
+
+
+def _scalar_ratings(periods=PERIODS, n_players=N_PLAYERS):
+    """Glicko-2 jogador a jogador (um torneio por período), referência para o motor vetorizado"""
+    mu = [0.0] * n_players
+    phi = [DEFAULT_RD / SCALE] * n_players
+    sigma = [DEFAULT_VOL] * n_players
+    seen = [False] * n_players
+    for period in periods:
+        games = {}
+        for winner, loser in period:
+            games.setdefault(winner, []).append((loser, 1.0))
+            games.setdefault(loser, []).append((winner, 0.0))
+
+        updates = {}
+        for player, results in games.items():
+            v_inv = delta_sum = 0.0
+            for opponent, score in results:
+                g = 1 / math.sqrt(1 + 3 * phi[opponent] ** 2 / math.pi ** 2)
+                expected = 1 / (1 + math.exp(-g * (mu[player] - mu[opponent])))
+                v_inv += g ** 2 * expected * (1 - expected)
+                delta_sum += g * (score - expected)
+            v = 1 / v_inv
+            new_sigma = _scalar_volatility(sigma[player], phi[player], v, v * delta_sum)
+            phi_star = math.sqrt(phi[player] ** 2 + new_sigma ** 2)
+            new_phi = 1 / math.sqrt(1 / phi_star ** 2 + 1 / v)
+            updates[player] = (mu[player] + new_phi ** 2 * delta_sum, new_phi, new_sigma)
+
+        for player in range(n_players):
+            if player in updates:
+                mu[player], phi[player], sigma[player] = updates[player]
+                seen[player] = True
+            elif seen[player]:
+                phi[player] = math.sqrt(phi[player] ** 2 + sigma[player] ** 2)
+            phi[player] = min(phi[player], DEFAULT_RD / SCALE)
+
+    rating = np.array(mu) * SCALE + 1500
+    rd = np.array(phi) * SCALE
+    return rating, rd, np.array(sigma)
+
+
+def test_rate_period_matches_glickman_example():
+    """Exemplo do artigo do Glicko-2: 1500/200 contra 1400/30, 1550/100 e 1700/300"""
+    engine = GlickoEngine(4)
+    engine.mu[:] = (np.array([1500, 1400, 1550, 1700]) - 1500) / SCALE
+    engine.phi[:] = np.array([200, 30, 100, 300]) / SCALE
+    engine.rate_period(np.array([0, 2, 3]), np.array([1, 0, 0]))
+
+    rating, rd, vol = engine.ratings()
+    assert rating[0] == pytest.approx(1464.06, abs=0.01)
+    assert rd[0] == pytest.approx(151.52, abs=0.01)
+    assert vol[0] == pytest.approx(0.05999, abs=1e-5)
+
+
+def test_engine_matches_scalar_reference():
+    winners, losers, period_starts = _fixture()
+    engine = GlickoEngine(N_PLAYERS).run(winners, losers, period_starts)
+
+    for actual, expected in zip(engine.ratings(), _scalar_ratings()):
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-6)
+
+
+def test_idle_player_rd_grows_up_to_initial_value():
+    winners, losers, period_starts = _fixture([[(0, 1)], [(2, 3)], [(2, 3)]])
+    engine = GlickoEngine(4).run(winners, losers, period_starts)
+    engine_after_first = GlickoEngine(4).run(winners[:1], losers[:1], period_starts[:1])
+
+    rd = engine.ratings()[1]
+    assert rd[0] > engine_after_first.ratings()[1][0]
+    assert (rd <= DEFAULT_RD).all()
+
+
+def _periods(revisions=None):
+    revisions = revisions or {}
+    return [(tournament_id, revisions.get(tournament_id, 'r1')) for tournament_id in range(len(PERIODS))]
+
+
+def _count_rated_periods(monkeypatch):
+    calls = []
+    rate_period = GlickoEngine.rate_period
+
+    def counting(self, winners, losers):
+        calls.append(len(winners))
+        return rate_period(self, winners, losers)
+
+    monkeypatch.setattr(GlickoEngine, 'rate_period', counting)
+    return calls
+
+
+@pytest.mark.parametrize('prefix', [2, 3, 5])
+def test_checkpoint_resume_matches_fresh_run(monkeypatch, prefix):
+    winners, losers, period_starts = _fixture()
+    player_ids = np.arange(N_PLAYERS) * 10
+    fresh = GlickoEngine(N_PLAYERS).run(winners, losers, period_starts)
+
+    checkpoints = GlickoCheckpoints(every=2)
+    end = period_starts[prefix]
+    checkpoints.rate('scope', _periods()[:prefix], player_ids, winners[:end], losers[:end], period_starts[:prefix])
+
+    calls = _count_rated_periods(monkeypatch)
+    resumed = checkpoints.rate('scope', _periods(), player_ids, winners, losers, period_starts)
+
+    # Retoma do último checkpoint do prefixo (múltiplo de `every` ou o próprio prefixo)
+    assert len(calls) == len(PERIODS) - prefix
+    for actual, expected in zip(resumed.ratings(), fresh.ratings()):
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12)
+
+
+def test_checkpoint_changed_revision_recomputes_from_change(monkeypatch):
+    winners, losers, period_starts = _fixture()
+    player_ids = np.arange(N_PLAYERS) * 10
+    checkpoints = GlickoCheckpoints(every=2)
+    checkpoints.rate('scope', _periods(), player_ids, winners, losers, period_starts)
+
+    # Torneio 5 alterado: os jogos mudam a partir dele
+    changed = [list(period) for period in PERIODS]
+    changed[5] = [(1, 4), (0, 2)]
+    winners, losers, period_starts = _fixture(changed)
+    fresh = GlickoEngine(N_PLAYERS).run(winners, losers, period_starts)
+
+    calls = _count_rated_periods(monkeypatch)
+    resumed = checkpoints.rate('scope', _periods({5: 'r2'}), player_ids, winners, losers, period_starts)
+
+    assert len(calls) == len(PERIODS) - 4
+    for actual, expected in zip(resumed.ratings(), fresh.ratings()):
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12)
+
+
+def test_checkpoint_scopes_are_independent():
+    winners, losers, period_starts = _fixture()
+    player_ids = np.arange(N_PLAYERS) * 10
+    checkpoints = GlickoCheckpoints(every=2)
+    checkpoints.rate('a', _periods(), player_ids, winners, losers, period_starts)
+
+    end = period_starts[3]
+    other = checkpoints.rate('b', _periods()[:3], player_ids, winners[:end], losers[:end], period_starts[:3])
+    fresh = GlickoEngine(N_PLAYERS).run(winners[:end], losers[:end], period_starts[:3])
+    np.testing.assert_allclose(other.ratings()[0], fresh.ratings()[0], rtol=0, atol=1e-12)
+
+
+def test_checkpoint_as_of_tournament_resumes_without_later_players(monkeypatch):
+    winners, losers, period_starts = _fixture()
+    player_ids = np.arange(N_PLAYERS) * 10
+    checkpoints = GlickoCheckpoints(every=1)
+    checkpoints.rate('scope', _periods(), player_ids, winners, losers, period_starts)
+
+    # Após o primeiro torneio o jogador 40 ainda não jogou e fica fora do índice
+    end = period_starts[1]
+    fresh = GlickoEngine(4).run(winners[:end], losers[:end], period_starts[:1])
+    calls = _count_rated_periods(monkeypatch)
+    as_of = checkpoints.rate('scope', _periods()[:1], player_ids[:4], winners[:end], losers[:end], period_starts[:1])
+
+    assert calls == []
+    for actual, expected in zip(as_of.ratings(), fresh.ratings()):
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12)
+
+    # A consulta não altera os checkpoints: a sequência completa continua guardada
+    checkpoints.rate('scope', _periods(), player_ids, winners, losers, period_starts)
+    assert calls == []
+
+
+def test_checkpoint_scopes_are_bounded(monkeypatch):
+    winners, losers, period_starts = _fixture()
+    player_ids = np.arange(N_PLAYERS) * 10
+    checkpoints = GlickoCheckpoints(every=2, max_scopes=2)
+    for key in ('a', 'b', 'a', 'c'):
+        checkpoints.rate(key, _periods(), player_ids, winners, losers, period_starts)
+    assert len(checkpoints) == 2
+
+    # 'b' foi o escopo usado há mais tempo: é recalculado do início; 'a' continua guardado
+    calls = _count_rated_periods(monkeypatch)
+    checkpoints.rate('a', _periods(), player_ids, winners, losers, period_starts)
+    assert calls == []
+    checkpoints.rate('b', _periods(), player_ids, winners, losers, period_starts)
+    assert len(calls) == len(PERIODS)
+
+
+def _history():
+    """Histórico de 3 torneios: 10/01, 20/01 (dois jogos do jogador 10) e 01/02"""
+    player_ids = np.array([10, 20, 30])
+    winners = np.array([0, 0, 1, 2])
+    losers = np.array([1, 2, 0, 0])
+    period_starts = np.array([0, 1, 3])
+    date_keys = np.array([20240110, 20240120, 20240120, 20240201])
+    match_ids = np.array([1, 2, 3, 4])
+    engine = GlickoEngine(len(player_ids))
+    results = engine.run_with_history(winners, losers, period_starts)
+    return RatingHistory(player_ids, winners, losers, date_keys, match_ids, *results), results
+
+
+def test_rating_on_before_first_match_is_none():
+    history, _ = _history()
+    assert history.rating_on(10, 20240109) is None
+    assert history.rating_on(99, 20240110) is None
+
+
+def test_rating_on_period_boundaries():
+    history, (_, _, post_rating, post_rd) = _history()
+
+    # No dia do torneio o resultado já conta (inclusive)
+    first = (float(np.float32(post_rating[0, 0])), float(np.float32(post_rd[0, 0])))
+    assert history.rating_on(10, 20240110) == first
+    assert history.rating_on(10, 20240119) == first
+
+    # Dois jogos no mesmo torneio: vale o último
+    last_of_period = (float(np.float32(post_rating[2, 1])), float(np.float32(post_rd[2, 1])))
+    assert history.rating_on(10, 20240120) == last_of_period
+    assert history.rating_on(10, 20240131) == last_of_period
+
+    final = (float(np.float32(post_rating[3, 1])), float(np.float32(post_rd[3, 1])))
+    assert history.rating_on(10, 20240201) == final
+    assert history.rating_on(10, 20991231) == final
+
+
+def test_timeline_is_chronological_per_player():
+    history, _ = _history()
+    timeline = history.timeline(10)
+    assert timeline['match_id'].tolist() == [1, 2, 3, 4]
+    assert timeline['won'].tolist() == [True, True, False, False]
+    assert timeline['opponent_id'].tolist() == [20, 30, 20, 30]
+    assert (np.diff(timeline['date_key']) >= 0).all()
+
+
+def test_rating_history_leaves_out_undated_matches():
+    # Na ordem do carregamento, o torneio sem data (3) vem por último
+    matches = pd.DataFrame({
+        'match_id': [1, 2, 3, 4],
+        'winner_id': [10, 20, 10, 30],
+        'loser_id': [20, 30, 30, 10],
+        'tournament_id': [1, 2, 2, 3],
+        'tournament_category': ['A', 'A', 'A', 'A'],
+        'sort_key': [0, 1, 1, 2],
+        'started_date_key': pd.array([20240110, 20240201, 20240201, None], dtype='Int32'),
+    })
+    history = compute_rating_history(matches)
+
+    timeline = history.timeline(10)
+    assert timeline['match_id'].tolist() == [1, 3]
+    assert history.rating_on(10, 20991231) == (float(timeline['post_rating'][-1]), float(timeline['post_rd'][-1]))
+    assert history.rating_on(10, 20240131) == (float(timeline['post_rating'][0]), float(timeline['post_rd'][0]))
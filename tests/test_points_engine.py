@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from points_engine import ROLLING_WEEKS, RollingRanking, rank_players
+from rank_history import RankHistory
+
+PLAYERS = pd.DataFrame({'id': [1, 2, 3], 'name': ['ana', 'bia', 'carla']})
+
+# Resultados (jogador x torneio) em datas irregulares, com dois torneios no mesmo dia
+FACTS = pd.DataFrame({
+    'player_id': [1, 2, 1, 3, 2, 3, 1, 2, 3],
+    'points': [2000, 1200, 360, 720, 2000, 180, 720, 360, 2000],
+    'set_balance': [6, -2, 1, 3, 5, -1, 2, 0, 4],
+    'started_date_key': [
+        20230110, 20230110, 20230315, 20230315, 20230315, 20230901, 20240109, 20240301, 20240302,
+    ],
+})
+FACT_DATES = pd.to_datetime(FACTS['started_date_key'].astype(str), format='%Y%m%d')
+
+
+def _brute_force(date, weeks=ROLLING_WEEKS):
+    """Pontos e saldo por jogador filtrando os resultados em (date - N semanas, date]"""
+    end = pd.Timestamp(date)
+    window = FACTS[(FACT_DATES > end - pd.Timedelta(weeks=weeks)) & (FACT_DATES <= end)]
+    totals = window.groupby('player_id')[['points', 'set_balance']].sum()
+    return totals[totals['points'] > 0]
+
+
+def _ranking_totals(rolling, date):
+    ranking = rolling.ranking(np.datetime64(date), PLAYERS)
+    return ranking.set_index('player_id')[['points', 'set_balance']].sort_index()
+
+
+def _assert_matches_brute_force(rolling, date):
+    expected = _brute_force(date).sort_index()
+    actual = _ranking_totals(rolling, date)
+    assert actual.index.tolist() == expected.index.tolist()
+    assert actual['points'].tolist() == expected['points'].tolist()
+    assert actual['set_balance'].tolist() == expected['set_balance'].tolist()
+
+
+def test_result_counts_until_the_day_before_it_expires():
+    rolling = RollingRanking(FACTS)
+    date = pd.Timestamp('2023-01-10')
+    expires = date + pd.Timedelta(weeks=ROLLING_WEEKS)
+
+    # Conta na própria data do torneio e até D + 52 semanas - 1 dia; sai em D + 52 semanas
+    assert _ranking_totals(rolling, date).loc[1, 'points'] == 2000
+    assert _ranking_totals(rolling, expires - pd.Timedelta(days=1)).loc[1, 'points'] == 2000 + 360
+    # 2024-01-09 é ao mesmo tempo a expiração do primeiro torneio e a data de um novo
+    assert _ranking_totals(rolling, expires).loc[1, 'points'] == 360 + 720
+    _assert_matches_brute_force(rolling, expires - pd.Timedelta(days=1))
+    _assert_matches_brute_force(rolling, expires)
+
+
+def test_expiry_between_tournament_dates():
+    rolling = RollingRanking(FACTS)
+    # Último torneio em 2024-03-02; os resultados de 2023-03-15 expiram em 2024-03-13
+    date = pd.Timestamp('2024-04-01')
+    assert rolling.dates[rolling.position(np.datetime64(date))] == np.datetime64('2024-03-02')
+    assert _ranking_totals(rolling, date).loc[2, 'points'] == 360
+    _assert_matches_brute_force(rolling, date)
+
+
+@pytest.mark.parametrize('weeks', [ROLLING_WEEKS, 8])
+def test_every_day_matches_brute_force(weeks):
+    rolling = RollingRanking(FACTS, weeks)
+    for date in pd.date_range('2023-01-01', '2025-04-01', freq='D'):
+        expected = _brute_force(date, weeks).reindex(rolling.player_ids, fill_value=0)
+        points, balance = rolling.totals(np.datetime64(date))
+        # Jogadores que zeraram ficam fora do ranking, mas o saldo de sets segue somado
+        counted = points > 0
+        assert points[counted].tolist() == expected['points'].to_numpy()[counted].tolist(), date
+        assert balance[counted].tolist() == expected['set_balance'].to_numpy()[counted].tolist(), date
+        assert not expected['points'].to_numpy()[~counted].any(), date
+
+
+def test_before_first_tournament_is_empty():
+    rolling = RollingRanking(FACTS)
+    assert rolling.position(np.datetime64('2023-01-09')) == -1
+    assert rolling.ranking(np.datetime64('2023-01-09'), PLAYERS).empty
+
+
+def test_window_bounds():
+    rolling = RollingRanking(FACTS)
+    start, end = rolling.window(np.datetime64('2024-03-02'))
+    assert end == np.datetime64('2024-03-02')
+    assert end - start == np.timedelta64(ROLLING_WEEKS * 7, 'D')
+
+
+def test_ties_follow_player_id_like_rank_history():
+    facts = pd.DataFrame({
+        'tournament_id': [7, 7, 7, 7],
+        'player_id': [3, 1, 2, 4],
+        'points': [360, 360, 720, 360],
+        'set_balance': [2, 2, 1, 2],
+    })
+    players = pd.concat([PLAYERS, pd.DataFrame({'id': [4], 'name': ['dani']})], ignore_index=True)
+    ranking = rank_players(facts[['player_id', 'points', 'set_balance']], players)
+    assert ranking['player_id'].tolist() == [2, 1, 3, 4]
+
+    # A posição na tabela é a mesma do histórico (base da variação ▲/▼ e da melhor posição)
+    history = RankHistory(np.array([1, 2, 3, 4]), np.array([7]), facts, np.array([0]), np.array([1]), np.array([0]))
+    assert [history.lookup('points', player_id)[0] for player_id in ranking['player_id']] == [1, 2, 3, 4]
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from streaks import STREAK_COLUMNS, active_win_streaks, player_streaks
+
+
+def _matches(games):
+    """Partidas (vencedor, perdedor) em ordem cronológica"""
+    return pd.DataFrame({
+        'winner_id': pd.array([w for w, _ in games], dtype='Int64'),
+        'loser_id': pd.array([l for _, l in games], dtype='Int64'),
+    })
+
+
+def _loop_streaks(games):
+    """Sequências jogador a jogador, percorrendo as partidas uma a uma"""
+    results = {}
+    for row, (winner, loser) in enumerate(games):
+        if winner is None or loser is None:
+            continue
+        results.setdefault(winner, []).append((True, row))
+        results.setdefault(loser, []).append((False, row))
+
+    streaks = {}
+    for player, history in results.items():
+        longest = {True: 0, False: 0}
+        current, current_won = 0, None
+        for won, _ in history:
+            current = current + 1 if won == current_won else 1
+            current_won = won
+            longest[won] = max(longest[won], current)
+        streaks[player] = (current, current_won, longest[True], longest[False], history[-1][1])
+    return streaks
+
+
+def test_empty_history():
+    streaks = player_streaks(_matches([]))
+    assert streaks.empty
+    assert list(streaks.columns) == list(STREAK_COLUMNS)
+    assert streaks.index.name == 'player_id'
+    assert active_win_streaks(streaks).empty
+
+
+def test_single_match():
+    streaks = player_streaks(_matches([(1, 2)]))
+    assert streaks.loc[1].tolist() == [1, True, 1, 0, 0]
+    assert streaks.loc[2].tolist() == [1, False, 0, 1, 0]
+    assert active_win_streaks(streaks).empty
+    assert active_win_streaks(streaks, min_length=1).index.tolist() == [1]
+
+
+def test_alternating_wins_and_losses():
+    streaks = player_streaks(_matches([(1, 2), (2, 1), (1, 2), (2, 1)]))
+    assert streaks.loc[1].tolist() == [1, False, 1, 1, 3]
+    assert streaks.loc[2].tolist() == [1, True, 1, 1, 3]
+
+
+def test_unbroken_streak_at_the_end():
+    games = [(2, 1), (1, 3), (1, 2), (3, 2), (1, 3), (1, 4)]
+    streaks = player_streaks(_matches(games))
+
+    assert streaks.loc[1].tolist() == [4, True, 4, 1, 5]
+    assert streaks.loc[2, 'longest_loss_streak'] == 2
+    active = active_win_streaks(streaks)
+    assert active.index.tolist() == [1]
+    assert active.loc[1, 'current_streak'] == 4
+
+
+def test_active_streak_ties_favor_most_recent():
+    streaks = player_streaks(_matches([(1, 3), (1, 4), (2, 3), (2, 4)]))
+    assert active_win_streaks(streaks).index.tolist() == [2, 1]
+
+
+def test_matches_without_players_are_ignored():
+    streaks = player_streaks(_matches([(1, 2), (None, 2), (1, None), (1, 2)]))
+    assert streaks.loc[1].tolist() == [2, True, 2, 0, 3]
+    assert streaks.index.tolist() == [1, 2]
+
+
+def test_matches_loop_on_random_history():
+    rng = np.random.default_rng(7)
+    games = []
+    for _ in range(400):
+        winner, loser = rng.choice(12, size=2, replace=False)
+        games.append((int(winner), int(loser)))
+
+    streaks = player_streaks(_matches(games))
+    expected = _loop_streaks(games)
+    assert sorted(streaks.index.tolist()) == sorted(expected)
+    for player, values in expected.items():
+        assert tuple(streaks.loc[player].tolist()) == values
+
+
+def test_last_row_is_the_label_in_a_filtered_frame():
+    matches = _matches([(1, 2), (3, 4), (1, 3), (4, 2), (1, 4)])
+    subset = matches[matches['winner_id'] != 3]
+    streaks = player_streaks(subset)
+    assert streaks.loc[1, 'last_row'] == 4
+    assert streaks.loc[2, 'last_row'] == 3
+    assert matches.loc[streaks.loc[2, 'last_row']].tolist() == [4, 2]
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+RESULT_COLUMNS = (
+    'match_count', 'max_round', 'champion_id', 'champion_name', 'runner_up_id', 'runner_up_name',
+    'semifinalist_ids', 'semifinalist_names',
+)
+
+
+def tournament_results(matches):
+    """
+    Resultado de cada torneio com uma ordenação e um groupby sobre todas as
+    partidas: número de partidas, rodada mais alta, campeão e vice (vencedor e
+    perdedor da primeira partida da rodada mais alta, na ordem dos frames) e
+    semifinalistas (perdedores da rodada anterior). Uma linha por torneio
+    (índice: tournament_id); torneios sem rodada final ficam sem campeão.
+    """
+    # Ordenação estável: dentro do torneio mantém a ordem (rodada, match_id) dos frames
+    ordered = matches.sort_values('tournament_id', kind='stable')
+    tournament_ids = ordered['tournament_id'].to_numpy()
+    rounds = ordered['round'].astype('float64').to_numpy()
+
+    grouped = pd.Series(rounds).groupby(tournament_ids)
+    results = pd.DataFrame({
+        'match_count': grouped.size(),
+        'max_round': grouped.max(),
+    })
+    results.index.name = 'tournament_id'
+    max_round = results['max_round'].reindex(tournament_ids).to_numpy()
+
+    final = ordered[rounds == max_round].drop_duplicates('tournament_id').set_index('tournament_id')
+    results['champion_id'] = final['winner_id'].reindex(results.index)
+    results['champion_name'] = final['winner_name'].astype(object).reindex(results.index)
+    results['runner_up_id'] = final['loser_id'].reindex(results.index)
+    results['runner_up_name'] = final['loser_name'].astype(object).reindex(results.index)
+
+    semifinals = ordered[rounds == max_round - 1].groupby('tournament_id', sort=False).agg(
+        semifinalist_ids=('loser_id', list),
+        semifinalist_names=('loser_name', list),
+    )
+    for column in ('semifinalist_ids', 'semifinalist_names'):
+        values = semifinals[column].reindex(results.index)
+        results[column] = [value if isinstance(value, list) else [] for value in values]
+
+    return results[list(RESULT_COLUMNS)]
+
+
+def tournament_result(results, tournament_id):
+    """Linha do torneio como dicionário; None se ele não tem partidas"""
+    if tournament_id not in results.index:
+        return None
+    return results.loc[tournament_id].to_dict()
+
+
+def max_rounds(results, tournament_ids):
+    """Rodada mais alta do torneio de cada posição de `tournament_ids` (NaN se desconhecido)"""
+    return results['max_round'].reindex(np.asarray(tournament_ids)).to_numpy('float64')
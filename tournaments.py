@@ -1,259 +1,100 @@
-import pandas as pd
 import numpy as np
 import streamlit as st
 import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime
-import sqlite3
-
-def get_tournament_champion(matches, tournament_id):
-    """Identifica o campeão do torneio baseado na rodada mais alta"""
-    tournament_matches = matches[matches['tournament_id'] == tournament_id]
-    if tournament_matches.empty:
-        return None
-    
-    # O campeão é o vencedor da rodada mais alta
-    max_round = tournament_matches['round'].max()
-    final_match = tournament_matches[tournament_matches['round'] == max_round]
-    
-    if not final_match.empty:
-        champion_id = final_match.iloc[0]['winner_id']
-        champion_name = final_match.iloc[0]['winner_name']
-        return {'id': champion_id, 'name': champion_name}
-    
-    return None
+from bracket_render import BRACKET_ROUND_NAMES, bracket_edges, bracket_layout, tournament_bracket_html, tournament_matches
+from rankings import calculate_tournament_results, get_ranking_cache
 
 # Removido: função get_participant_seeds (informação de seeds não confiável)
 
-def create_tournament_bracket(matches, tournament_id, tournament_name):
-    """Cria a visualização da chave do torneio em ASCII"""
-    tournament_matches = matches[matches['tournament_id'] == tournament_id].copy()
-    
-    if tournament_matches.empty:
+def create_tournament_bracket(dataset, results, tournament_id, tournament_name):
+    """
+    Exibe a chave do torneio em ASCII com o resumo das partidas: o HTML vem
+    pronto do cache (um por torneio e versão dos dados) e é exibido em um único elemento
+    """
+    bracket_html = tournament_bracket_html(dataset, results, tournament_id, get_ranking_cache())
+    
+    if bracket_html is None:
         st.warning(f"Nenhuma partida encontrada para o torneio {tournament_name}")
         return
     
-    # Removido: busca de seeds (informação não confiável)
-    
-    # Organizar partidas por rodada
-    rounds = sorted(tournament_matches['round'].unique())
-    
-    # Identificar o campeão
-    champion = get_tournament_champion(matches, tournament_id)
-    
-    st.markdown(f"## 🏆 {tournament_name}")
-    
-    if champion:
-        st.success(f"🥇 **CAMPEÃO: {champion['name']}**")
-    
-    # Determinar nomes das rodadas
-    max_round = max(rounds)
-    round_names = {}
-    
-    if max_round == 4:
-        round_names = {1: "1ª Rodada", 2: "Quartas", 3: "Semifinal", 4: "Final"}
-    elif max_round == 3:
-        round_names = {1: "Quartas", 2: "Semifinal", 3: "Final"}
-    elif max_round == 2:
-        round_names = {1: "Semifinal", 2: "Final"}
-    elif max_round == 1:
-        round_names = {1: "Final"}
-    else:
-        for r in rounds:
-            round_names[r] = f"Rodada {r}"
-    
-    # Obter host da session_state para criar links
-    host = st.session_state.get('host', 'http://localhost:8502')
-    
-    # Organizar dados para ASCII art
-    rounds_data = {}
-    for round_num in rounds:
-        round_matches = tournament_matches[tournament_matches['round'] == round_num].sort_values('match_id')
-        rounds_data[round_num] = []
-        
-        for _, match in round_matches.iterrows():
-            winner_name = match['winner_name']
-            loser_name = match['loser_name']
-            score = match['score'] if pd.notna(match['score']) else "A definir"
-            
-            # Removido: busca de seeds (informação não confiável)
-            
-            # Formattar nomes em CAPS LOCK (sem seed)
-            winner_display = winner_name.upper()
-            loser_display = loser_name.upper()
-            
-            # Truncar nomes se muito longos
-            if len(winner_display) > 18:
-                winner_display = winner_display[:15] + "..."
-            if len(loser_display) > 18:
-                loser_display = loser_display[:15] + "..."
-            
-            rounds_data[round_num].append({
-                'winner': winner_display,
-                'loser': loser_display,
-                'score': score,
-                'winner_id': match['winner_id'],
-                'loser_id': match['loser_id'],
-                'is_champion': round_num == max_round and champion and champion['name'] == winner_name
-            })
-    
-    # Criar ASCII art da chave simplificada
-    bracket_lines = []
-    
-    # Cabeçalho com nomes das rodadas
-    header_parts = []
-    for round_num in rounds:
-        round_name = round_names.get(round_num, f"Rodada {round_num}")
-        header_parts.append(f"{round_name:^22}")
-    
-    header = "".join(header_parts)
-    bracket_lines.append(header)
-    bracket_lines.append("=" * len(header))
-    bracket_lines.append("")
-    
-    # Mostrar apenas as partidas únicas de cada rodada
-    max_lines_per_round = max(len(rounds_data[r]) for r in rounds)
-    
-    for match_idx in range(max_lines_per_round):
-        line_parts = []
-        
-        for round_idx, round_num in enumerate(rounds):
-            if match_idx < len(rounds_data[round_num]):
-                match_data = rounds_data[round_num][match_idx]
-                
-                winner = match_data['winner']
-                loser = match_data['loser']
-                score = match_data['score']
-                
-                if match_data['is_champion']:
-                    winner = f"👑 {winner}"
-                
-                # Formattar a partida em blocos sem flechas
-                match_text = f"✅ {winner:<18}\n   {loser:<18}"
-                
-                line_parts.append(match_text)
-            else:
-                # Espaço vazio
-                empty_text = "\n".join([" " * 20] * 2)
-                line_parts.append(empty_text)
-        
-        # Combinar as partes da linha
-        combined_lines = [""] * 2
-        for part in line_parts:
-            part_lines = part.split('\n')
-            for i in range(2):
-                combined_lines[i] += part_lines[i] + "  "
-        
-        # Adicionar as linhas combinadas
-        bracket_lines.extend(combined_lines)
-        bracket_lines.append("")  # Espaçamento entre partidas
-    
-    # Remover linha vazia extra no final
-    if bracket_lines and bracket_lines[-1] == "":
-        bracket_lines.pop()
-    
-    # Exibir a chave ASCII com fonte pequena preservando identação
-    bracket_text = "\n".join(bracket_lines)
-    
-    # Converter quebras de linha para HTML, preservar espaços e escapar caracteres especiais
-    bracket_html = bracket_text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-    bracket_html = bracket_html.replace(' ', '&nbsp;').replace('\n', '<br>')
-    
-    # Aplicar CSS e exibir
-    st.markdown(f"""
-    <div style="
-        font-family: 'Courier New', monospace;
-        font-size: 10px;
-        line-height: 1.2;
-        background-color: #f8f9fa;
-        padding: 12px;
-        border-radius: 6px;
-        border: 1px solid #e9ecef;
-        overflow-x: auto;
-        white-space: pre-line;
-        color: #212529;
-    ">
-    {bracket_html}
-    </div>
-    """, unsafe_allow_html=True)
-
-    
-    # Mostrar resumo das partidas com cores
-    st.markdown("### 📊 Resumo das Partidas")
-    
-    for round_num in rounds:
-        round_name = round_names.get(round_num, f"Rodada {round_num}")
-        st.markdown(f"**{round_name}:**")
-        
-        round_matches = rounds_data[round_num]
-        for match_data in round_matches:
-            winner = match_data['winner']
-            loser = match_data['loser']
-            
-            if match_data['is_champion']:
-                winner = f"👑 {winner}"
-            
-            # Usar success/error para cores
-            col1, col2 = st.columns(2)
-            with col1:
-                st.success(f"🏆 {winner}")
-            with col2:
-                st.error(f"❌ {loser}")
-        
-        st.divider()
+    st.markdown(bracket_html, unsafe_allow_html=True)
 
 
-def create_bracket_visualization(matches, tournament_id):
-    """Cria uma visualização gráfica da chave usando Plotly"""
-    tournament_matches = matches[matches['tournament_id'] == tournament_id].copy()
-    
-    if tournament_matches.empty:
+def create_bracket_visualization(dataset, tournament_id):
+    """
+    Chave do torneio em Plotly: posições calculadas de forma vetorizada
+    (bracket_layout) e tudo desenhado em poucos traces (conectores, partidas e
+    campeão), então o tamanho da figura não cresce com um trace por partida
+    """
+    matches = tournament_matches(dataset, tournament_id)
+    
+    if matches.empty:
         return None
     
-    # Organizar dados para o gráfico
-    rounds = sorted(tournament_matches['round'].unique())
+    x, y, parent = bracket_layout(matches)
+    edges_x, edges_y = bracket_edges(x, y, parent)
     
-    # Criar figura
-    fig = go.Figure()
+    winner_names = matches['winner_name'].astype(str).str.upper().to_numpy()
+    loser_names = matches['loser_name'].astype(str).str.upper().to_numpy()
+    scores = matches['score'].astype(object).fillna('A definir').to_numpy()
     
-    # Posições para cada rodada
-    round_positions = {}
-    for i, round_num in enumerate(rounds):
-        round_positions[round_num] = i * 2
+    fig = go.Figure()
     
-    # Adicionar nós para cada partida
-    for _, match in tournament_matches.iterrows():
-        round_num = match['round']
-        x_pos = round_positions[round_num]
-        
-        # Posição Y baseada no ID da partida para espaçamento
-        y_pos = match['match_id'] % 10
-        
-        # Adicionar nó do vencedor
-        fig.add_trace(go.Scatter(
-            x=[x_pos],
-            y=[y_pos],
-            mode='markers+text',
-            marker=dict(size=15, color='green'),
-            text=match['winner_name'],
-            textposition="middle right",
-            name=f"Vencedor R{round_num}",
-            showlegend=False
-        ))
+    # Conectores de cada partida até a partida seguinte do vencedor
+    fig.add_trace(go.Scatter(
+        x=edges_x, y=edges_y,
+        mode='lines',
+        line=dict(color='rgba(128, 128, 128, 0.6)', width=1.5),
+        hoverinfo='skip'
+    ))
+    
+    # Partidas: nó no vencedor, com o confronto e o placar no hover
+    fig.add_trace(go.Scatter(
+        x=x, y=y,
+        mode='markers+text',
+        marker=dict(size=12, color='green'),
+        text=winner_names,
+        textposition="top center",
+        textfont=dict(size=10),
+        customdata=np.column_stack([loser_names, scores]),
+        hovertemplate="<b>%{text}</b> venceu %{customdata[0]}<br>Placar: %{customdata[1]}<extra></extra>"
+    ))
+    
+    # Campeão em destaque: vencedor da última coluna sem partida seguinte
+    champion = (x == x.max()) & (parent < 0)
+    fig.add_trace(go.Scatter(
+        x=x[champion], y=y[champion],
+        mode='markers',
+        marker=dict(size=20, color='gold', symbol='star', line=dict(color='darkgoldenrod', width=1)),
+        hoverinfo='skip'
+    ))
+    
+    # Nomes das rodadas no eixo X
+    round_numbers = np.unique(matches['round'].to_numpy())
+    round_names = BRACKET_ROUND_NAMES.get(int(round_numbers.max()), {})
+    leaves = int(np.count_nonzero(x == 0))
     
-    # Configurar layout
     fig.update_layout(
         title="Chave do Torneio",
-        xaxis_title="Rodadas",
-        yaxis_title="Partidas",
-        height=600,
-        showlegend=False
+        height=max(400, 40 * leaves),
+        showlegend=False,
+        plot_bgcolor='white',
+        xaxis=dict(
+            tickmode='array',
+            tickvals=np.arange(len(round_numbers)),
+            ticktext=[round_names.get(int(r), f"Rodada {r}") for r in round_numbers],
+            showgrid=False,
+            zeroline=False
+        ),
+        yaxis=dict(visible=False, autorange='reversed')
     )
     
     return fig
 
-def display_tournaments_page(matches, players, tournaments):
+def display_tournaments_page(dataset):
     """Exibe a página de torneios"""
+    matches, players, tournaments = dataset.frames
+    results = calculate_tournament_results(dataset)
     st.header("🎾 Torneios")
     
     # Garantir que o host esteja disponível na session_state
@@ -308,9 +149,8 @@ def display_tournaments_page(matches, players, tournaments):
         st.metric("Total de Torneios", len(filtered_tournaments))
     with col_stats2:
         if not filtered_tournaments.empty:
-            tournament_ids = filtered_tournaments['id'].tolist()
-            total_matches = len(matches[matches['tournament_id'].isin(tournament_ids)])
-            st.metric("Total de Partidas", total_matches)
+            match_counts = results['match_count'].reindex(filtered_tournaments['id'].to_numpy())
+            st.metric("Total de Partidas", int(match_counts.fillna(0).sum()))
         else:
             st.metric("Total de Partidas", 0)
     with col_stats3:
@@ -326,12 +166,8 @@ def display_tournaments_page(matches, players, tournaments):
         display_tournaments = display_tournaments.sort_values('started_at', ascending=False)
         
         # Adicionar informação do campeão
-        champions_info = []
-        for _, tournament in display_tournaments.iterrows():
-            champion = get_tournament_champion(matches, tournament['id'])
-            champions_info.append(champion['name'] if champion else 'Em andamento')
-        
-        display_tournaments['champion'] = champions_info
+        champions = results['champion_name'].reindex(display_tournaments['id'].to_numpy())
+        display_tournaments['champion'] = champions.fillna('Em andamento').to_numpy()
         
         # Selecionar colunas para exibição
         display_columns = ['name', 'category', 'started_month_year', 'state', 'champion']
@@ -364,7 +200,12 @@ def display_tournaments_page(matches, players, tournaments):
                 tournament_info = display_tournaments[display_tournaments['id'] == tournament_id].iloc[0]
                 
                 # Mostrar chave do torneio
-                create_tournament_bracket(matches, tournament_id, tournament_info['name'])
+                create_tournament_bracket(dataset, results, tournament_id, tournament_info['name'])
+                
+                with st.expander("🗺️ Chave em gráfico"):
+                    fig = create_bracket_visualization(dataset, tournament_id)
+                    if fig is not None:
+                        st.plotly_chart(fig, use_container_width=True)
                 
 
         else: